@@ -0,0 +1,166 @@
+# ================================================================================
+# 🧠 ANALYTICS — COMPUTATIONAL CORE OF THE DASHBOARD
+# ================================================================================
+# Description: Loading, filtering, aggregation and modelling for the social
+#              media & mental health dashboard, importable without Streamlit
+#              so it can be cached, profiled, benchmarked and run in workers
+# ================================================================================
+
+from .loader import (
+    CACHE_DIR,
+    DATA_FILES,
+    SURVEY_CATEGORICAL_COLUMNS,
+    DAILY_METRICS,
+    DAILY_SUM_COLUMNS,
+    DAYS_OF_WEEK,
+    compact_dtypes,
+    append_rows,
+    memory_footprint,
+    get_memory_report,
+    read_cached,
+    read_appended,
+    read_table,
+    parse_csv,
+    aggregate_daily_usage,
+    merge_daily_sums,
+    partition_by_month,
+    merge_daily_partitions,
+    daily_record_count,
+    daily_date_range,
+    encode_platform_sets,
+    daily_means,
+    APPENDABLE_SOURCES,
+    source_files,
+    get_data_version,
+    ingest_appended,
+    load_tables,
+    refresh_tables,
+    load_datasets,
+    SHARED_TABLES,
+    publish_tables,
+    attach_tables,
+)
+from .filters import (
+    FILTER_COLUMNS,
+    EXTRA_FILTER_COLUMNS,
+    RANGE_FILTER_COLUMNS,
+    FILTER_KEYS,
+    PLATFORM_FILTER,
+    selected_values,
+    build_filter_index,
+    compile_filters,
+    evaluate_predicates,
+    query_filter_index,
+    apply_filters,
+    drop_unused_categories,
+    make_filter_key,
+    platform_membership,
+    build_user_join_index,
+    gather_user_rows,
+    select_daily_rows,
+)
+from .aggregates import (
+    CORRELATION_COLUMNS,
+    RADAR_METRICS,
+    SLEEP_ORDER,
+    AGGREGATIONS,
+    TAB_AGGREGATES,
+    AGGREGATE_CUBES,
+    ROW_AGGREGATES,
+    DATE_SUM_COLUMNS,
+    COHORT_COLUMN,
+    COHORT_METRICS,
+    platform_set_reach,
+    cached_aggregate,
+    get_aggregate_cache,
+)
+from .model import (
+    MODEL_DIR,
+    RISK_FEATURE_COLUMNS,
+    prepare_training_data,
+    make_model_key,
+    train_risk_model,
+    request_model,
+    load_model,
+    is_model_ready,
+)
+from .cube import (
+    CUBE_SPECS,
+    build_cube_cells,
+    build_cubes,
+    extend_cubes,
+    cube_covers,
+    query_cube,
+    select_cube_cells,
+)
+from .sampling import (
+    SCATTER_POINT_BUDGET,
+    SCATTER_MODES,
+    scatter_mode,
+    stratified_sample,
+    density_grid,
+)
+from .telemetry import (
+    CHART_METRICS_MAX_RUNS,
+    CHART_PAYLOAD_SAMPLE_EVERY,
+    get_chart_metrics,
+    begin_chart_run,
+    sizing_payloads,
+    chart_data,
+    record_chart,
+    end_chart_run,
+    chart_metrics_records,
+    chart_metrics_summary,
+    PROFILE_ENV_VAR,
+    METRICS_PORT,
+    profiling_enabled,
+    begin_profile,
+    is_profiling,
+    profile_span,
+    record_stage,
+    stage_summary,
+    prometheus_metrics,
+    serve_metrics,
+)
+from .fairness import (
+    PROTECTED_ATTRIBUTES,
+    FAIRNESS_METRIC,
+    group_indicator,
+    group_statistics,
+)
+from .cohorts import (
+    COHORT_NAMES,
+    stack_cohorts,
+    select_cohort_cells,
+    split_cohort_cells,
+)
+from .temporal import (
+    ROLLING_WINDOWS,
+    EWMA_HALFLIFE_DAYS,
+    month_date_sums,
+    population_date_sums,
+    temporal_stats,
+    extend_temporal_stats,
+    rolling_frame,
+)
+from .trajectory import (
+    TRAJECTORY_FEATURES,
+    build_trajectory_features,
+    join_trajectory_features,
+)
+from .correlation import (
+    SURVEY_NUMERIC_COLUMNS,
+    CORRELATION_METHODS,
+    FDR_ALPHA,
+    cell_moments,
+    pearson_from_moments,
+    spearman_matrix,
+    correlation_pvalues,
+    correlation_result,
+    fdr_bh,
+    correlation_pairs,
+)
+from .ingest import (
+    open_dataset,
+    refresh_dataset,
+)
@@ -0,0 +1,505 @@
+# ================================================================================
+# 📊 ANALYTICS AGGREGATES — PER-TAB AGGREGATE FUNCTIONS & SHARED CACHE
+# ================================================================================
+# Description: Every chart's data as a pure function of cube cells, the
+#              filtered users or the filtered daily tables, plus an LRU cache
+#              keyed on (dataset version, filter state)
+# ================================================================================
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from .loader import DAILY_SUM_COLUMNS, DAYS_OF_WEEK, daily_means
+from .fairness import PROTECTED_ATTRIBUTES, FAIRNESS_METRIC, group_statistics
+from .temporal import temporal_stats, rolling_frame
+from .correlation import (
+    SURVEY_NUMERIC_COLUMNS, cell_moments, pearson_from_moments, spearman_matrix, correlation_result
+)
+
+# ================================================================================
+# AGGREGATIONS - NAMED PER-TAB AGGREGATES WITH A SHARED LRU CACHE
+# ================================================================================
+
+AGGREGATE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Daily partition columns the temporal aggregates read
+DATE_SUM_COLUMNS = ['date', 'day_of_week'] + DAILY_SUM_COLUMNS
+
+CORRELATION_COLUMNS = ['avg_daily_screen_time_hrs', 'anxiety_score', 'depression_score', 
+                       'stress_score', 'sleep_quality_score', 'self_esteem_score', 
+                       'loneliness_score', 'fomo_score', 'avg_sleep_hours']
+RADAR_METRICS = ['anxiety_score', 'depression_score', 'stress_score', 
+                 'loneliness_score', 'fomo_score']
+SLEEP_ORDER = ['Good', 'Moderate', 'Poor', 'Very Poor']
+
+# Cohort label of cells folded for several cohorts at once (see cohorts.py)
+COHORT_COLUMN = 'cohort'
+# KPI -> per-user measure the cohorts are compared on, shares reported in %
+COHORT_METRICS = {
+    'avg_screen': 'avg_daily_screen_time_hrs',
+    'avg_anxiety': 'anxiety_score',
+    'high_risk_pct': 'high_risk',
+    'poor_sleep_pct': 'poor_sleep',
+    'risk_index': 'mental_health_risk_score'
+}
+COHORT_SHARE_METRICS = ['high_risk_pct', 'poor_sleep_pct']
+
+# Survey aggregates read cube cells (see cube.py): one row per dimension
+# combination with a 'count' column and '<metric>:sum' / '<metric>:sq',
+# '<a>*<b>' cross-product, '<metric>:min' / ':max' and platform measures
+
+def _counts(cells, by):
+    """Users per group"""
+    return cells.groupby(by, observed=True)['count'].sum()
+
+def _value_counts(cells, col):
+    """Users per value, most common first - like Series.value_counts"""
+    return _counts(cells, col).sort_values(ascending=False).rename('count')
+
+def _means(cells, by, metrics):
+    """Per-group means of the given metrics"""
+    sums = cells.groupby(by, observed=True)[[f"{m}:sum" for m in metrics] + ['count']].sum()
+    return pd.DataFrame({m: sums[f"{m}:sum"] / sums['count'] for m in metrics})
+
+def _mean(cells, metric):
+    """Overall mean of a metric, NaN without users"""
+    n = cells['count'].sum()
+    return cells[f"{metric}:sum"].sum() / n if n else np.nan
+
+def _std(total, sq, n):
+    """Sample standard deviation from count, sum and sum of squares"""
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var = (np.asarray(sq) - np.asarray(total) ** 2 / n) / (n - 1)
+    return np.sqrt(np.where(n > 1, np.maximum(var, 0.0), np.nan))
+
+def _cross(cells, a, b):
+    """Sum of the product of two metrics"""
+    if a == b:
+        return cells[f"{a}:sq"].sum()
+    column = f"{a}*{b}" if f"{a}*{b}" in cells.columns else f"{b}*{a}"
+    return cells[column].sum()
+
+def agg_kpis(cells):
+    """Headline KPI values"""
+    n = cells['count'].sum()
+    high_risk = cells.loc[cells['risk_category'] == 'High', 'count'].sum()
+    poor_sleep = cells['poor_sleep:sum'].sum()
+    return {
+        'avg_screen': _mean(cells, 'avg_daily_screen_time_hrs'),
+        'avg_anxiety': _mean(cells, 'anxiety_score'),
+        'high_risk_pct': high_risk / n * 100 if n else np.nan,
+        'high_risk_users': int(high_risk),
+        'poor_sleep_pct': poor_sleep / n * 100 if n else np.nan,
+        'poor_sleep_users': int(poor_sleep),
+        'risk_index': _mean(cells, 'mental_health_risk_score')
+    }
+
+def agg_risk_counts(cells):
+    """Users per risk category"""
+    return _value_counts(cells, 'risk_category')
+
+def agg_screen_by_risk(cells):
+    """Mean screen time per risk category, ascending"""
+    screen_by_risk = _means(cells, 'risk_category', ['avg_daily_screen_time_hrs']).reset_index()
+    return screen_by_risk.sort_values('avg_daily_screen_time_hrs')
+
+def agg_summary_stats(cells):
+    """Overview summary table"""
+    n = cells['count'].sum()
+    high_risk = cells.loc[cells['risk_category'] == 'High', 'count'].sum()
+    return pd.DataFrame({
+        'Metric': ['Total Users', 'Avg Age', 'Avg Screen Time', 'Avg Anxiety', 'Avg Depression', 
+                  'Avg Sleep Hours', 'Night Users %', 'High Risk %'],
+        'Value': [
+            f"{n:,}",
+            f"{_mean(cells, 'age'):.1f} years",
+            f"{_mean(cells, 'avg_daily_screen_time_hrs'):.2f} hrs/day",
+            f"{_mean(cells, 'anxiety_score'):.1f}/21",
+            f"{_mean(cells, 'depression_score'):.1f}/27",
+            f"{_mean(cells, 'avg_sleep_hours'):.1f} hrs",
+            f"{_mean(cells, 'night_usage') * 100:.1f}%",
+            f"{(high_risk / n if n else np.nan) * 100:.1f}%"
+        ]
+    })
+
+def agg_gender_counts(cells):
+    """Users per gender"""
+    return _value_counts(cells, 'gender')
+
+def agg_age_risk_counts(cells):
+    """Users per age group and risk category"""
+    return _counts(cells, ['age_group', 'risk_category']).unstack(fill_value=0)
+
+def agg_education_counts(cells):
+    """Users per education level, ascending"""
+    return _value_counts(cells, 'education').sort_values()
+
+def agg_occupation_screen(cells):
+    """Screen time category share per occupation (%)"""
+    counts = _counts(cells, ['occupation', 'screen_time_category']).unstack(fill_value=0)
+    return counts.div(counts.sum(axis=1), axis=0) * 100
+
+def agg_platform_counts(cells):
+    """Users per primary platform"""
+    return _value_counts(cells, 'primary_platform')
+
+def agg_platform_scores(cells):
+    """Mean anxiety and depression per primary platform"""
+    return _means(
+        cells, 'primary_platform', ['anxiety_score', 'depression_score']
+    ).round(1).reset_index()
+
+def agg_region_platform(cells):
+    """Users per region and primary platform"""
+    return _counts(cells, ['region', 'primary_platform']).reset_index(name='count')
+
+def agg_platform_screen_risk(cells):
+    """Users per platform, screen time category and risk category"""
+    return _counts(
+        cells, ['primary_platform', 'screen_time_category', 'risk_category']
+    ).reset_index(name='count')
+
+def _co_usage_names(cells):
+    """Platform names in bit order, read back from the co-usage measures"""
+    return [c.split(':')[1] for c in cells.columns if c.startswith('co:') and c.split(':')[1] == c.split(':')[2]]
+
+def agg_platform_reach(cells):
+    """Users and share of users on each platform, primary or not"""
+    names = _co_usage_names(cells)
+    users = pd.Series({name: cells[f"co:{name}:{name}"].sum() for name in names}, dtype=np.int64)
+    n = cells['count'].sum()
+    return pd.DataFrame({
+        'users': users,
+        'reach_pct': users / max(n, 1) * 100
+    }).sort_values('users', ascending=False)
+
+def agg_platform_co_usage(cells):
+    """Users on both platforms for every platform pair"""
+    names = _co_usage_names(cells)
+    matrix = np.zeros((len(names), len(names)), dtype=np.int64)
+    for i, a in enumerate(names):
+        for j in range(i, len(names)):
+            matrix[i, j] = matrix[j, i] = cells[f"co:{a}:{names[j]}"].sum()
+    return pd.DataFrame(matrix, index=names, columns=names)
+
+def agg_platforms_per_user(cells):
+    """Users by number of platforms used"""
+    columns = [c for c in cells.columns if c.startswith('platforms:')]
+    counts = cells[columns].sum().to_numpy()
+    return pd.Series(counts, index=[int(c.split(':')[1]) for c in columns], name='users').rename_axis('platforms')
+
+def platform_set_reach(membership, platforms, require_all=False):
+    """Users on any (or all) of the given platforms, from a users x platforms matrix"""
+    if not platforms:
+        return 0
+    selected = membership[list(platforms)].to_numpy().astype(bool)
+    hits = selected.all(axis=1) if require_all else selected.any(axis=1)
+    return int(hits.sum())
+
+def agg_date_sums(daily_df):
+    """Daily metric sums and counts per date"""
+    return daily_df.groupby(['date', 'day_of_week'], observed=True)[DAILY_SUM_COLUMNS].sum().reset_index()
+
+def agg_dow_means(date_sums):
+    """Daily metric means per day of week, from the per-date sums"""
+    return daily_means(date_sums, 'day_of_week').reindex(DAYS_OF_WEEK)
+
+def agg_rolling_stats(date_sums):
+    """Daily means with rolling 7 / 28-day means and stds and the EWMA of every daily metric"""
+    return rolling_frame(temporal_stats(date_sums))
+
+def agg_weekly_screen(date_sums):
+    """Mean screen time per ISO week and day of week, from the per-date sums"""
+    week_sums = date_sums.assign(week=date_sums['date'].dt.isocalendar().week)
+    return daily_means(week_sums, ['week', 'day_of_week'])['screen_time_hours'].unstack().reindex(columns=DAYS_OF_WEEK)
+
+def agg_top_platforms(cells):
+    """Five most common primary platforms"""
+    return _value_counts(cells, 'primary_platform').head(5).index.tolist()
+
+def agg_radar_means(cells):
+    """Mean mental health scores per risk category"""
+    return _means(cells, 'risk_category', RADAR_METRICS)
+
+def agg_screen_anxiety_ttest(cells):
+    """T-test of anxiety between high (>=6 hrs) and low (<3 hrs) screen time users"""
+    bands = cells.groupby('screen_band', observed=True)[['anxiety_score:sum', 'anxiety_score:sq', 'count']].sum()
+    if '6+' not in bands.index or '<3' not in bands.index:
+        return None
+    high, low = bands.loc['6+'], bands.loc['<3']
+    high_mean = high['anxiety_score:sum'] / high['count']
+    low_mean = low['anxiety_score:sum'] / low['count']
+    t_stat, p_value = stats.ttest_ind_from_stats(
+        high_mean, _std(high['anxiety_score:sum'], high['anxiety_score:sq'], high['count']), high['count'],
+        low_mean, _std(low['anxiety_score:sum'], low['anxiety_score:sq'], low['count']), low['count']
+    )
+    return {
+        'high_mean': high_mean,
+        'low_mean': low_mean,
+        't_stat': t_stat,
+        'p_value': p_value
+    }
+
+def agg_sleep_trend(cells):
+    """Linear trend of sleep quality against night usage"""
+    n = cells['count'].sum()
+    if n <= 1:
+        return None
+    # Closed-form least squares from the cube's sums and cross products
+    x, y = 'night_usage_hours', 'sleep_quality_score'
+    sx, sy = cells[f"{x}:sum"].sum(), cells[f"{y}:sum"].sum()
+    sxx, sxy = _cross(cells, x, x), _cross(cells, x, y)
+    denominator = n * sxx - sx * sx
+    if denominator == 0:
+        return None
+    slope = (n * sxy - sx * sy) / denominator
+    intercept = (sy - slope * sx) / n
+    x_line = np.linspace(cells[f"{x}:min"].min(), cells[f"{x}:max"].max(), 100)
+    return {'x': x_line, 'y': slope * x_line + intercept}
+
+def agg_sleep_screen_anxiety(cells):
+    """Mean anxiety per sleep quality category and screen time bin"""
+    heatmap_data = _means(cells, ['sleep_quality_category', 'screen_bin'], ['anxiety_score'])['anxiety_score'].unstack()
+    return heatmap_data.reindex([o for o in SLEEP_ORDER if o in heatmap_data.index])
+
+def agg_correlation_matrix(cells):
+    """Pearson correlation and p-values of every numeric survey column pair, from cell moments"""
+    n, sums, cross = cell_moments(cells, SURVEY_NUMERIC_COLUMNS)
+    return correlation_result(pearson_from_moments(n, sums, cross), n, SURVEY_NUMERIC_COLUMNS)
+
+def agg_spearman_matrix(rows):
+    """Spearman correlation and p-values of every numeric survey column pair of the filtered users"""
+    return correlation_result(spearman_matrix(rows, SURVEY_NUMERIC_COLUMNS), len(rows), SURVEY_NUMERIC_COLUMNS)
+
+def agg_state_summary(cells):
+    """Mean risk, screen time, anxiety and user count per state"""
+    state_data = _means(
+        cells, 'state', ['mental_health_risk_score', 'avg_daily_screen_time_hrs', 'anxiety_score']
+    ).assign(user_count=_counts(cells, 'state')).reset_index()
+    state_data.columns = ['state', 'avg_risk', 'avg_screen_time', 'avg_anxiety', 'user_count']
+    return state_data.sort_values('avg_risk', ascending=True)
+
+def agg_city_summary(cells):
+    """Mean risk and user count per city location"""
+    by = ['city', 'latitude', 'longitude']
+    return _means(cells, by, ['mental_health_risk_score']).assign(
+        user_id=_counts(cells, by)
+    ).reset_index()
+
+def agg_region_summary(cells):
+    """Mean usage and mental health scores per region"""
+    return _means(cells, 'region', [
+        'avg_daily_screen_time_hrs', 'anxiety_score', 'depression_score', 'mental_health_risk_score'
+    ]).round(2)
+
+def _confidence_label(count):
+    """Sample size confidence of a group"""
+    if count >= 100:
+        return '🟢 High'
+    if count >= 50:
+        return '🟡 Medium'
+    return '🔴 Low'
+
+def agg_fairness(rows):
+    """Risk score statistics with bootstrap intervals across every protected attribute at once"""
+    attributes = [a for a in PROTECTED_ATTRIBUTES if a in rows.columns]
+    result = group_statistics(rows[[FAIRNESS_METRIC] + attributes], attributes)
+    groups = result['groups']
+    if groups.empty:
+        return dict(result, confidence=pd.DataFrame(), headline={
+            'gender_ratio': None, 'age_ratio': None, 'regional_std': np.nan
+        })
+    
+    # Sample size confidence per group
+    confidence = pd.DataFrame({
+        'Category Type': groups['attribute'].str.replace('_', ' ').str.title(),
+        'Category': groups['group'],
+        'Sample Size': groups['count'],
+        'Confidence': groups['count'].map(_confidence_label)
+    })
+    
+    # Headline ratios: male / female, youngest adults / oldest, spread of regional means
+    means = groups.set_index(['attribute', 'group'])['mean']
+    lookup = lambda attribute, group, default=0: means.get((attribute, group), default)
+    female_risk = lookup('gender', 'Female')
+    young_risk = lookup('age_group', '18-24')
+    old_risk = lookup('age_group', '45-54', young_risk)
+    spread = result['attributes'].set_index('attribute')['mean_spread']
+    headline = {
+        'gender_ratio': lookup('gender', 'Male') / female_risk if female_risk > 0 else None,
+        'age_ratio': young_risk / old_risk if old_risk > 0 else None,
+        'regional_std': spread.get('region', np.nan)
+    }
+    return dict(result, confidence=confidence, headline=headline)
+
+def agg_cohort_comparison(cells):
+    """KPIs per cohort with effect sizes and Welch t-tests of every cohort against the first
+    
+    Reads core cells with a cohort column. All cohorts and metrics are
+    summed in one groupby and tested as one cohorts x metrics array; the
+    first cohort's own test columns are NaN.
+    """
+    # The high risk flag is 0/1, so its sum and sum of squares are both the High users
+    high_risk = np.where(cells['risk_category'] == 'High', cells['count'], 0)
+    cells = cells.assign(**{'high_risk:sum': high_risk, 'high_risk:sq': high_risk})
+    measures = list(COHORT_METRICS.values())
+    sums = cells.groupby(COHORT_COLUMN, observed=False)[
+        [f"{m}:sum" for m in measures] + [f"{m}:sq" for m in measures] + ['count']
+    ].sum()
+    total = sums[[f"{m}:sum" for m in measures]].to_numpy(dtype=np.float64)
+    sq = sums[[f"{m}:sq" for m in measures]].to_numpy(dtype=np.float64)
+    n = sums[['count']].to_numpy(dtype=np.float64)
+    scale = np.array([100.0 if kpi in COHORT_SHARE_METRICS else 1.0 for kpi in COHORT_METRICS])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n * scale
+    std = _std(total, sq, n) * scale
+    
+    # Every cohort against the first one, all metrics at once
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_stat, p_value = stats.ttest_ind_from_stats(
+            mean, std, n, mean[:1], std[:1], n[:1], equal_var=False
+        )
+        pooled = np.sqrt(((n - 1) * std ** 2 + (n[:1] - 1) * std[:1] ** 2) / (n + n[:1] - 2))
+        cohens_d = (mean - mean[:1]) / pooled
+    t_stat, p_value, cohens_d = (np.asarray(a, dtype=np.float64).copy() for a in (t_stat, p_value, cohens_d))
+    for values in (t_stat, p_value, cohens_d):
+        values[:1] = np.nan
+    
+    n_cohorts, n_metrics = mean.shape
+    return pd.DataFrame({
+        'cohort': np.repeat(sums.index.to_numpy(), n_metrics),
+        'metric': np.tile(list(COHORT_METRICS), n_cohorts),
+        'users': np.repeat(n[:, 0], n_metrics).astype(np.int64),
+        'value': mean.ravel(),
+        'std': std.ravel(),
+        'diff': (mean - mean[:1]).ravel(),
+        'cohens_d': cohens_d.ravel(),
+        't_stat': t_stat.ravel(),
+        'p_value': p_value.ravel()
+    })
+
+# Aggregates each tab reads, used to prewarm and benchmark a tab in isolation
+TAB_AGGREGATES = {
+    'overview': ['kpis', 'risk_counts', 'screen_by_risk', 'summary_stats'],
+    'demographics': ['gender_counts', 'age_risk_counts', 'education_counts', 'occupation_screen'],
+    'platforms': ['platform_counts', 'platform_scores', 'region_platform', 'platform_screen_risk',
+                  'platform_reach', 'platform_co_usage', 'platforms_per_user'],
+    'temporal': ['date_sums', 'dow_means', 'rolling_stats', 'weekly_screen'],
+    'mental_health': ['top_platforms', 'radar_means', 'screen_anxiety_ttest'],
+    'sleep': ['sleep_trend', 'sleep_screen_anxiety'],
+    'correlations': ['correlation_matrix', 'spearman_matrix'],
+    'geographic': ['state_summary', 'city_summary', 'region_summary'],
+    'ethics': ['fairness'],
+}
+
+AGGREGATIONS = {
+    'kpis': agg_kpis,
+    'risk_counts': agg_risk_counts,
+    'screen_by_risk': agg_screen_by_risk,
+    'summary_stats': agg_summary_stats,
+    'gender_counts': agg_gender_counts,
+    'age_risk_counts': agg_age_risk_counts,
+    'education_counts': agg_education_counts,
+    'occupation_screen': agg_occupation_screen,
+    'platform_counts': agg_platform_counts,
+    'platform_scores': agg_platform_scores,
+    'region_platform': agg_region_platform,
+    'platform_screen_risk': agg_platform_screen_risk,
+    'platform_reach': agg_platform_reach,
+    'platform_co_usage': agg_platform_co_usage,
+    'platforms_per_user': agg_platforms_per_user,
+    'date_sums': agg_date_sums,
+    'dow_means': agg_dow_means,
+    'rolling_stats': agg_rolling_stats,
+    'weekly_screen': agg_weekly_screen,
+    'top_platforms': agg_top_platforms,
+    'radar_means': agg_radar_means,
+    'screen_anxiety_ttest': agg_screen_anxiety_ttest,
+    'sleep_trend': agg_sleep_trend,
+    'sleep_screen_anxiety': agg_sleep_screen_anxiety,
+    'correlation_matrix': agg_correlation_matrix,
+    'spearman_matrix': agg_spearman_matrix,
+    'state_summary': agg_state_summary,
+    'city_summary': agg_city_summary,
+    'region_summary': agg_region_summary,
+    'fairness': agg_fairness,
+    'cohort_comparison': agg_cohort_comparison,
+}
+
+# Aggregates over rows rather than cube cells - the daily rows or the filtered users
+ROW_AGGREGATES = ['date_sums', 'dow_means', 'rolling_stats', 'weekly_screen', 'fairness', 'spearman_matrix']
+
+# Cube each survey aggregate reads its cells from
+AGGREGATE_CUBES = {
+    'education_counts': 'education',
+    'occupation_screen': 'occupation',
+    'platform_screen_risk': 'screen_category',
+    'state_summary': 'state',
+    'city_summary': 'city',
+    'sleep_screen_anxiety': 'sleep_screen',
+    'screen_anxiety_ttest': 'screen_band',
+    'correlation_matrix': 'correlation',
+}
+AGGREGATE_CUBES.update({
+    name: 'core' for name in AGGREGATIONS
+    if name not in AGGREGATE_CUBES and name not in ROW_AGGREGATES
+})
+
+def _estimate_nbytes(value):
+    """Approximate the memory held by a cached aggregate"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+# Process-wide LRU cache of aggregates, shared by every session
+_aggregate_cache = {
+    'entries': OrderedDict(),
+    'nbytes': 0,
+    'max_bytes': AGGREGATE_CACHE_MAX_BYTES,
+    'lock': threading.Lock()
+}
+
+def get_aggregate_cache():
+    """Return the process-wide aggregate cache"""
+    return _aggregate_cache
+
+def cached_aggregate(name, cache_key, data):
+    """Return a named aggregate of data, computing it only on a cache miss
+    
+    data may be a zero-argument callable so its cells are only selected on a
+    miss. Cached values are shared between sessions and must be treated as
+    read-only.
+    """
+    cache = get_aggregate_cache()
+    key = (name,) + tuple(cache_key)
+    
+    with cache['lock']:
+        if key in cache['entries']:
+            cache['entries'].move_to_end(key)
+            return cache['entries'][key][0]
+    
+    value = AGGREGATIONS[name](data() if callable(data) else data)
+    nbytes = _estimate_nbytes(value)
+    
+    with cache['lock']:
+        if key not in cache['entries'] and nbytes <= cache['max_bytes']:
+            cache['entries'][key] = (value, nbytes)
+            cache['nbytes'] += nbytes
+            while cache['nbytes'] > cache['max_bytes']:
+                _, (_, evicted_nbytes) = cache['entries'].popitem(last=False)
+                cache['nbytes'] -= evicted_nbytes
+    return value
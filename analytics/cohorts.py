@@ -0,0 +1,60 @@
+# ================================================================================
+# 🆚 ANALYTICS COHORTS — SEVERAL FILTERED POPULATIONS IN ONE GROUPED PASS
+# ================================================================================
+# Description: Cube cells for N cohorts at once, each cohort defined by its own
+#              filter state. Cohorts the cube covers read its cells; the rest
+#              are stacked with a cohort label column and folded in a single
+#              groupby with the label as an extra dimension, rather than
+#              running the whole pipeline once per cohort.
+# ================================================================================
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import COHORT_COLUMN
+from .cube import build_cube_cells, cube_covers, query_cube
+
+COHORT_NAMES = ['A', 'B', 'C', 'D']
+
+def stack_cohorts(df, cohorts):
+    """Rows of every cohort one after another, labelled in a cohort column
+    
+    cohorts is a list of {'name', 'row_ids'}. A user in several cohorts
+    appears once in each.
+    """
+    row_ids = [np.asarray(cohort['row_ids'], dtype=np.int64) for cohort in cohorts]
+    labels = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(cohorts)), [len(ids) for ids in row_ids]),
+        categories=[cohort['name'] for cohort in cohorts]
+    )
+    return df.take(np.concatenate(row_ids)).assign(**{COHORT_COLUMN: labels})
+
+def select_cohort_cells(cube, cohorts, screen_range, df):
+    """Cells of cube for every cohort in one frame, labelled in a cohort column
+    
+    cohorts is a list of {'name', 'selections', 'row_ids'} sharing one
+    screen time range, and df the full survey table the row ids point into.
+    """
+    parts, folded = [], []
+    for cohort in cohorts:
+        if cube_covers(cube, cohort['selections'], screen_range):
+            parts.append(query_cube(cube, cohort['selections']).assign(**{COHORT_COLUMN: cohort['name']}))
+        else:
+            folded.append(cohort)
+    
+    # Every uncovered cohort in one grouped pass, the label as an extra dimension
+    if folded:
+        spec = dict(cube['spec'], dims=[COHORT_COLUMN] + cube['spec']['dims'])
+        parts.append(build_cube_cells(stack_cohorts(df, folded), spec, cube['platform_names']))
+    
+    cells = pd.concat(parts, ignore_index=True)
+    cells[COHORT_COLUMN] = pd.Categorical(cells[COHORT_COLUMN], categories=[c['name'] for c in cohorts])
+    return cells
+
+def split_cohort_cells(cells):
+    """Each cohort's cells without the cohort column, keyed by cohort name"""
+    labels = cells[COHORT_COLUMN]
+    return {
+        name: cells[(labels == name).to_numpy()].drop(columns=COHORT_COLUMN)
+        for name in labels.cat.categories
+    }
@@ -0,0 +1,111 @@
+# ================================================================================
+# 🔗 ANALYTICS CORRELATION — CORRELATION MATRICES FROM CELL MOMENTS
+# ================================================================================
+# Description: Pearson correlation of any subset of the numeric survey columns
+#              under any filter, assembled from the count, sums and cross-
+#              product sums the correlation cube keeps per cell rather than
+#              from the users. Spearman ranks the filtered users on demand.
+#              Significance is a t-test of every pair at once, with the
+#              Benjamini-Hochberg false discovery rate over the pairs shown.
+# ================================================================================
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Numeric survey columns the correlation cube keeps moments of - identifiers
+# and bit masks are numbers but not measures
+SURVEY_NUMERIC_COLUMNS = [
+    'age', 'latitude', 'longitude', 'num_platforms', 'avg_daily_screen_time_hrs',
+    'follower_count', 'following_count', 'posts_per_week', 'likes_per_day',
+    'comments_per_day', 'shares_per_week', 'night_usage_hours', 'morning_usage_hours',
+    'usage_scrolling_pct', 'usage_watching_pct', 'usage_posting_pct',
+    'usage_messaging_pct', 'usage_gaming_pct', 'notifications_per_day',
+    'avg_session_duration_min', 'sessions_per_day', 'failed_reduction_attempts',
+    'anxiety_score', 'depression_score', 'stress_score', 'self_esteem_score',
+    'loneliness_score', 'life_satisfaction_score', 'fomo_score',
+    'social_comparison_score', 'sleep_quality_score', 'avg_sleep_hours',
+    'sleep_onset_minutes', 'phone_before_bed_minutes', 'physical_activity_hrs_week',
+    'bmi', 'eye_strain_frequency', 'headache_frequency_week',
+    'mental_health_risk_score', 'survey_completion_time_min'
+]
+CORRELATION_METHODS = ['pearson', 'spearman']
+# Pairs with a false discovery rate under this are flagged significant
+FDR_ALPHA = 0.05
+
+# ================================================================================
+# MATRICES - PEARSON FROM MOMENTS, SPEARMAN FROM RANKS
+# ================================================================================
+
+def cell_moments(cells, columns):
+    """Users, column sums and the cross-product sum matrix of columns over cells"""
+    pairs = [(a, columns[j]) for i, a in enumerate(columns) for j in range(i + 1, len(columns))]
+    products = [f"{a}*{b}" if f"{a}*{b}" in cells.columns else f"{b}*{a}" for a, b in pairs]
+    totals = cells[[f"{c}:sum" for c in columns] + [f"{c}:sq" for c in columns] + products].sum()
+    totals = totals.to_numpy(dtype=np.float64)
+    k = len(columns)
+    cross = np.diag(totals[k:2 * k])
+    i, j = np.triu_indices(k, k=1)
+    cross[i, j] = cross[j, i] = totals[2 * k:]
+    return float(cells['count'].sum()), totals[:k], cross
+
+def pearson_from_moments(n, sums, cross):
+    """Pearson correlation matrix from the users, sums and cross-product sums"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = cross - np.outer(sums, sums) / n
+        sd = np.sqrt(np.diag(cov))
+        return np.clip(cov / np.outer(sd, sd), -1.0, 1.0)
+
+def spearman_matrix(df, columns):
+    """Spearman correlation matrix of columns - Pearson of the average ranks"""
+    ranks = stats.rankdata(df[columns].to_numpy(dtype=np.float64), axis=0)
+    return pearson_from_moments(len(ranks), ranks.sum(axis=0), ranks.T @ ranks)
+
+def correlation_pvalues(corr, n):
+    """Two-sided p-values of every correlation, from t = r sqrt((n - 2) / (1 - r^2))"""
+    dof = n - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_stat = corr * np.sqrt(dof / ((1.0 - corr) * (1.0 + corr)))
+        p_value = 2 * stats.t.sf(np.abs(t_stat), dof) if dof > 0 else np.full_like(corr, np.nan)
+    return np.where(np.isnan(corr), np.nan, p_value)
+
+def correlation_result(corr, n, columns):
+    """Correlation and p-value matrices labelled by column, with the users they cover"""
+    return {
+        'n': int(n),
+        'corr': pd.DataFrame(corr, index=columns, columns=columns),
+        'p_value': pd.DataFrame(correlation_pvalues(corr, n), index=columns, columns=columns)
+    }
+
+# ================================================================================
+# SIGNIFICANCE - FALSE DISCOVERY RATE OVER THE PAIRS SHOWN
+# ================================================================================
+
+def fdr_bh(p_values):
+    """Benjamini-Hochberg adjusted p-values, NaN p-values left out of the family"""
+    p_values = np.asarray(p_values, dtype=np.float64)
+    q_values = np.full_like(p_values, np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    if len(valid) == 0:
+        return q_values
+    order = valid[np.argsort(p_values[valid])]
+    scaled = p_values[order] * len(order) / np.arange(1, len(order) + 1)
+    # Each q-value is the smallest scaled p-value at its rank or above
+    q_values[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1.0)
+    return q_values
+
+def correlation_pairs(result, columns, alpha=FDR_ALPHA):
+    """One row per pair of columns with r, p-value and FDR q-value, strongest first"""
+    corr = result['corr'].loc[columns, columns].to_numpy()
+    p_value = result['p_value'].loc[columns, columns].to_numpy()
+    i, j = np.triu_indices(len(columns), k=1)
+    q_value = fdr_bh(p_value[i, j])
+    pairs = pd.DataFrame({
+        'x': np.asarray(columns)[i],
+        'y': np.asarray(columns)[j],
+        'r': corr[i, j],
+        'p_value': p_value[i, j],
+        'q_value': q_value,
+        'significant': q_value < alpha
+    })
+    return pairs.iloc[np.argsort(-np.abs(pairs['r'].to_numpy()), kind='stable')].reset_index(drop=True)
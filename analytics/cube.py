@@ -0,0 +1,218 @@
+# ================================================================================
+# 🧊 ANALYTICS CUBE — PRE-AGGREGATED CELLS FOR THE CATEGORICAL BREAKDOWNS
+# ================================================================================
+# Description: Count, sum, sum-of-squares and cross-product measures per
+#              combination of the sidebar filter dimensions and each chart's
+#              own dimensions, built once per dataset version. Tab aggregates
+#              read cells instead of users: under any selectbox filter with
+#              the full screen time range the cells come from the cube, and a
+#              narrowed range or platform filter builds the same cells from
+#              the filtered rows.
+# ================================================================================
+
+import numpy as np
+import pandas as pd
+
+from .filters import FILTER_COLUMNS, selected_values
+from .aggregates import CORRELATION_COLUMNS, RADAR_METRICS
+from .correlation import SURVEY_NUMERIC_COLUMNS
+
+CUBE_CHUNK_ROWS = 50_000
+
+# Derived row dimensions and flags used by individual charts
+SCREEN_BINS = [0, 2, 4, 6, 8, 15]
+SCREEN_BIN_LABELS = ['0-2', '2-4', '4-6', '6-8', '8+']
+SCREEN_BANDS = ['<3', '3-6', '6+']
+
+CORE_METRICS = list(dict.fromkeys(
+    CORRELATION_COLUMNS + RADAR_METRICS +
+    ['age', 'mental_health_risk_score', 'night_usage_hours', 'night_usage', 'poor_sleep']
+))
+
+# Extra dimensions and measures per cube - every cube also has the filter dimensions
+CUBE_SPECS = {
+    'core': {
+        'dims': [],
+        'metrics': CORE_METRICS,
+        'cross': CORRELATION_COLUMNS + ['night_usage_hours'],
+        'extent': ['night_usage_hours'],
+        'platforms': True,
+    },
+    'education': {'dims': ['education']},
+    'occupation': {'dims': ['occupation', 'screen_time_category']},
+    'screen_category': {'dims': ['screen_time_category']},
+    'state': {
+        'dims': ['state'],
+        'metrics': ['mental_health_risk_score', 'avg_daily_screen_time_hrs', 'anxiety_score'],
+    },
+    'city': {'dims': ['city', 'latitude', 'longitude'], 'metrics': ['mental_health_risk_score']},
+    'sleep_screen': {'dims': ['sleep_quality_category', 'screen_bin'], 'metrics': ['anxiety_score']},
+    'screen_band': {'dims': ['screen_band'], 'metrics': ['anxiety_score']},
+    # Sums and cross-products of every numeric survey column, for any correlation matrix
+    'correlation': {
+        'dims': [],
+        'metrics': SURVEY_NUMERIC_COLUMNS,
+        'cross': SURVEY_NUMERIC_COLUMNS,
+    },
+}
+
+# ================================================================================
+# BUILDING
+# ================================================================================
+
+def _with_derived_columns(df):
+    """Add the binned screen time dimensions and the poor sleep flag"""
+    screen = df['avg_daily_screen_time_hrs']
+    return df.assign(
+        screen_bin=pd.cut(screen, bins=SCREEN_BINS, labels=SCREEN_BIN_LABELS),
+        screen_band=pd.Categorical(
+            np.where(screen < 3, '<3', np.where(screen >= 6, '6+', '3-6')), categories=SCREEN_BANDS
+        ),
+        poor_sleep=df['sleep_quality_category'].isin(['Poor', 'Very Poor'])
+    )
+
+def _row_measures(df, spec, platform_names):
+    """Per-row measure columns whose per-cell sums (or min / max) make up the cube"""
+    measures = {'count': np.ones(len(df), dtype=np.int32)}
+    values = {}
+    for metric in spec.get('metrics', []):
+        values[metric] = df[metric].to_numpy(dtype=np.float64)
+        measures[f"{metric}:sum"] = values[metric]
+        measures[f"{metric}:sq"] = values[metric] * values[metric]
+
+    for metric in spec.get('extent', []):
+        measures[f"{metric}:min"] = values[metric]
+        measures[f"{metric}:max"] = values[metric]
+
+    if spec.get('platforms'):
+        masks = df['platform_mask'].to_numpy()
+        bits = ((masks[:, None] >> np.arange(len(platform_names), dtype=masks.dtype)) & 1).astype(np.int32)
+        for i, a in enumerate(platform_names):
+            for j in range(i, len(platform_names)):
+                measures[f"co:{a}:{platform_names[j]}"] = bits[:, i] & bits[:, j]
+        n_platforms = bits.sum(axis=1)
+        for k in range(len(platform_names) + 1):
+            measures[f"platforms:{k}"] = (n_platforms == k).astype(np.int32)
+
+    return pd.DataFrame(measures, index=df.index)
+
+def _cross_sums(df, cross, codes, n_cells):
+    """Per-cell sums of the product of every pair of cross metrics, cells numbered by codes
+
+    Rows are sorted by cell once and each metric's products with the metrics
+    after it are summed per cell in one reduceat, rather than materialising
+    a product column per pair and row. Metrics are laid out one per row so
+    every cell is a contiguous run.
+    """
+    order = np.argsort(codes, kind='stable')
+    # Like the grouped sums, missing values add nothing
+    values = np.ascontiguousarray(np.nan_to_num(df[cross].to_numpy(dtype=np.float64)[order]).T)
+    starts = np.searchsorted(codes[order], np.arange(n_cells))
+    sums = {}
+    for i, a in enumerate(cross[:-1]):
+        products = np.add.reduceat(values[i + 1:] * values[i], starts, axis=1)
+        for j, b in enumerate(cross[i + 1:]):
+            sums[f"{a}*{b}"] = products[j]
+    return pd.DataFrame(sums)
+
+def _fold(grouped, columns, products=None):
+    """Sum every measure per cell except the extents, which take their min / max
+
+    products holds per-cell sums computed apart from the grouped measures,
+    one row per cell in group order.
+    """
+    sums = [c for c in columns if not c.endswith((':min', ':max'))]
+    parts = [grouped[sums].sum()]
+    if products is not None:
+        parts.append(products.set_axis(parts[0].index))
+    mins = [c for c in columns if c.endswith(':min')]
+    maxs = [c for c in columns if c.endswith(':max')]
+    if mins:
+        parts.append(grouped[mins].min())
+    if maxs:
+        parts.append(grouped[maxs].max())
+    return pd.concat(parts, axis=1) if len(parts) > 1 else parts[0]
+
+def build_cube_cells(df, spec, platform_names=()):
+    """Fold rows into one cell per observed dimension combination, chunk by chunk"""
+    dims = FILTER_COLUMNS + spec['dims']
+    partials = []
+    for start in range(0, max(len(df), 1), CUBE_CHUNK_ROWS):
+        chunk = _with_derived_columns(df.iloc[start:start + CUBE_CHUNK_ROWS])
+        measures = _row_measures(chunk, spec, platform_names)
+        grouped = pd.concat([chunk[dims], measures], axis=1).groupby(dims, observed=True)
+        products = None
+        if spec.get('cross'):
+            products = _cross_sums(chunk, spec['cross'], grouped.ngroup().to_numpy(), grouped.ngroups)
+        partials.append(_fold(grouped, measures.columns, products))
+
+    # A cell can straddle chunks, so fold the partial cells once more
+    cells = partials[0]
+    if len(partials) > 1:
+        cells = _fold(pd.concat(partials).groupby(level=dims, observed=True), cells.columns)
+    return cells.reset_index()
+
+def build_cubes(main_df, platform_names=()):
+    """Build every cube of CUBE_SPECS for the full survey table"""
+    screen = main_df['avg_daily_screen_time_hrs']
+    return {
+        name: {
+            'spec': spec,
+            'platform_names': tuple(platform_names),
+            'cells': build_cube_cells(main_df, spec, tuple(platform_names)),
+            'screen_range': (screen.min(), screen.max()),
+        }
+        for name, spec in CUBE_SPECS.items()
+    }
+
+def extend_cubes(cubes, main_df, start):
+    """Fold the rows of main_df from start on into cubes built over the rows before them"""
+    added = main_df.iloc[start:]
+    screen = main_df['avg_daily_screen_time_hrs']
+    extended = {}
+    for name, cube in cubes.items():
+        dims = FILTER_COLUMNS + cube['spec']['dims']
+        cells = pd.concat(
+            [cube['cells'], build_cube_cells(added, cube['spec'], cube['platform_names'])], ignore_index=True
+        )
+
+        # Appended rows may have added categories - line both sides up on the new ones
+        for col in dims:
+            if col in main_df.columns and isinstance(main_df[col].dtype, pd.CategoricalDtype):
+                cells[col] = cells[col].astype(main_df[col].dtype)
+        measures = [c for c in cells.columns if c not in dims]
+        extended[name] = dict(
+            cube,
+            cells=_fold(cells.groupby(dims, observed=True), measures).reset_index(),
+            screen_range=(screen.min(), screen.max())
+        )
+    return extended
+
+# ================================================================================
+# QUERYING
+# ================================================================================
+
+def cube_covers(cube, selections, screen_range):
+    """Whether the cube alone answers this filter state"""
+    # Only filters on the cube's own dimensions can be read from its cells
+    if any(col not in FILTER_COLUMNS and selected_values(value) is not None for col, value in selections.items()):
+        return False
+    screen_min, screen_max = cube['screen_range']
+    low, high = (type(screen_min)(bound) for bound in screen_range)
+    return low <= screen_min and high >= screen_max
+
+def query_cube(cube, selections):
+    """Cells matching the selected filter values"""
+    cells = cube['cells']
+    mask = np.ones(len(cells), dtype=bool)
+    for col in FILTER_COLUMNS:
+        values = selected_values(selections.get(col))
+        if values is not None:
+            mask &= cells[col].isin(values).to_numpy()
+    return cells[mask]
+
+def select_cube_cells(cube, selections, screen_range, filtered_df):
+    """Cells for the current filter state - from the cube when it covers it, else from the rows"""
+    if cube_covers(cube, selections, screen_range):
+        return query_cube(cube, selections)
+    return build_cube_cells(filtered_df, cube['spec'], cube['platform_names'])
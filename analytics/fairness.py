@@ -0,0 +1,127 @@
+# ================================================================================
+# ⚖️ ANALYTICS FAIRNESS — MULTI-GROUP STATISTICS WITH BOOTSTRAP INTERVALS
+# ================================================================================
+# Description: Counts, means, standard deviations and disparity ratios of a
+#              metric across every value of several protected attributes at
+#              once. Users are mapped into one sparse user x group indicator
+#              matrix, so all groups are summed in a single product, and the
+#              bootstrap replicates are Poisson-weighted products of the same
+#              matrix instead of a loop over resamples.
+# ================================================================================
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+PROTECTED_ATTRIBUTES = ['gender', 'age_group', 'region', 'state', 'income_bracket', 'education']
+FAIRNESS_METRIC = 'mental_health_risk_score'
+BOOTSTRAP_REPLICATES = 200
+# Weights drawn per product - a batch of replicates x users stays within this
+# many elements, whatever the number of users
+BOOTSTRAP_BATCH_ELEMENTS = 1 << 22
+CONFIDENCE_LEVEL = 0.95
+
+def group_indicator(df, attributes):
+    """Sparse users x groups 0/1 matrix over every value of every attribute, with the group labels"""
+    rows, cols, labels = [], [], []
+    for attribute in attributes:
+        codes, uniques = pd.factorize(df[attribute], sort=True)
+        valid = codes >= 0
+        rows.append(np.flatnonzero(valid))
+        cols.append(codes[valid] + len(labels))
+        labels += [(attribute, value) for value in uniques]
+    
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float64), (rows, cols)), shape=(len(df), len(labels))
+    )
+    return matrix, pd.MultiIndex.from_tuples(labels, names=['attribute', 'group'])
+
+def _bootstrap_means(values, indicator, replicates, seed):
+    """Replicates x groups matrix of group means under Poisson(1) row weights"""
+    rng = np.random.default_rng(seed)
+    # Transposed once so each batch is a sparse x dense product; weights are
+    # small integers, exact in float32, while the weighted values keep float64
+    indicator_t = indicator.T.tocsr()
+    indicator_t32 = indicator_t.astype(np.float32)
+    batch = max(1, BOOTSTRAP_BATCH_ELEMENTS // max(len(values), 1))
+    means = []
+    for start in range(0, replicates, batch):
+        weights = rng.poisson(1.0, size=(len(values), min(batch, replicates - start))).astype(np.float32)
+        counts = indicator_t32 @ weights
+        sums = indicator_t @ (weights * values[:, None])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means.append((sums / counts).T)
+    return np.vstack(means)
+
+def _disparity_ratio(means, start, end):
+    """Highest over lowest group mean within one attribute's [start, end) group columns"""
+    block = means[..., start:end]
+    return np.nanmax(block, axis=-1) / np.nanmin(block, axis=-1)
+
+def group_statistics(df, attributes=PROTECTED_ATTRIBUTES, metric=FAIRNESS_METRIC,
+                     replicates=BOOTSTRAP_REPLICATES, level=CONFIDENCE_LEVEL, seed=0):
+    """Per-group and per-attribute statistics of metric over every protected attribute
+    
+    Returns {'groups': one row per (attribute, group) with count, mean, std,
+    a bootstrap confidence interval of the mean and the ratio to the overall
+    mean, 'attributes': one row per attribute with the highest / lowest group
+    mean ratio, its interval and the spread of group means}. Seeded, so the
+    same rows always give the same intervals.
+    """
+    attributes = [a for a in attributes if a in df.columns]
+    values = df[metric].to_numpy(dtype=np.float64)
+    valid = np.isfinite(values)
+    df, values = df[valid], values[valid]
+    if len(df) == 0 or not attributes:
+        return {'groups': pd.DataFrame(), 'attributes': pd.DataFrame()}
+    
+    # One product sums counts, totals and squares of every group at once
+    indicator, labels = group_indicator(df, attributes)
+    count, total, sq = np.vstack([np.ones_like(values), values, values * values]) @ indicator
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        var = (sq - total * total / count) / (count - 1)
+    std = np.sqrt(np.where(count > 1, np.maximum(var, 0.0), np.nan))
+    
+    # A group can get no weight in a replicate - its NaN mean is left out
+    boot = _bootstrap_means(values, indicator, replicates, seed)
+    tail = (1 - level) / 2 * 100
+    with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        ci_low, ci_high = np.nanpercentile(boot, [tail, 100 - tail], axis=0)
+    
+    groups = pd.DataFrame({
+        'count': count.astype(np.int64),
+        'mean': mean,
+        'std': std,
+        'ci_low': ci_low,
+        'ci_high': ci_high,
+        'ratio_to_overall': mean / values.mean()
+    }, index=labels).reset_index()
+    
+    # Disparity per attribute, on the point estimates and on every replicate -
+    # each attribute's groups are contiguous columns
+    summary = []
+    sizes = groups['attribute'].value_counts(sort=False)
+    end = 0
+    for attribute in attributes:
+        start, end = end, end + int(sizes.get(attribute, 0))
+        if start == end:
+            continue
+        with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+            warnings.simplefilter('ignore', RuntimeWarning)
+            low, high = np.nanpercentile(_disparity_ratio(boot, start, end), [tail, 100 - tail])
+        summary.append({
+            'attribute': attribute,
+            'groups': end - start,
+            'lowest_mean': np.nanmin(mean[start:end]),
+            'highest_mean': np.nanmax(mean[start:end]),
+            'disparity_ratio': _disparity_ratio(mean, start, end),
+            'ratio_ci_low': low,
+            'ratio_ci_high': high,
+            'mean_spread': pd.Series(mean[start:end]).std()
+        })
+    return {'groups': groups, 'attributes': pd.DataFrame(summary)}
@@ -0,0 +1,254 @@
+# ================================================================================
+# 🎛️ ANALYTICS FILTERS — SIDEBAR FILTER INDEX & DAILY USER JOIN
+# ================================================================================
+# Description: Index structures built once per dataset version that turn the
+#              sidebar state into survey row ids and daily table rows
+# ================================================================================
+
+import numpy as np
+import pandas as pd
+
+# ================================================================================
+# FILTER ENGINE - PREDICATES COMPILED OVER INTEGER-CODED COLUMNS
+# ================================================================================
+
+# Filters on the cube dimensions - any other active filter builds cells from rows
+FILTER_COLUMNS = ['age_group', 'gender', 'region', 'primary_platform', 'risk_category']
+EXTRA_FILTER_COLUMNS = ['state', 'occupation', 'income_bracket', 'education']
+# "Uses any of platforms X, Y" filter, answered from the platforms_used bitmask
+PLATFORM_FILTER = 'uses_platform'
+# Inclusive (low, high) range filters besides the screen time slider
+RANGE_FILTER_COLUMNS = ['survey_date', 'night_usage_hours']
+SCREEN_COLUMN = 'avg_daily_screen_time_hrs'
+FILTER_KEYS = FILTER_COLUMNS + EXTRA_FILTER_COLUMNS + [PLATFORM_FILTER] + RANGE_FILTER_COLUMNS
+
+def selected_values(value):
+    """The values a filter selects - None for 'All' or an empty multi-select"""
+    if value is None or (isinstance(value, str) and value == 'All'):
+        return None
+    values = [value] if isinstance(value, str) or np.isscalar(value) else list(value)
+    return values or None
+
+def _column_codes(series):
+    """Integer codes and categories of a column - views of a categorical's codes"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes, pd.Index(uniques)
+
+def build_filter_index(df, platform_names=()):
+    """Index the coded filter columns, the platform bitmask and the range columns with their extents"""
+    index = {'n_rows': len(df), 'codes': {}, 'categories': {}, 'ranges': {}}
+    for col in FILTER_COLUMNS + EXTRA_FILTER_COLUMNS:
+        if col in df.columns:
+            index['codes'][col], index['categories'][col] = _column_codes(df[col])
+    
+    if platform_names and 'platform_mask' in df.columns:
+        index['platform_mask'] = df['platform_mask'].to_numpy()
+        index['platform_bits'] = {name: 1 << bit for bit, name in enumerate(platform_names)}
+    
+    # Keep the stored dtype so slider bounds compare at the column's precision
+    for col in [SCREEN_COLUMN] + RANGE_FILTER_COLUMNS:
+        if col in df.columns:
+            values = df[col].to_numpy()
+            index['ranges'][col] = (values, values.min(), values.max()) if len(values) else (values, None, None)
+    return index
+
+def _range_predicate(index, col, bounds):
+    """Range predicate of an inclusive (low, high), or None when it spans every row"""
+    values, lowest, highest = index['ranges'][col]
+    if lowest is None:
+        return None
+    convert = pd.Timestamp if np.issubdtype(values.dtype, np.datetime64) else values.dtype.type
+    low, high = (convert(bound) for bound in bounds)
+    if low <= lowest and high >= highest:
+        return None
+    if convert is pd.Timestamp:
+        low, high = low.to_datetime64(), high.to_datetime64()
+    return ('range', col, (low, high))
+
+def compile_filters(index, selections, screen_range):
+    """Compile the filter spec into predicates over the index's coded columns
+    
+    Multi-value selections become one boolean lookup table per column indexed
+    by code, platform selections one bitmask that any bit may match, and
+    ranges that still span every row are dropped.
+    """
+    predicates = []
+    for col, value in selections.items():
+        values = selected_values(value)
+        if values is None or col in RANGE_FILTER_COLUMNS:
+            continue
+        if col == PLATFORM_FILTER:
+            bits = sum(index.get('platform_bits', {}).get(name, 0) for name in set(values))
+            predicates.append(('any_bits', PLATFORM_FILTER, bits))
+            continue
+        
+        # The extra slot stays False, so missing values (code -1) never match
+        categories = index['categories'][col]
+        lookup = np.zeros(len(categories) + 1, dtype=bool)
+        positions = categories.get_indexer(values)
+        lookup[positions[positions >= 0]] = True
+        if not lookup[:-1].all():
+            predicates.append(('in', col, lookup))
+    
+    ranges = [(SCREEN_COLUMN, screen_range)] + [
+        (col, selections[col]) for col in RANGE_FILTER_COLUMNS if selected_values(selections.get(col)) is not None
+    ]
+    for col, bounds in ranges:
+        if col in index['ranges']:
+            predicate = _range_predicate(index, col, bounds)
+            if predicate is not None:
+                predicates.append(predicate)
+    return predicates
+
+def evaluate_predicates(index, predicates):
+    """Sorted row ids matching every predicate, in one mask pass per predicate"""
+    mask = None
+    for kind, col, arg in predicates:
+        if kind == 'in':
+            matches = arg[index['codes'][col]]
+        elif kind == 'any_bits':
+            matches = (index['platform_mask'] & arg) != 0 if arg else np.zeros(index['n_rows'], dtype=bool)
+        else:
+            values = index['ranges'][col][0]
+            matches = (values >= arg[0]) & (values <= arg[1])
+        if mask is None:
+            mask = matches
+        else:
+            mask &= matches
+    return np.arange(index['n_rows']) if mask is None else np.flatnonzero(mask)
+
+def query_filter_index(index, selections, screen_range):
+    """Return the sorted row ids matching the filter spec and screen time range"""
+    return evaluate_predicates(index, compile_filters(index, selections, screen_range))
+
+def apply_filters(main_df, index, selections, screen_range):
+    """Return the filtered survey rows and their row ids"""
+    row_ids = query_filter_index(index, selections, screen_range)
+    return drop_unused_categories(main_df.take(row_ids)), row_ids
+
+def drop_unused_categories(df):
+    """Drop categories with no rows left so counts and charts skip empty groups"""
+    for col in df.select_dtypes(include='category').columns:
+        # A bincount of the codes is far cheaper than rebuilding every column
+        codes = df[col].cat.codes.to_numpy()
+        used = np.bincount(codes[codes >= 0], minlength=len(df[col].cat.categories))
+        if not used.all():
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+def _filter_key_value(col, value):
+    """Hashable, order-independent form of one filter's selection"""
+    values = selected_values(value)
+    if values is None:
+        return 'All'
+    if col in RANGE_FILTER_COLUMNS:
+        return tuple(str(bound) for bound in values)
+    return tuple(sorted(str(v) for v in values))
+
+def make_filter_key(selections, screen_range):
+    """Normalize the sidebar state into a hashable cache key"""
+    return tuple(_filter_key_value(col, selections.get(col)) for col in FILTER_KEYS) + (
+        round(float(screen_range[0]), 2), round(float(screen_range[1]), 2)
+    )
+
+def platform_membership(masks, platform_names):
+    """Expand platform bitmasks into a users x platforms 0/1 matrix"""
+    bits = np.arange(len(platform_names), dtype=masks.dtype)
+    matrix = ((masks[:, None] >> bits) & 1).astype(np.uint8)
+    return pd.DataFrame(matrix, columns=list(platform_names))
+
+# ================================================================================
+# USER JOIN INDEX - USER CODES INTO THE DAILY MONTH PARTITIONS
+# ================================================================================
+
+# Above this share of all users a mask over the daily rows beats gathering slices
+MASK_USER_SHARE = 0.5
+
+def _user_offsets(part, n_users):
+    """[start, end) rows of every user code in a user-sorted partition"""
+    return np.searchsorted(part['user_id'].cat.codes.to_numpy(), np.arange(n_users + 1))
+
+def build_user_join_index(main_df, daily_partitions):
+    """Map survey rows to the daily user codes and each code to its rows in every month partition
+    
+    Every partition shares one user_id dtype and stays sorted by user code,
+    so a user's rows in a month are one contiguous slice.
+    """
+    parts = list(daily_partitions.values())
+    categories = parts[0]['user_id'].cat.categories if parts else pd.Index([])
+    return {
+        'user_codes': categories.get_indexer(main_df['user_id']),
+        'offsets': {month: _user_offsets(part, len(categories)) for month, part in daily_partitions.items()},
+        'n_users': len(categories),
+        'n_rows': len(main_df)
+    }
+
+def gather_user_rows(offsets, user_codes):
+    """Concatenate the contiguous row ranges of the given sorted user codes"""
+    starts = offsets[user_codes]
+    lengths = offsets[user_codes + 1] - starts
+    if len(lengths) == 0:
+        return np.array([], dtype=np.intp)
+    
+    # Shift a running counter so each slice starts at its own offset
+    slice_ends = np.cumsum(lengths)
+    return np.arange(slice_ends[-1]) - np.repeat(slice_ends - lengths - starts, lengths)
+
+def _month_bounds(date_range):
+    """First and last month a date range touches"""
+    return tuple(np.datetime64(pd.Timestamp(bound), 'M') for bound in date_range)
+
+def select_daily_rows(join_index, row_ids, daily_partitions, date_range=None, columns=None):
+    """Return the per-user date rows of the filtered survey users within date_range
+    
+    Only the month partitions overlapping the range and only the given
+    columns are read, so mapped partitions outside it are never paged in.
+    Within a month the selected users' row slices are gathered, unless most
+    users are selected and one mask over the partition is cheaper.
+    """
+    if date_range is not None:
+        first, last = _month_bounds(date_range)
+        low, high = (np.datetime64(pd.Timestamp(bound), 'ns') for bound in date_range)
+    
+    # No user selection when no filter is set
+    user_codes = user_mask = None
+    if len(row_ids) < join_index['n_rows']:
+        user_codes = join_index['user_codes'][row_ids]
+        user_codes = np.unique(user_codes[user_codes >= 0])
+        if len(user_codes) > MASK_USER_SHARE * join_index['n_users']:
+            user_mask = np.zeros(join_index['n_users'], dtype=bool)
+            user_mask[user_codes] = True
+    
+    selected = []
+    for month, part in sorted(daily_partitions.items()):
+        if date_range is not None and not first <= np.datetime64(month, 'M') <= last:
+            continue
+        rows = keep = None
+        if user_mask is not None:
+            keep = user_mask[part['user_id'].cat.codes.to_numpy()]
+        elif user_codes is not None:
+            offsets = join_index['offsets'].get(month)
+            if offsets is None:
+                offsets = _user_offsets(part, join_index['n_users'])
+            rows = gather_user_rows(offsets, user_codes)
+        
+        # Only the boundary months of the range need their dates checked
+        if date_range is not None and np.datetime64(month, 'M') in (first, last):
+            dates = part['date'].to_numpy()
+            if rows is not None:
+                rows = rows[(dates[rows] >= low) & (dates[rows] <= high)]
+            else:
+                in_range = (dates >= low) & (dates <= high)
+                keep = in_range if keep is None else keep & in_range
+        # A gather copies only its rows, a mask most of them - narrow whichever copies less first
+        if rows is not None:
+            part = part.take(rows)
+        part = part if columns is None else part[columns]
+        selected.append(part if keep is None else part[keep])
+    
+    if not selected:
+        empty = next(iter(daily_partitions.values()), pd.DataFrame(columns=columns)).iloc[:0]
+        return empty if columns is None else empty[columns]
+    return pd.concat(selected, ignore_index=True)
@@ -0,0 +1,100 @@
+# ================================================================================
+# 🔄 ANALYTICS INGEST — LIVE DATASET WITH INCREMENTAL REFRESH
+# ================================================================================
+# Description: A process-wide dataset holding the loaded tables with the filter
+#              index and cubes built over them. When the data version changes
+#              because rows were only appended to the sources, just those rows
+#              are parsed, the tables and cubes are extended by them and the
+#              rolling daily statistics are stepped on from the first changed
+#              month. Any other change - a rewritten source or platform file -
+#              falls back to a full reload with everything rebuilt. Readers
+#              take one immutable snapshot per rerun.
+# ================================================================================
+
+import threading
+
+from .loader import get_data_version, load_tables, refresh_tables, daily_record_count, daily_date_range
+from .filters import build_filter_index
+from .cube import build_cubes, extend_cubes
+from .temporal import month_date_sums, population_date_sums, temporal_stats, extend_temporal_stats
+
+def _daily_statistics(partitions, previous=None):
+    """Per-date sums of all users per month and their rolling statistics
+    
+    Against a previous snapshot only changed months are summed again, and the
+    statistics are restated from the first of them.
+    """
+    if previous is None or set(previous['daily_date_sums']) - set(partitions):
+        month_sums = month_date_sums(partitions)
+        return month_sums, temporal_stats(population_date_sums(month_sums))
+    
+    month_sums = month_date_sums(partitions, previous['daily_date_sums'])
+    changed = sorted(month for month in month_sums if previous['daily_date_sums'].get(month) is not month_sums[month])
+    if not changed:
+        return month_sums, previous['temporal_stats']
+    return month_sums, extend_temporal_stats(
+        previous['temporal_stats'], population_date_sums(month_sums, changed[0])
+    )
+
+def _snapshot(version, tables, sources, previous=None):
+    """Tables of one data version with the indexes and cubes built over them
+    
+    previous is the snapshot these tables only appended rows to, if any -
+    after a full reload the cubes and daily statistics are rebuilt.
+    """
+    main_df = tables['main']
+    platform_names = tuple(tables['platform']['platform_name'])
+    
+    # The index reads the coded columns of the new table as they are; appended
+    # survey rows only extend the cubes of the previous snapshot
+    filter_index = build_filter_index(main_df, platform_names)
+    if previous is not None and previous['platform_names'] == platform_names:
+        start = len(previous['tables']['main'])
+        cubes = extend_cubes(previous['cubes'], main_df, start) if len(main_df) > start else previous['cubes']
+    else:
+        cubes = build_cubes(main_df, platform_names)
+    daily_date_sums, daily_stats = _daily_statistics(tables['daily'], previous)
+    
+    return {
+        'version': version,
+        'tables': tables,
+        'sources': sources,
+        'platform_names': platform_names,
+        'filter_index': filter_index,
+        'cubes': cubes,
+        'daily_records': daily_record_count(tables['daily']),
+        'daily_range': daily_date_range(tables['daily']),
+        'daily_date_sums': daily_date_sums,
+        'temporal_stats': daily_stats,
+    }
+
+def open_dataset(data_dir='.', shared=True):
+    """Load the dataset and build its indexes, once per process"""
+    version = get_data_version(data_dir)
+    tables, sources = load_tables(data_dir, shared, version)
+    return {
+        'data_dir': data_dir,
+        'shared': shared,
+        'current': _snapshot(version, tables, sources),
+        'lock': threading.Lock()
+    }
+
+def refresh_dataset(dataset):
+    """Return the dataset's snapshot for the current data version, ingesting appended rows first
+    
+    Sources rewritten rather than appended to are reloaded in full.
+    """
+    version = get_data_version(dataset['data_dir'])
+    snapshot = dataset['current']
+    if snapshot['version'] == version:
+        return snapshot
+    
+    # One session ingests, the others wait and reuse its snapshot
+    with dataset['lock']:
+        snapshot = dataset['current']
+        if snapshot['version'] != version:
+            tables, sources, appended = refresh_tables(
+                dataset['data_dir'], version, snapshot['tables'], snapshot['sources'], dataset['shared']
+            )
+            dataset['current'] = _snapshot(version, tables, sources, snapshot if appended else None)
+        return dataset['current']
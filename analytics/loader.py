@@ -0,0 +1,779 @@
+# ================================================================================
+# 📂 ANALYTICS LOADER — PARQUET CACHE, DAILY PRE-AGGREGATION & DATASET VERSION
+# ================================================================================
+# Description: Reads the survey, daily usage and platform files into typed
+#              tables and publishes them once per node as memory-mapped Arrow
+#              files every server process attaches, the daily sums as one
+#              file per month. Rows appended to the sources later are parsed
+#              on their own and folded in. Nothing here depends on Streamlit.
+# ================================================================================
+
+import io
+import os
+import glob
+import json
+import shutil
+import hashlib
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows - publishing simply isn't serialised
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+# ================================================================================
+# COLUMNAR CACHE - TYPED PARQUET COPIES OF THE CSV FILES
+# ================================================================================
+
+CACHE_DIR = '.data_cache'
+CACHE_FORMAT_VERSION = 6
+
+SURVEY_CATEGORICAL_COLUMNS = [
+    'age_group', 'gender', 'education', 'occupation', 'income_bracket',
+    'relationship_status', 'state', 'region', 'city', 'primary_platform',
+    'primary_purpose', 'screen_time_category', 'anxiety_category',
+    'depression_category', 'sleep_quality_category', 'bmi_category',
+    'risk_category', 'data_quality', 'cluster_label'
+]
+
+# ================================================================================
+# COMPACT DTYPES - SMALLEST EXACT TYPE PER COLUMN
+# ================================================================================
+
+# Strings with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+BOOL_STRINGS = {'True': True, 'False': False, 'true': True, 'false': False}
+
+# Parsed vs compact footprint per source file, filled when a cache is built or read
+_memory_report = {}
+
+def memory_footprint(df):
+    """Deep memory usage of a DataFrame in bytes"""
+    return int(df.memory_usage(deep=True).sum())
+
+def recorded_decimals(values, max_decimals=4):
+    """Number of decimals a float column is recorded with"""
+    for d in range(max_decimals):
+        if np.allclose(values, np.round(values, d), equal_nan=True):
+            return d
+    return max_decimals
+
+def _float32_is_exact(values):
+    """Whether float32 still rounds back to every recorded value"""
+    decimals = recorded_decimals(values)
+    restored = np.round(values.astype(np.float32).astype(np.float64), decimals)
+    return np.array_equal(restored, values, equal_nan=True)
+
+def compact_dtypes(df, categorical_columns=()):
+    """Downcast integers and floats, parse boolean strings and categorise repetitive text"""
+    for col in df.columns:
+        series = df[col]
+        if col in categorical_columns:
+            df[col] = series.astype('category')
+        elif pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        elif pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            if _float32_is_exact(series.to_numpy()):
+                df[col] = series.astype(np.float32)
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            uniques = series.dropna().unique()
+            if len(uniques) and not series.isna().any() and set(map(str, uniques)) <= BOOL_STRINGS.keys():
+                df[col] = series.astype(str).map(BOOL_STRINGS).astype(bool)
+            elif len(uniques) <= CATEGORY_MAX_RATIO * len(series):
+                df[col] = series.astype('category')
+    return df
+
+def append_rows(table, rows):
+    """Append rows to a compact table, widening numeric dtypes and extending categories"""
+    columns = {}
+    for col in table.columns:
+        old, new = table[col], rows[col]
+        if isinstance(old.dtype, pd.CategoricalDtype):
+            # New values are added after the existing categories so old codes stay valid
+            values = new.cat.categories if isinstance(new.dtype, pd.CategoricalDtype) else new.dropna().unique()
+            added = pd.Index(values).difference(old.cat.categories)
+            dtype = pd.CategoricalDtype(old.cat.categories.append(added), ordered=old.cat.ordered)
+            old = pd.Series(pd.Categorical.from_codes(old.cat.codes, dtype=dtype))
+            new = new.astype(dtype)
+        elif isinstance(new.dtype, pd.CategoricalDtype):
+            new = new.astype(new.cat.categories.dtype)
+        columns[col] = pd.concat([old, new], ignore_index=True)
+    return pd.DataFrame(columns)
+
+def merge_appended_rows(tables, appended):
+    """Append the rows parsed from the end of a CSV to its table"""
+    return {'table': append_rows(tables['table'], appended['table'])}
+
+def _record_footprint(csv_path, parsed_bytes, tables, appended=False):
+    """Remember the parsed and compact footprint of the tables built from a CSV
+    
+    With appended=True the tables hold rows appended to the CSV and their
+    footprint is added to the one already recorded.
+    """
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    entry = {
+        'parsed_bytes': int(parsed_bytes),
+        'compact_bytes': {table: memory_footprint(df) for table, df in tables.items()}
+    }
+    previous = _memory_report.get(name)
+    if appended and previous:
+        entry['parsed_bytes'] += previous['parsed_bytes']
+        for table, nbytes in previous['compact_bytes'].items():
+            entry['compact_bytes'][table] = entry['compact_bytes'].get(table, 0) + nbytes
+    _memory_report[name] = entry
+
+def get_memory_report():
+    """Return the parsed vs compact footprint of every loaded source file"""
+    return {name: dict(entry) for name, entry in _memory_report.items()}
+
+def _cache_paths(csv_path, tables):
+    """Return the parquet path per table and the metadata path caching a CSV file"""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    parquet_paths = {
+        table: os.path.join(CACHE_DIR, f"{name}.{table}.parquet") for table in tables
+    }
+    return parquet_paths, os.path.join(CACHE_DIR, f"{name}.meta.json")
+
+def _file_sha256(path, chunk_size=1 << 20):
+    """Hash a file in fixed-size chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _source_mark(csv_path):
+    """Size, mtime and hash of a CSV - what read_appended compares against"""
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _file_sha256(csv_path)}
+
+def read_appended(csv_path, mark, chunk_size=1 << 20):
+    """Return the rows appended to a CSV since mark was taken and the CSV's new mark
+    
+    The rows come as a buffer under the CSV's header, or None if nothing was
+    appended; a row still being written is left for the next call. Returns
+    None altogether when the CSV was changed in any other way.
+    """
+    with open(csv_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == mark['size'] and stat.st_mtime_ns == mark.get('mtime_ns'):
+            return None, mark
+        if stat.st_size < mark['size']:
+            return None
+        
+        # The bytes already read must be unchanged and end on a row boundary
+        digest = hashlib.sha256()
+        remaining = mark['size']
+        last = b'\n'
+        while remaining:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                return None
+            digest.update(chunk)
+            remaining -= len(chunk)
+            last = chunk[-1:]
+        if digest.hexdigest() != mark['sha256'] or last != b'\n':
+            return None
+        
+        data = f.read(stat.st_size - mark['size'])
+        data = data[:data.rfind(b'\n') + 1]
+        digest.update(data)
+        header = b''
+        if mark['size'] and data:
+            f.seek(0)
+            header = f.readline()
+    
+    new_mark = {'size': mark['size'] + len(data), 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    return (io.BytesIO(header + data) if data else None), new_mark
+
+def _read_meta(meta_path):
+    """Cache metadata of a CSV, or None when missing or from another format version"""
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('format_version') == CACHE_FORMAT_VERSION else None
+
+def _cache_is_valid(csv_path, parquet_paths, meta_path):
+    """Check cached parquet files against the size, mtime and hash of their CSV"""
+    if not all(os.path.exists(p) for p in parquet_paths.values()):
+        return False
+    
+    meta = _read_meta(meta_path)
+    if meta is None:
+        return False
+    if sorted(meta.get('tables', [])) != sorted(parquet_paths):
+        return False
+    
+    stat = os.stat(csv_path)
+    if meta.get('size') != stat.st_size:
+        return False
+    if meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    
+    # mtime changed (fresh checkout, copy) - fall back to the content hash
+    if meta.get('sha256') != _file_sha256(csv_path):
+        return False
+    
+    meta['mtime_ns'] = stat.st_mtime_ns
+    try:
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+    except OSError:
+        pass
+    return True
+
+def _write_cache(csv_path, tables, mark=None):
+    """Write parsed tables and the fingerprint of their source CSV to the cache
+    
+    mark is the fingerprint of the bytes the tables were read from, when it
+    is already known - otherwise the whole CSV is fingerprinted.
+    """
+    parquet_paths, meta_path = _cache_paths(csv_path, tables)
+    if mark is None:
+        mark = _source_mark(csv_path)
+    meta = {
+        'format_version': CACHE_FORMAT_VERSION,
+        'source': os.path.basename(csv_path),
+        'tables': sorted(tables),
+        **mark
+    }
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    if name in _memory_report:
+        meta['memory'] = _memory_report[name]
+    
+    # Write to temp files first so concurrent workers never read a partial cache
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_suffix = f".{os.getpid()}.tmp"
+        for table, df in tables.items():
+            df.to_parquet(parquet_paths[table] + tmp_suffix, index=False)
+        with open(meta_path + tmp_suffix, 'w') as f:
+            json.dump(meta, f)
+        for table in tables:
+            os.replace(parquet_paths[table] + tmp_suffix, parquet_paths[table])
+        os.replace(meta_path + tmp_suffix, meta_path)
+    except (OSError, ImportError, ValueError):
+        # Read-only filesystem or no parquet engine - serve the parsed CSV as is
+        pass
+
+def _load_footprint(csv_path, meta_path):
+    """Restore the footprint recorded when the cache was built"""
+    try:
+        with open(meta_path) as f:
+            memory = json.load(f).get('memory')
+    except (OSError, ValueError):
+        return
+    if memory:
+        _memory_report[os.path.splitext(os.path.basename(csv_path))[0]] = memory
+
+def read_cached(csv_path, builder, tables, merger=None):
+    """Read tables derived from a CSV via the parquet cache, rebuilding them when stale
+    
+    With a merger, a CSV that only had rows appended since it was cached is
+    not rebuilt: the appended rows are built on their own and merged in.
+    """
+    parquet_paths, meta_path = _cache_paths(csv_path, tables)
+    
+    if not os.path.exists(csv_path) and all(os.path.exists(p) for p in parquet_paths.values()):
+        return {table: pd.read_parquet(path) for table, path in parquet_paths.items()}
+    
+    if _cache_is_valid(csv_path, parquet_paths, meta_path):
+        try:
+            result = {table: pd.read_parquet(path) for table, path in parquet_paths.items()}
+            _load_footprint(csv_path, meta_path)
+            return result
+        except (OSError, ImportError, ValueError):
+            pass
+    
+    meta = _read_meta(meta_path)
+    if merger is not None and meta is not None and sorted(meta.get('tables', [])) == sorted(tables):
+        try:
+            appended = read_appended(csv_path, meta)
+            if appended is not None:
+                source, mark = appended
+                result = {table: pd.read_parquet(path) for table, path in parquet_paths.items()}
+                _load_footprint(csv_path, meta_path)
+                if source is not None:
+                    result = merger(result, builder(csv_path, source=source))
+                    _write_cache(csv_path, result, mark)
+                return result
+        except (OSError, ImportError, ValueError):
+            pass
+    
+    result = builder(csv_path)
+    _write_cache(csv_path, result)
+    return result
+
+def parse_csv(csv_path, date_columns=(), categorical_columns=(), source=None):
+    """Parse a CSV once into compact typed columns
+    
+    source is a buffer holding only rows appended to csv_path, see
+    read_appended.
+    """
+    df = pd.read_csv(csv_path if source is None else source)
+    parsed_bytes = memory_footprint(df)
+    
+    for col in date_columns:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    
+    df = compact_dtypes(df, [c for c in categorical_columns if c in df.columns])
+    _record_footprint(csv_path, parsed_bytes, {'table': df}, appended=source is not None)
+    return df
+
+def read_table(csv_path, date_columns=(), categorical_columns=()):
+    """Read a whole CSV as a typed table through the parquet cache"""
+    builder = lambda path, source=None: {
+        'table': parse_csv(path, date_columns, categorical_columns, source)
+    }
+    return read_cached(csv_path, builder, ['table'], merge_appended_rows)['table']
+
+# ================================================================================
+# DAILY USAGE - CHUNKED PRE-AGGREGATION
+# ================================================================================
+
+DAILY_METRICS = ['screen_time_hours', 'anxiety_score_daily', 'sleep_hours', 'mood_rating']
+DAILY_CHUNK_ROWS = 200_000
+DAILY_SUM_COLUMNS = [f"{m}_sum" for m in DAILY_METRICS] + [f"{m}_count" for m in DAILY_METRICS]
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def _daily_partial_sums(chunk, keys):
+    """Sum and count every daily metric per key combination"""
+    grouped = chunk.groupby(keys, observed=True)
+    partial = grouped[DAILY_METRICS].sum()
+    partial.columns = [f"{m}_sum" for m in DAILY_METRICS]
+    counts = grouped[DAILY_METRICS].count()
+    counts.columns = [f"{m}_count" for m in DAILY_METRICS]
+    partial = partial.join(counts)
+    partial['records'] = grouped.size()
+    return partial
+
+def aggregate_daily_usage(csv_path, chunksize=DAILY_CHUNK_ROWS, source=None):
+    """Fold the daily usage CSV chunk by chunk into per-user date sums"""
+    keys = ['user_id', 'date', 'day_of_week']
+    partials = []
+    parsed_bytes = 0
+    
+    reader = pd.read_csv(csv_path if source is None else source, chunksize=chunksize, usecols=keys + DAILY_METRICS)
+    for chunk in reader:
+        parsed_bytes += memory_footprint(chunk)
+        chunk['date'] = pd.to_datetime(chunk['date'], errors='coerce')
+        chunk = chunk.dropna(subset=['date'])
+        partials.append(_daily_partial_sums(chunk, keys))
+    
+    # A user-date can straddle two chunks, so fold the partial sums once more
+    user_date = pd.concat(partials).groupby(level=keys, observed=True).sum().reset_index()
+    user_date['user_id'] = user_date['user_id'].astype('category')
+    user_date['day_of_week'] = pd.Categorical(user_date['day_of_week'], categories=DAYS_OF_WEEK)
+    
+    tables = {'user_date': compact_dtypes(user_date)}
+    _record_footprint(csv_path, parsed_bytes, tables, appended=source is not None)
+    return tables
+
+def merge_daily_sums(tables, appended):
+    """Fold the per-user date sums of appended daily rows into the existing ones"""
+    keys = ['user_id', 'date', 'day_of_week']
+    df = append_rows(tables['user_date'], appended['user_date'])
+    codes = df['user_id'].cat.codes.to_numpy()
+    touched = np.isin(codes, np.unique(codes[len(tables['user_date']):]))
+    
+    # Only users with appended rows are summed again, in float64 so float32
+    # sums don't drift - compaction narrows them again if exact
+    regrouped = df[touched]
+    regrouped = regrouped.astype({col: np.float64 for col in regrouped.select_dtypes(include='float').columns})
+    regrouped = compact_dtypes(regrouped.groupby(keys, observed=True).sum().reset_index())
+    
+    # Keep each user's rows contiguous and in date order
+    df = append_rows(df[~touched], regrouped)
+    order = np.argsort(df['user_id'].cat.codes.to_numpy(), kind='stable')
+    return {'user_date': df.take(order).reset_index(drop=True)}
+
+def daily_means(agg_df, keys):
+    """Turn summed daily metrics into per-key means"""
+    sums = agg_df.groupby(keys, observed=True)[DAILY_SUM_COLUMNS].sum()
+    return pd.DataFrame({
+        m: sums[f"{m}_sum"] / sums[f"{m}_count"].replace(0, np.nan) for m in DAILY_METRICS
+    })
+
+# ================================================================================
+# DAILY PARTITIONS - PER-USER DATE SUMS SPLIT BY MONTH
+# ================================================================================
+
+def partition_by_month(user_date):
+    """Split per-user date sums into 'YYYY-MM' partitions, each still ordered by user and date"""
+    months = user_date['date'].to_numpy().astype('datetime64[M]')
+    order = np.argsort(months, kind='stable')
+    keys, starts = np.unique(months[order], return_index=True)
+    bounds = np.append(starts, len(order))
+    return {
+        str(key): user_date.take(order[bounds[i]:bounds[i + 1]]).reset_index(drop=True)
+        for i, key in enumerate(keys)
+    }
+
+def merge_daily_partitions(partitions, user_date):
+    """Fold appended per-user date sums into the month partitions they fall in
+    
+    Every partition keeps one user_id dtype, so a user has the same code in
+    all of them.
+    """
+    if partitions:
+        categories = next(iter(partitions.values()))['user_id'].cat.categories
+        added = pd.Index(user_date['user_id'].unique()).difference(categories)
+        dtype = pd.CategoricalDtype(categories.append(added))
+        user_date = user_date.assign(user_id=user_date['user_id'].astype(dtype))
+    else:
+        dtype = user_date['user_id'].dtype
+    
+    added_parts = partition_by_month(user_date)
+    merged = {}
+    for month in sorted(set(partitions) | set(added_parts)):
+        part, added_part = partitions.get(month), added_parts.get(month)
+        if part is None:
+            merged[month] = added_part
+            continue
+        
+        # Existing codes stay valid - the new users only extend the categories
+        part = part.assign(user_id=pd.Categorical.from_codes(part['user_id'].cat.codes, dtype=dtype))
+        if added_part is None:
+            merged[month] = part
+        else:
+            merged[month] = merge_daily_sums({'user_date': part}, {'user_date': added_part})['user_date']
+    return merged
+
+def daily_record_count(partitions):
+    """Number of daily usage records summed into the partitions"""
+    return int(sum(part['records'].sum() for part in partitions.values()))
+
+def daily_date_range(partitions):
+    """First and last date with daily usage records"""
+    if not partitions:
+        return None
+    months = sorted(partitions)
+    return partitions[months[0]]['date'].min(), partitions[months[-1]]['date'].max()
+
+# ================================================================================
+# PLATFORM MEMBERSHIP - BIT-PACKED platforms_used
+# ================================================================================
+
+def encode_platform_sets(platforms_used, platform_names):
+    """Bit-pack comma-separated platform lists into one integer per row, bit i = platform_names[i]"""
+    bit_of = {name: 1 << i for i, name in enumerate(platform_names)}
+    dtype = np.min_scalar_type((1 << len(bit_of)) - 1)
+    
+    # Only the distinct lists are split - rows just look up their list's mask,
+    # missing values (code -1) land on the trailing empty mask
+    codes, uniques = pd.factorize(platforms_used)
+    unique_masks = np.array([
+        sum(bit_of.get(name.strip(), 0) for name in set(str(value).split(',')))
+        for value in uniques
+    ] + [0], dtype=dtype)
+    return unique_masks[codes]
+
+# ================================================================================
+# DATA LOADING
+# ================================================================================
+
+DATA_FILES = ['main_survey_data.csv', 'daily_usage_data.csv', 'platform_metadata.csv']
+
+def _fold_survey(tables, parsed):
+    """Append parsed survey rows to the main table"""
+    rows = _prepare_survey(parsed['table'], tables['platform'])
+    tables['main'] = append_rows(tables['main'], rows) if 'main' in tables else rows
+
+def _fold_daily(tables, parsed):
+    """Fold parsed per-user date sums into the daily month partitions"""
+    tables['daily'] = merge_daily_partitions(tables.get('daily', {}), parsed['user_date'])
+
+# Sources that grow: rows appended to the CSV or new partition files next to it,
+# e.g. daily_usage_data-2024-07.csv, each with (cached tables, builder, merger,
+# folder into the loaded tables)
+SURVEY_SOURCE = 'main_survey_data'
+DAILY_SOURCE = 'daily_usage_data'
+APPENDABLE_SOURCES = {
+    SURVEY_SOURCE: (['table'], lambda path, source=None: {
+        'table': parse_csv(path, ['survey_date'], SURVEY_CATEGORICAL_COLUMNS, source)
+    }, merge_appended_rows, _fold_survey),
+    DAILY_SOURCE: (['user_date'], aggregate_daily_usage, merge_daily_sums, _fold_daily),
+}
+PLATFORM_FILE = 'platform_metadata.csv'
+
+def source_files(data_dir, stem):
+    """The base CSV of a source followed by its partition files in name order"""
+    partitions = sorted(glob.glob(os.path.join(glob.escape(data_dir), f"{stem}-*.csv")))
+    return [os.path.join(data_dir, f"{stem}.csv")] + partitions
+
+def get_data_version(data_dir='.'):
+    """Fingerprint the data files by size and mtime, used as a cache key"""
+    paths = [PLATFORM_FILE] + [
+        os.path.relpath(path, data_dir) for stem in APPENDABLE_SOURCES for path in source_files(data_dir, stem)
+    ]
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(os.path.join(data_dir, path))
+            parts.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{path}:missing")
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:12]
+
+def _prepare_survey(survey_df, platform_df):
+    """Drop survey rows with invalid dates and bit-pack their platforms_used"""
+    survey_df = survey_df.dropna(subset=['survey_date'])
+    survey_df['platform_mask'] = encode_platform_sets(survey_df['platforms_used'], platform_df['platform_name'])
+    return survey_df
+
+def _cached_mark(csv_path, tables):
+    """Mark of the bytes the cached tables of a CSV were read from"""
+    meta = _read_meta(_cache_paths(csv_path, tables)[1])
+    if meta is None or meta.get('size') is None:
+        return _source_mark(csv_path)
+    return {key: meta.get(key) for key in ['size', 'mtime_ns', 'sha256']}
+
+def _read_tables(data_dir):
+    """Parse or read from the parquet cache every table, plus the source marks they were read up to"""
+    tables, sources = {}, {}
+    
+    # Load platform metadata
+    platform_path = os.path.join(data_dir, PLATFORM_FILE)
+    tables['platform'] = pd.read_csv(platform_path)
+    sources[PLATFORM_FILE] = _source_mark(platform_path)
+    
+    # Load main survey data and the daily usage data - streamed in chunks into
+    # per-user date sums by month - file by file in partition order. Survey rows
+    # with invalid dates are dropped and platforms_used is parsed once into one
+    # membership bitmask per user
+    for stem, (cached_tables, builder, merger, folder) in APPENDABLE_SOURCES.items():
+        sources[stem] = {}
+        for path in source_files(data_dir, stem):
+            folder(tables, read_cached(path, builder, cached_tables, merger))
+            sources[stem][os.path.basename(path)] = _cached_mark(path, cached_tables)
+    return tables, sources
+
+def _read_datasets(data_dir):
+    """Parse or read from the parquet cache every table of one process"""
+    tables, _ = _read_tables(data_dir)
+    return tuple(tables[name] for name in SHARED_TABLES)
+
+# ================================================================================
+# INCREMENTAL INGEST - FOLD APPENDED ROWS INTO LOADED TABLES
+# ================================================================================
+
+def _appended_sources(data_dir, sources):
+    """Rows appended to every source since sources were marked, and the new marks
+    
+    Returns a list of (stem, path, rows) with the new source marks, or None
+    when a source changed in any other way - rewritten, truncated, removed,
+    a partition added before one already read, or new platform metadata.
+    """
+    sources = dict(sources)
+    try:
+        appended = read_appended(os.path.join(data_dir, PLATFORM_FILE), sources[PLATFORM_FILE])
+    except OSError:
+        return None
+    if appended is None or appended[0] is not None:
+        return None
+    sources[PLATFORM_FILE] = appended[1]
+    
+    empty = {'size': 0, 'mtime_ns': None, 'sha256': hashlib.sha256().hexdigest()}
+    rows = []
+    for stem in APPENDABLE_SOURCES:
+        paths = source_files(data_dir, stem)
+        marks = dict(sources[stem])
+        
+        # Files already read must still come first, new partitions only after them
+        names = [os.path.basename(path) for path in paths]
+        if names[:len(marks)] != list(marks):
+            return None
+        
+        for path, name in zip(paths, names):
+            try:
+                appended = read_appended(path, marks.get(name, empty))
+            except OSError:
+                return None
+            if appended is None:
+                return None
+            source, marks[name] = appended
+            if source is not None:
+                rows.append((stem, path, source))
+        sources[stem] = marks
+    return rows, sources
+
+def ingest_appended(data_dir, tables, sources):
+    """Fold rows appended to the sources since they were read into the tables
+    
+    Returns the new tables and source marks, or None when a source changed
+    in any other way and only a full reload is correct.
+    """
+    appended = _appended_sources(data_dir, sources)
+    if appended is None:
+        return None
+    rows, sources = appended
+    tables = dict(tables)
+    for stem, path, source in rows:
+        _, builder, _, folder = APPENDABLE_SOURCES[stem]
+        folder(tables, builder(path, source=source))
+    return tables, sources
+
+# ================================================================================
+# SHARED STORE - MEMORY-MAPPED ARROW TABLES ACROSS SERVER PROCESSES
+# ================================================================================
+
+SHARED_STORE_DIR = os.path.join(CACHE_DIR, 'shared')
+SHARED_TABLES = ['main', 'daily', 'platform']
+# Tables held as {partition key: DataFrame}, published as one file per partition
+PARTITIONED_TABLES = ['daily']
+
+def _store_dir(data_version):
+    return os.path.join(SHARED_STORE_DIR, data_version)
+
+@contextlib.contextmanager
+def _publish_lock(data_version):
+    """Serialise publishing of one dataset version across processes"""
+    os.makedirs(SHARED_STORE_DIR, exist_ok=True)
+    with open(os.path.join(SHARED_STORE_DIR, f"{data_version}.lock"), 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def publish_tables(data_version, tables, sources=None):
+    """Write tables as uncompressed Arrow IPC files that every worker can memory-map
+    
+    sources are the source marks the tables were read up to, kept in the
+    manifest so attached processes can ingest later appends themselves.
+    """
+    import pyarrow as pa
+    
+    store = _store_dir(data_version)
+    os.makedirs(store, exist_ok=True)
+    tmp_suffix = f".{os.getpid()}.tmp"
+    files, partitions = {}, {}
+    for name, df in tables.items():
+        if name in PARTITIONED_TABLES:
+            os.makedirs(os.path.join(store, name), exist_ok=True)
+            partitions[name] = sorted(df)
+            files.update({os.path.join(name, f"{key}.arrow"): df[key] for key in partitions[name]})
+        else:
+            files[f"{name}.arrow"] = df
+    for filename, df in files.items():
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        path = os.path.join(store, filename)
+        with pa.ipc.new_file(path + tmp_suffix, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(path + tmp_suffix, path)
+    
+    # The manifest goes last, so a store without one is never attached
+    manifest = os.path.join(store, 'manifest.json')
+    with open(manifest + tmp_suffix, 'w') as f:
+        json.dump({
+            'format_version': CACHE_FORMAT_VERSION,
+            'tables': sorted(tables),
+            'partitions': partitions,
+            'memory': get_memory_report(),
+            'sources': sources
+        }, f)
+    os.replace(manifest + tmp_suffix, manifest)
+    
+    # Older versions can go - processes still mapping them keep their pages
+    for entry in os.listdir(SHARED_STORE_DIR):
+        if entry != data_version and not entry.endswith('.lock'):
+            shutil.rmtree(os.path.join(SHARED_STORE_DIR, entry), ignore_errors=True)
+
+def _attach_store(data_version, names=SHARED_TABLES):
+    """Memory-map a published store, returning its tables and source marks"""
+    store = _store_dir(data_version)
+    try:
+        with open(os.path.join(store, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format_version') != CACHE_FORMAT_VERSION or not set(names) <= set(manifest['tables']):
+        return None
+    
+    import pyarrow as pa
+    
+    def read(filename):
+        # split_blocks keeps numeric and categorical columns as views of the mapping
+        source = pa.memory_map(os.path.join(store, filename))
+        return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+    
+    # Partitions are mapped one file each, so only the pages of those read are loaded
+    tables = {}
+    for name in names:
+        if name in PARTITIONED_TABLES:
+            keys = manifest.get('partitions', {}).get(name, [])
+            tables[name] = {key: read(os.path.join(name, f"{key}.arrow")) for key in keys}
+        else:
+            tables[name] = read(f"{name}.arrow")
+    _memory_report.update(manifest.get('memory', {}))
+    return tables, manifest.get('sources')
+
+def attach_tables(data_version, names=SHARED_TABLES):
+    """Memory-map a published store zero-copy, or return None if it isn't published"""
+    attached = _attach_store(data_version, names)
+    return None if attached is None else attached[0]
+
+def _attach_or_publish(data_version, read):
+    """Attach a published store, publishing read()'s tables and marks first if needed"""
+    # The first process on a node publishes the tables, every other one attaches
+    attached = _attach_store(data_version)
+    if attached is None:
+        with _publish_lock(data_version):
+            attached = _attach_store(data_version)
+            if attached is None:
+                publish_tables(data_version, *read())
+                attached = _attach_store(data_version)
+    return attached
+
+def load_tables(data_dir='.', shared=True, data_version=None):
+    """Load every table by shared name, plus the source marks they were read up to"""
+    if shared:
+        try:
+            data_version = data_version or get_data_version(data_dir)
+            attached = _attach_or_publish(data_version, lambda: _read_tables(data_dir))
+            if attached is not None and attached[1] is not None:
+                return attached
+        except (OSError, ImportError, ValueError):
+            # Read-only filesystem or no Arrow - fall back to a private copy
+            pass
+    return _read_tables(data_dir)
+
+def refresh_tables(data_dir, data_version, tables, sources, shared=True):
+    """Bring loaded tables up to data_version, ingesting only the appended rows when possible
+    
+    Returns the tables, their source marks and whether the sources only had
+    rows appended - False after a full reload, when tables built over the
+    old rows no longer hold.
+    """
+    outcome = {}
+    def read():
+        ingested = ingest_appended(data_dir, tables, sources)
+        outcome['appended'] = ingested is not None
+        return _read_tables(data_dir) if ingested is None else ingested
+    
+    if shared:
+        try:
+            attached = _attach_or_publish(data_version, read)
+            if attached is not None and attached[1] is not None:
+                # Another process published the store - check the sources ourselves
+                if 'appended' not in outcome:
+                    outcome['appended'] = _appended_sources(data_dir, sources) is not None
+                return attached + (outcome['appended'],)
+        except (OSError, ImportError, ValueError):
+            pass
+    return read() + (outcome['appended'],)
+
+def load_datasets(data_dir='.', shared=True):
+    """Load the survey table, the daily per-user aggregates and platform metadata"""
+    tables, _ = load_tables(data_dir, shared)
+    return tuple(tables[name] for name in SHARED_TABLES)
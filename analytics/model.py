@@ -0,0 +1,205 @@
+# ================================================================================
+# 🤖 ANALYTICS MODEL — BACKGROUND TRAINING & PERSISTENCE
+# ================================================================================
+# Description: Trains the mental health risk classifier in a bounded process
+#              pool, keeps fitted models in memory and persists them with
+#              joblib so restarts and other workers can reuse them, keeping
+#              the most recently used files on disk
+# ================================================================================
+
+import os
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.decomposition import PCA
+
+from .loader import CACHE_DIR
+
+MODEL_DIR = os.path.join(CACHE_DIR, 'models')
+
+RISK_FEATURE_COLUMNS = ['avg_daily_screen_time_hrs', 'night_usage_hours', 'num_platforms',
+                        'sessions_per_day', 'avg_session_duration_min', 'age',
+                        'fomo_score', 'avg_sleep_hours']
+
+# Training never takes more than this many cores from the host
+ML_POOL_WORKERS = 2
+ML_MEMORY_MODELS = 32
+# Persisted models kept on disk, least recently trained or loaded deleted first -
+# each data version and filter state gets its own file
+ML_DISK_MODELS = 64
+
+_executor = None
+_jobs = {}
+_models = OrderedDict()
+# Errors of models whose training failed, re-raised rather than training again
+_failures = OrderedDict()
+_lock = threading.Lock()
+
+def _get_executor():
+    """Create the shared training pool on first use"""
+    global _executor
+    if _executor is None:
+        # spawn avoids forking the threaded Streamlit server
+        _executor = ProcessPoolExecutor(
+            max_workers=ML_POOL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _executor
+
+def model_path(model_key, model_dir=MODEL_DIR):
+    """Return the joblib file holding a fitted model"""
+    return os.path.join(model_dir, f"risk_model_{model_key}.joblib")
+
+def make_model_key(cache_key, feature_cols):
+    """Hash the data version, filter state and features into a model key"""
+    return hashlib.sha1(repr((tuple(cache_key), tuple(feature_cols))).encode()).hexdigest()[:16]
+
+def prepare_training_data(df, feature_cols=RISK_FEATURE_COLUMNS):
+    """Return the feature matrix and encoded risk labels"""
+    X = df[feature_cols].fillna(0)
+    y = LabelEncoder().fit_transform(df['risk_category'])
+    return X, y
+
+def train_risk_model(X, y):
+    """Fit scaler, random forest and PCA and keep the evaluation artefacts"""
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # Scale features
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    # Train model - one core per pool worker
+    model = RandomForestClassifier(n_estimators=50, random_state=42, n_jobs=1)
+    model.fit(X_train_scaled, y_train)
+
+    # PCA of the training set for the 2D projection - a single feature has one component
+    pca = PCA(n_components=min(2, X_train_scaled.shape[1]))
+    X_pca = pca.fit_transform(X_train_scaled)
+
+    return {
+        'model': model,
+        'scaler': scaler,
+        'pca': pca,
+        'feature_cols': list(X.columns),
+        'y_train': y_train,
+        'y_test': y_test,
+        'y_pred': model.predict(X_test_scaled),
+        'y_prob': model.predict_proba(X_test_scaled),
+        'X_pca': X_pca
+    }
+
+def _train_and_save(model_key, X, y, model_dir):
+    """Pool entry point - train and persist atomically"""
+    artefacts = train_risk_model(X, y)
+    path = model_path(model_key, model_dir)
+    try:
+        os.makedirs(model_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(artefacts, tmp_path)
+        os.replace(tmp_path, path)
+        _prune_models(model_dir)
+    except OSError:
+        pass
+    return artefacts
+
+def _prune_models(model_dir, keep=ML_DISK_MODELS):
+    """Delete all but the keep most recently used model files"""
+    entries = [
+        entry for entry in os.scandir(model_dir)
+        if entry.name.startswith('risk_model_') and entry.name.endswith('.joblib')
+    ]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        # Another worker may have pruned it already
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def _remember(model_key, artefacts):
+    """Keep a fitted model in the in-memory LRU"""
+    with _lock:
+        _models[model_key] = artefacts
+        _models.move_to_end(model_key)
+        while len(_models) > ML_MEMORY_MODELS:
+            _models.popitem(last=False)
+
+def load_model(model_key, model_dir=MODEL_DIR):
+    """Return a fitted model from memory or disk, or None if it was never trained"""
+    with _lock:
+        if model_key in _models:
+            _models.move_to_end(model_key)
+            return _models[model_key]
+
+    path = model_path(model_key, model_dir)
+    if os.path.exists(path):
+        try:
+            artefacts = joblib.load(path)
+        except (OSError, EOFError, ValueError):
+            return None
+        # Mark it recently used so pruning keeps it
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        _remember(model_key, artefacts)
+        return artefacts
+    return None
+
+def request_model(model_key, X, y, model_dir=MODEL_DIR):
+    """Return the fitted model if available, otherwise make sure it is training
+
+    Returns None while the model is training. Errors raised during training
+    are re-raised, and so is the same error on every later request for the
+    model - the key covers the data, filters and features, so a retry would
+    fail alike.
+    """
+    global _executor
+    artefacts = load_model(model_key, model_dir)
+    if artefacts is not None:
+        return artefacts
+
+    with _lock:
+        if model_key in _failures:
+            raise _failures[model_key]
+        future = _jobs.get(model_key)
+        if future is None:
+            _jobs[model_key] = _get_executor().submit(_train_and_save, model_key, X, y, model_dir)
+            return None
+        if not future.done():
+            return None
+        del _jobs[model_key]
+
+    try:
+        artefacts = future.result()
+    except BrokenExecutor:
+        # The pool died rather than the training - the next request retries on a new one
+        with _lock:
+            _executor = None
+        raise
+    except Exception as error:
+        with _lock:
+            _failures[model_key] = error
+            while len(_failures) > ML_MEMORY_MODELS:
+                _failures.popitem(last=False)
+        raise
+    _remember(model_key, artefacts)
+    return artefacts
+
+def is_model_ready(model_key, model_dir=MODEL_DIR):
+    """Check whether a model can be served without waiting"""
+    with _lock:
+        if model_key in _models:
+            return True
+        future = _jobs.get(model_key)
+        if future is not None and future.done():
+            return True
+    return os.path.exists(model_path(model_key, model_dir))
@@ -0,0 +1,86 @@
+# ================================================================================
+# 🎯 ANALYTICS SAMPLING — POINT BUDGETS FOR LARGE SCATTER PLOTS
+# ================================================================================
+# Description: Decides how a scatter of the filtered users is drawn: every
+#              point while under the point budget, a stratified sample drawn
+#              with WebGL above it, and per-group density grids once even a
+#              sample would hide the shape. Each group keeps its share of the
+#              points, so the per-category shape survives the downsampling.
+# ================================================================================
+
+import numpy as np
+import pandas as pd
+
+SCATTER_POINT_BUDGET = 2_000
+# Above budget x this many points a sample is too sparse - draw densities instead
+SCATTER_DENSITY_FACTOR = 10
+SCATTER_DENSITY_BINS = 40
+SCATTER_MODES = ['auto', 'points', 'webgl', 'density']
+
+def scatter_mode(n_points, budget=SCATTER_POINT_BUDGET, mode='auto'):
+    """Rendering mode for a scatter of n_points - 'points', 'webgl' or 'density'"""
+    if mode != 'auto':
+        return mode
+    if n_points <= budget:
+        return 'points'
+    return 'webgl' if n_points <= budget * SCATTER_DENSITY_FACTOR else 'density'
+
+def _allocate(sizes, budget):
+    """Split budget across groups in proportion to their sizes, at least one point per group"""
+    quotas = sizes * budget / max(sizes.sum(), 1)
+    counts = np.minimum(np.maximum(np.floor(quotas).astype(np.int64), 1), sizes)
+    
+    # Hand the points lost to rounding to the largest remainders
+    spare = budget - counts.sum()
+    if spare > 0:
+        order = np.argsort(-(quotas - np.floor(quotas)), kind='stable')
+        for i in order:
+            if spare == 0:
+                break
+            if counts[i] < sizes[i]:
+                counts[i] += 1
+                spare -= 1
+    return counts
+
+def stratified_sample(df, by, budget=SCATTER_POINT_BUDGET, seed=0):
+    """At most budget rows of df, each group of column by keeping its share of the rows
+    
+    The sample is seeded, so reruns under the same filters draw the same
+    points, and rows keep their original order.
+    """
+    if len(df) <= budget:
+        return df
+    
+    codes, _ = pd.factorize(df[by], use_na_sentinel=False)
+    sizes = np.bincount(codes)
+    counts = _allocate(sizes, budget)
+    
+    # A random key per row, then the lowest keys of each group
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(df)), codes))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    ranks = np.arange(len(df)) - np.repeat(starts, sizes)
+    keep = order[ranks < np.repeat(counts, sizes)]
+    return df.take(np.sort(keep))
+
+def density_grid(df, x, y, by, bins=SCATTER_DENSITY_BINS):
+    """Per-group point counts on one shared x / y grid, with the bin centres"""
+    xs = df[x].to_numpy(dtype=np.float64)
+    ys = df[y].to_numpy(dtype=np.float64)
+    valid = np.isfinite(xs) & np.isfinite(ys)
+    if not valid.any():
+        return {'x': np.array([]), 'y': np.array([]), 'counts': {}}
+    
+    x_edges = np.histogram_bin_edges(xs[valid], bins=bins)
+    y_edges = np.histogram_bin_edges(ys[valid], bins=bins)
+    groups = df[by]
+    counts = {}
+    for group in groups.dropna().unique():
+        in_group = valid & (groups == group).to_numpy()
+        # histogram2d counts x along the first axis - transpose to rows of y
+        counts[group] = np.histogram2d(xs[in_group], ys[in_group], bins=[x_edges, y_edges])[0].T
+    return {
+        'x': (x_edges[:-1] + x_edges[1:]) / 2,
+        'y': (y_edges[:-1] + y_edges[1:]) / 2,
+        'counts': counts
+    }
@@ -0,0 +1,248 @@
+# ================================================================================
+# 🧪 ANALYTICS SYNTHETIC DATA — SCALED SURVEY & DAILY USAGE GENERATOR
+# ================================================================================
+# Description: Generates schema-identical survey and daily usage datasets at any
+#              scale from the real survey. Survey rows are a smoothed bootstrap
+#              of real respondents - state/city/lat-long, platform mix and
+#              risk vs screen time stay jointly distributed as in the source -
+#              with continuous scores jittered and their categories re-derived.
+#              Daily rows follow each user's survey means. Output is written in
+#              user chunks as CSV and/or parquet so memory stays bounded.
+#
+# Usage:
+#   python -m analytics.synthetic --users 500000 --daily-users 50000 \
+#       --out .bench_data/500k --format csv parquet
+# ================================================================================
+
+import os
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from .loader import recorded_decimals
+
+# Relative noise added to continuous survey columns, as a share of their std
+SURVEY_JITTER = 0.1
+SURVEY_CHUNK_USERS = 250_000
+DAILY_CHUNK_USERS = 5_000
+DAILY_START = '2024-01-01'
+DAILY_DAYS = 182
+
+# Category columns recomputed from their (jittered) score
+DERIVED_CATEGORIES = {
+    'age_group': 'age',
+    'screen_time_category': 'avg_daily_screen_time_hrs',
+    'anxiety_category': 'anxiety_score',
+    'depression_category': 'depression_score',
+    'sleep_quality_category': 'sleep_quality_score',
+    'bmi_category': 'bmi',
+    'risk_category': 'mental_health_risk_score',
+}
+
+# Zero-inflated hours whose zero / non-zero split drives a boolean flag
+ZERO_INFLATED = {
+    'night_usage_hours': 'night_usage',
+    'morning_usage_hours': 'morning_usage',
+    'phone_before_bed_minutes': 'phone_before_bed',
+}
+
+# Columns kept exactly as in the template row
+TEMPLATE_ONLY = [
+    'latitude', 'longitude', 'num_platforms', 'cluster_id',
+    'usage_scrolling_pct', 'usage_watching_pct', 'usage_posting_pct',
+    'usage_messaging_pct', 'usage_gaming_pct',
+]
+
+DAILY_COLUMNS = ['user_id', 'date', 'day_of_week', 'screen_time_hours',
+                 'anxiety_score_daily', 'sleep_hours', 'mood_rating']
+
+# ================================================================================
+# FITTING
+# ================================================================================
+
+def _fit_bins(scores, labels):
+    """Order category labels by score and return their upper bounds"""
+    bounds = pd.DataFrame({'score': scores, 'label': labels}).groupby('label')['score'].agg(['min', 'max'])
+    bounds = bounds.sort_values('min')
+    return bounds.index.to_numpy(), bounds['max'].to_numpy()
+
+def fit_survey_model(source_df):
+    """Collect everything the generator needs from the real survey"""
+    numeric_cols = [
+        c for c in source_df.select_dtypes(include='number').columns
+        if c not in TEMPLATE_ONLY
+    ]
+    model = {
+        'source': source_df.reset_index(drop=True),
+        'numeric': {},
+        'bins': {},
+    }
+    for col in numeric_cols:
+        values = source_df[col].to_numpy(dtype=float)
+        model['numeric'][col] = {
+            'min': np.nanmin(values),
+            'max': np.nanmax(values),
+            'std': np.nanstd(values),
+            'decimals': recorded_decimals(values),
+            'integer': pd.api.types.is_integer_dtype(source_df[col]),
+            'min_positive': np.nanmin(values[values > 0]) if (values > 0).any() else 0.0,
+        }
+    for category, score in DERIVED_CATEGORIES.items():
+        if category in source_df.columns and score in source_df.columns:
+            model['bins'][category] = _fit_bins(source_df[score], source_df[category])
+    return model
+
+# ================================================================================
+# GENERATION
+# ================================================================================
+
+def make_user_ids(start, count, total):
+    """Sequential ids in the source format (IND00001), widened for large totals"""
+    width = max(5, len(str(total)))
+    numbers = np.arange(start + 1, start + count + 1).astype(str)
+    return np.char.add('IND', np.char.zfill(numbers, width))
+
+def generate_survey(model, start, count, total, rng):
+    """Generate survey rows for users [start, start + count)"""
+    source = model['source']
+    templates = rng.integers(0, len(source), count)
+    df = source.iloc[templates].reset_index(drop=True)
+    df['user_id'] = make_user_ids(start, count, total)
+
+    # Jitter continuous scores and keep them inside the observed range
+    for col, spec in model['numeric'].items():
+        values = df[col].to_numpy(dtype=float)
+        noise = rng.normal(0.0, SURVEY_JITTER * spec['std'], count)
+        if col in ZERO_INFLATED:
+            # Only jitter positive values so the zero share is preserved
+            positive = values > 0
+            values = np.where(positive, np.maximum(values + noise, spec['min_positive']), 0.0)
+        else:
+            values = values + noise
+        values = np.clip(values, spec['min'], spec['max'])
+        if spec['integer']:
+            df[col] = np.round(values).astype(np.int64)
+        else:
+            df[col] = np.round(values, spec['decimals'])
+
+    for col, flag in ZERO_INFLATED.items():
+        if col in df.columns and flag in df.columns:
+            df[flag] = df[col].to_numpy() > 0
+
+    # Re-derive categories so each still matches its score
+    for category, (labels, upper_bounds) in model['bins'].items():
+        scores = df[DERIVED_CATEGORIES[category]].to_numpy(dtype=float)
+        positions = np.minimum(np.searchsorted(upper_bounds, scores, side='left'), len(labels) - 1)
+        df[category] = labels[positions]
+
+    return df[source.columns]
+
+def generate_daily(survey_df, rng, start=DAILY_START, days=DAILY_DAYS):
+    """Generate one row per user per day driven by the user's survey answers"""
+    n_users = len(survey_df)
+    dates = pd.date_range(start, periods=days)
+    weekend = dates.dayofweek.to_numpy() >= 5
+    user_idx = np.repeat(np.arange(n_users), days)
+    day_idx = np.tile(np.arange(days), n_users)
+    n = len(user_idx)
+
+    screen = survey_df['avg_daily_screen_time_hrs'].to_numpy(dtype=float)
+    anxiety = survey_df['anxiety_score'].to_numpy(dtype=float)
+    sleep = survey_df['avg_sleep_hours'].to_numpy(dtype=float)
+    satisfaction = survey_df['life_satisfaction_score'].to_numpy(dtype=float)
+    depression = survey_df['depression_score'].to_numpy(dtype=float)
+
+    # Per-user drift over the period, weekends push screen time up
+    drift = rng.normal(0.0, 0.003, n_users)[user_idx] * day_idx
+    weekend_factor = np.where(weekend[day_idx], 1.15, 1.0)
+    screen_daily = screen[user_idx] * weekend_factor * (1.0 + drift) * rng.lognormal(0.0, 0.25, n)
+    anxiety_daily = anxiety[user_idx] + rng.normal(0.0, 2.0, n)
+    sleep_daily = sleep[user_idx] - 0.05 * (screen_daily - screen[user_idx]) + rng.normal(0.0, 0.7, n)
+    mood_base = 1 + 9 * (satisfaction - 5) / 30 - depression / 9
+    mood_daily = mood_base[user_idx] + rng.normal(0.0, 1.2, n)
+
+    return pd.DataFrame({
+        'user_id': survey_df['user_id'].to_numpy()[user_idx],
+        'date': dates.strftime('%Y-%m-%d').to_numpy()[day_idx],
+        'day_of_week': dates.day_name().to_numpy()[day_idx],
+        'screen_time_hours': np.round(np.clip(screen_daily, 0.0, 20.0), 2),
+        'anxiety_score_daily': np.round(np.clip(anxiety_daily, 0.0, 21.0), 1),
+        'sleep_hours': np.round(np.clip(sleep_daily, 3.0, 11.0), 1),
+        'mood_rating': np.clip(np.round(mood_daily), 1, 10).astype(np.int64),
+    })[DAILY_COLUMNS]
+
+# ================================================================================
+# WRITERS
+# ================================================================================
+
+def _open_writer(base_path, formats):
+    """State for appending DataFrame chunks to a CSV and/or parquet file"""
+    return {'base_path': base_path, 'formats': formats, 'parquet': None, 'csv_started': False}
+
+def _write_chunk(writer, df):
+    """Append one chunk in every requested format"""
+    if 'csv' in writer['formats']:
+        df.to_csv(f"{writer['base_path']}.csv", mode='a' if writer['csv_started'] else 'w',
+                  header=not writer['csv_started'], index=False)
+        writer['csv_started'] = True
+    if 'parquet' in writer['formats']:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if writer['parquet'] is None:
+            writer['parquet'] = pq.ParquetWriter(f"{writer['base_path']}.parquet", table.schema)
+        writer['parquet'].write_table(table.cast(writer['parquet'].schema))
+
+def _close_writer(writer):
+    if writer['parquet'] is not None:
+        writer['parquet'].close()
+
+def write_dataset(source_dir, out_dir, n_users, daily_users=None, formats=('csv',),
+                  seed=42, days=DAILY_DAYS):
+    """Write a synthetic survey of n_users and daily usage for the first daily_users"""
+    daily_users = n_users if daily_users is None else min(daily_users, n_users)
+    rng = np.random.default_rng(seed)
+    model = fit_survey_model(pd.read_csv(os.path.join(source_dir, 'main_survey_data.csv')))
+
+    os.makedirs(out_dir, exist_ok=True)
+    shutil.copy(os.path.join(source_dir, 'platform_metadata.csv'), out_dir)
+    survey_writer = _open_writer(os.path.join(out_dir, 'main_survey_data'), formats)
+    daily_writer = _open_writer(os.path.join(out_dir, 'daily_usage_data'), formats)
+
+    try:
+        for start in range(0, n_users, SURVEY_CHUNK_USERS):
+            count = min(SURVEY_CHUNK_USERS, n_users - start)
+            survey_df = generate_survey(model, start, count, n_users, rng)
+            _write_chunk(survey_writer, survey_df)
+
+            # Daily rows only for the first daily_users users, in small batches
+            daily_count = max(0, min(count, daily_users - start))
+            for offset in range(0, daily_count, DAILY_CHUNK_USERS):
+                batch = survey_df.iloc[offset:min(offset + DAILY_CHUNK_USERS, daily_count)]
+                _write_chunk(daily_writer, generate_daily(batch, rng, days=days))
+    finally:
+        _close_writer(survey_writer)
+        _close_writer(daily_writer)
+
+    return {'n_users': n_users, 'daily_users': daily_users, 'daily_rows': daily_users * days}
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a scaled synthetic dataset')
+    parser.add_argument('--users', type=int, required=True, help='Survey users to generate')
+    parser.add_argument('--daily-users', type=int, default=None,
+                        help='Users with daily records (default: all)')
+    parser.add_argument('--days', type=int, default=DAILY_DAYS, help='Days of daily records per user')
+    parser.add_argument('--source', default='.', help='Folder with the real CSV files')
+    parser.add_argument('--out', required=True, help='Output folder')
+    parser.add_argument('--format', nargs='+', default=['csv'], choices=['csv', 'parquet'])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    summary = write_dataset(args.source, args.out, args.users, args.daily_users,
+                            tuple(args.format), args.seed, args.days)
+    print(f"Wrote {summary['n_users']:,} users and {summary['daily_rows']:,} daily rows to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+# ================================================================================
+# ⏱️ ANALYTICS TELEMETRY — PER-CHART TIMINGS AND PAYLOAD SIZES
+# ================================================================================
+# Description: Records, per chart and per rerun, the time spent building the
+#              chart's data, constructing the figure, serializing it and
+#              handing it to the client, plus the serialized payload size on
+#              profiled runs and a sample of the others.
+#              Each script run collects its charts in a thread-local run that
+#              is kept in a process-wide ring of recent runs once finished.
+#              An opt-in profiling mode also times the stages of each rerun
+#              and exports everything in the Prometheus text format.
+# ================================================================================
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# ================================================================================
+# CHART METRICS - PER-CHART TIMINGS AND PAYLOAD SIZES
+# ================================================================================
+
+CHART_METRICS_MAX_RUNS = 500
+# Serializing a figure just to size it costs about as much as sending it, so
+# outside profiling only every this many runs measure their payloads
+CHART_PAYLOAD_SAMPLE_EVERY = 20
+
+# Process-wide ring of finished runs, shared by every session
+_chart_metrics = {
+    'runs': deque(maxlen=CHART_METRICS_MAX_RUNS),
+    'started': 0,
+    'lock': threading.Lock()
+}
+# The run of the script executing on this thread
+_current = threading.local()
+
+def get_chart_metrics():
+    """Return the process-wide store of recent chart runs"""
+    return _chart_metrics
+
+def begin_chart_run(page, size_payloads=False):
+    """Start collecting the charts of one script run of page
+    
+    Payloads are serialized and sized when size_payloads is set and on every
+    CHART_PAYLOAD_SAMPLE_EVERY-th run otherwise.
+    """
+    with _chart_metrics['lock']:
+        sampled = _chart_metrics['started'] % CHART_PAYLOAD_SAMPLE_EVERY == 0
+        _chart_metrics['started'] += 1
+    run = {
+        'page': page,
+        'started': time.time(),
+        'mark': time.perf_counter(),
+        'data_s': 0.0,
+        'size_payloads': size_payloads or sampled,
+        'charts': []
+    }
+    _current.run = run
+    return run
+
+def sizing_payloads():
+    """Whether this thread's run measures the serialized size of its charts"""
+    run = getattr(_current, 'run', None)
+    return run is not None and run['size_payloads']
+
+def chart_data(fn, *args, **kwargs):
+    """Call fn, counting its time as data-building time of the next chart"""
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        run = getattr(_current, 'run', None)
+        if run is not None:
+            run['data_s'] += time.perf_counter() - start
+
+def record_chart(chart_id, payload_bytes, serialize_s, render_s, emitted_at):
+    """Record a chart emitted at emitted_at (perf_counter) - the time since the previous one is its build time
+    
+    payload_bytes and serialize_s are None for a chart that wasn't sized.
+    """
+    run = getattr(_current, 'run', None)
+    if run is None:
+        return None
+    
+    # Everything since the previous chart that wasn't data work built this figure
+    build_s = max(emitted_at - run['mark'], 0.0)
+    data_s = min(run['data_s'], build_s)
+    entry = {
+        'chart': chart_id or f"chart {len(run['charts']) + 1}",
+        'data_ms': data_s * 1e3,
+        'figure_ms': (build_s - data_s) * 1e3,
+        'serialize_ms': np.nan if serialize_s is None else serialize_s * 1e3,
+        'render_ms': render_s * 1e3,
+        'payload_bytes': np.nan if payload_bytes is None else int(payload_bytes)
+    }
+    run['charts'].append(entry)
+    run['mark'] = emitted_at + (serialize_s or 0.0) + render_s
+    run['data_s'] = 0.0
+    return entry
+
+def end_chart_run():
+    """Finish this thread's run and keep it with the recent runs"""
+    run = getattr(_current, 'run', None)
+    _current.run = None
+    if run is None:
+        return None
+    run = {
+        'page': run['page'],
+        'started': run['started'],
+        'charts': run['charts'],
+        # None when the run didn't size its payloads
+        'payload_bytes': sum(chart['payload_bytes'] for chart in run['charts']) if run['size_payloads'] else None
+    }
+    with _chart_metrics['lock']:
+        _chart_metrics['runs'].append(run)
+    return run
+
+def chart_metrics_records():
+    """One row per chart emitted in the recent runs, oldest first"""
+    with _chart_metrics['lock']:
+        runs = list(_chart_metrics['runs'])
+    return pd.DataFrame(
+        [
+            dict(chart, run=i, page=run['page'], started=run['started'])
+            for i, run in enumerate(runs)
+            for chart in run['charts']
+        ],
+        columns=['run', 'page', 'started', 'chart', 'data_ms', 'figure_ms',
+                 'serialize_ms', 'render_ms', 'payload_bytes']
+    )
+
+def chart_metrics_summary(records=None):
+    """Per-chart renders, mean timings, p95 total time and mean payload, heaviest first"""
+    records = chart_metrics_records() if records is None else records
+    if records.empty:
+        return pd.DataFrame()
+    records = records.assign(
+        total_ms=records[['data_ms', 'figure_ms', 'serialize_ms', 'render_ms']].sum(axis=1)
+    )
+    grouped = records.groupby(['page', 'chart'], sort=False)
+    summary = grouped[['data_ms', 'figure_ms', 'serialize_ms', 'render_ms', 'total_ms', 'payload_bytes']].mean()
+    summary.insert(0, 'renders', grouped.size())
+    summary['p95_total_ms'] = grouped['total_ms'].quantile(0.95)
+    return summary.sort_values('payload_bytes', ascending=False).reset_index()
+
+# ================================================================================
+# STAGE PROFILING - OPT-IN TIMING AND MEMORY SPANS PER RERUN STAGE
+# ================================================================================
+
+PROFILE_ENV_VAR = 'DASHBOARD_PROFILE'
+METRICS_PORT_ENV_VAR = 'DASHBOARD_METRICS_PORT'
+METRICS_PORT = 9464
+STAGE_SAMPLES_MAX = 1000
+
+# Process-wide recent samples per stage, plus running totals for the export
+_stage_metrics = {
+    'samples': {},
+    'totals': {},
+    'lock': threading.Lock()
+}
+
+def profiling_enabled(flag=None):
+    """Whether profiling is on - from the environment or a flag such as a query param"""
+    values = (os.environ.get(PROFILE_ENV_VAR, ''), flag or '')
+    return any(str(value).lower() in ('1', 'true', 'yes', 'on') for value in values)
+
+def begin_profile(enabled):
+    """Turn stage spans on or off for the script run on this thread"""
+    _current.profiling = bool(enabled)
+
+def is_profiling():
+    """Whether profiling is on for the script run on this thread"""
+    return getattr(_current, 'profiling', False)
+
+def _rss_bytes():
+    """Resident set size of this process - current on Linux, else the peak"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+def record_stage(stage, seconds, rss_delta=0):
+    """Add one sample of a stage to the process-wide profile"""
+    with _stage_metrics['lock']:
+        samples = _stage_metrics['samples'].setdefault(stage, deque(maxlen=STAGE_SAMPLES_MAX))
+        samples.append((seconds, rss_delta))
+        totals = _stage_metrics['totals'].setdefault(stage, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+
+@contextmanager
+def profile_span(stage):
+    """Time a block as one stage of the rerun, when profiling is on for this thread"""
+    if not is_profiling():
+        yield
+        return
+    rss = _rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start, _rss_bytes() - rss)
+
+def stage_summary():
+    """Per-stage sample count, p50 / p95 / max time and mean / max RSS growth over the recent samples"""
+    with _stage_metrics['lock']:
+        samples = {stage: np.array(values) for stage, values in _stage_metrics['samples'].items()}
+    rows = []
+    for stage, values in samples.items():
+        seconds, rss = values[:, 0], values[:, 1]
+        rows.append({
+            'stage': stage,
+            'samples': len(values),
+            'p50_ms': np.percentile(seconds, 50) * 1e3,
+            'p95_ms': np.percentile(seconds, 95) * 1e3,
+            'max_ms': seconds.max() * 1e3,
+            'mean_rss_delta_mb': rss.mean() / 1e6,
+            'max_rss_delta_mb': rss.max() / 1e6
+        })
+    return pd.DataFrame(rows, columns=['stage', 'samples', 'p50_ms', 'p95_ms', 'max_ms',
+                                       'mean_rss_delta_mb', 'max_rss_delta_mb'])
+
+# ================================================================================
+# EXPORT - PROMETHEUS TEXT FORMAT
+# ================================================================================
+
+def _labels(**labels):
+    """Prometheus label set with escaped values"""
+    escaped = {
+        name: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        for name, value in labels.items()
+    }
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped.items()) + '}'
+
+def prometheus_metrics():
+    """Stage and chart metrics in the Prometheus text exposition format"""
+    lines = [
+        '# HELP dashboard_stage_seconds Wall time of dashboard rerun stages',
+        '# TYPE dashboard_stage_seconds summary'
+    ]
+    with _stage_metrics['lock']:
+        totals = {stage: tuple(total) for stage, total in _stage_metrics['totals'].items()}
+    summary = stage_summary().set_index('stage')
+    for stage, (count, seconds) in totals.items():
+        for quantile, column in [('0.5', 'p50_ms'), ('0.95', 'p95_ms')]:
+            lines.append(f"dashboard_stage_seconds{_labels(stage=stage, quantile=quantile)} "
+                         f"{summary.at[stage, column] / 1e3:.6f}")
+        lines.append(f"dashboard_stage_seconds_sum{_labels(stage=stage)} {seconds:.6f}")
+        lines.append(f"dashboard_stage_seconds_count{_labels(stage=stage)} {count}")
+    
+    lines += [
+        '# HELP dashboard_stage_rss_delta_bytes Mean resident memory growth over dashboard rerun stages',
+        '# TYPE dashboard_stage_rss_delta_bytes gauge'
+    ]
+    for stage in totals:
+        lines.append(f"dashboard_stage_rss_delta_bytes{_labels(stage=stage)} "
+                     f"{summary.at[stage, 'mean_rss_delta_mb'] * 1e6:.0f}")
+    
+    # Charts over the recent reruns kept by the chart metrics ring
+    charts = chart_metrics_summary()
+    lines += [
+        '# HELP dashboard_chart_seconds Mean time per chart and phase over recent reruns',
+        '# TYPE dashboard_chart_seconds gauge'
+    ]
+    for row in charts.itertuples(index=False):
+        for phase in ['data', 'figure', 'serialize', 'render']:
+            # Charts never sized have no serialize time
+            if np.isnan(getattr(row, f'{phase}_ms')):
+                continue
+            labels = _labels(page=row.page, chart=row.chart, phase=phase)
+            lines.append(f"dashboard_chart_seconds{labels} {getattr(row, f'{phase}_ms') / 1e3:.6f}")
+    lines += [
+        '# HELP dashboard_chart_payload_bytes Mean serialized figure size over recent reruns',
+        '# TYPE dashboard_chart_payload_bytes gauge'
+    ]
+    for row in charts.itertuples(index=False):
+        if np.isnan(row.payload_bytes):
+            continue
+        lines.append(f"dashboard_chart_payload_bytes{_labels(page=row.page, chart=row.chart)} "
+                     f"{row.payload_bytes:.0f}")
+    return '\n'.join(lines) + '\n'
+
+def serve_metrics(port=None, host='127.0.0.1'):
+    """Serve prometheus_metrics() at http://host:port/metrics from a daemon thread
+    
+    port defaults to $DASHBOARD_METRICS_PORT, else METRICS_PORT. Returns the
+    server, or None when the port is taken - e.g. by another worker.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = prometheus_metrics().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    port = int(port or os.environ.get(METRICS_PORT_ENV_VAR, METRICS_PORT))
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError:
+        return None
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
@@ -0,0 +1,172 @@
+# ================================================================================
+# 📈 ANALYTICS TEMPORAL — STREAMING ROLLING-WINDOW STATISTICS
+# ================================================================================
+# Description: Rolling 7 / 28-day means and standard deviations and an EWMA of
+#              every daily metric over a gap-free calendar of per-date sums
+#              and counts. Windows are differences of running totals, so a
+#              day costs O(1) whatever the window, and new days extend the
+#              running totals and the EWMA from where they stopped rather
+#              than recomputing the series. The per-date sums of all users
+#              are kept per month partition and refolded only for the
+#              months that changed.
+# ================================================================================
+
+import numpy as np
+import pandas as pd
+
+from .loader import DAILY_METRICS, DAILY_SUM_COLUMNS
+
+ROLLING_WINDOWS = [7, 28]
+EWMA_HALFLIFE_DAYS = 7
+
+SUM_COLUMNS = [f"{m}_sum" for m in DAILY_METRICS]
+COUNT_COLUMNS = [f"{m}_count" for m in DAILY_METRICS]
+
+# ================================================================================
+# PER-DATE SUMS - ALL USERS, PER MONTH PARTITION
+# ================================================================================
+
+def _partition_fingerprint(part):
+    """Rows and metric totals of a month partition - appended rows always change them"""
+    return (len(part),) + tuple(part[DAILY_SUM_COLUMNS + ['records']].sum().round(6))
+
+def month_date_sums(partitions, previous=None):
+    """Per-date sums and counts of all users for each month partition
+    
+    previous is the result for an earlier version of the partitions - months
+    whose partition is unchanged are reused rather than summed again.
+    """
+    previous = previous or {}
+    month_sums = {}
+    for month, part in partitions.items():
+        fingerprint = _partition_fingerprint(part)
+        if month in previous and previous[month][0] == fingerprint:
+            month_sums[month] = previous[month]
+        else:
+            sums = part.groupby(['date', 'day_of_week'], observed=True)[DAILY_SUM_COLUMNS].sum().reset_index()
+            month_sums[month] = (fingerprint, sums)
+    return month_sums
+
+def population_date_sums(month_sums, start_month=None):
+    """Per-date sums of all users in date order, from start_month on"""
+    months = [month for month in sorted(month_sums) if start_month is None or month >= start_month]
+    if not months:
+        return pd.DataFrame(columns=['date', 'day_of_week'] + DAILY_SUM_COLUMNS)
+    return pd.concat([month_sums[month][1] for month in months], ignore_index=True)
+
+# ================================================================================
+# ROLLING STATISTICS - RUNNING TOTALS AND EWMA STATE
+# ================================================================================
+
+def _calendar(date_sums):
+    """Per-date sums and counts on a gap-free daily calendar"""
+    sums = date_sums.groupby('date')[DAILY_SUM_COLUMNS].sum()
+    dates = pd.date_range(sums.index.min(), sums.index.max(), freq='D')
+    sums = sums.reindex(dates, fill_value=0)
+    return dates, sums[SUM_COLUMNS].to_numpy(dtype=np.float64), sums[COUNT_COLUMNS].to_numpy(dtype=np.float64)
+
+def _empty_state(halflife=EWMA_HALFLIFE_DAYS):
+    """State of a series without days"""
+    m = len(DAILY_METRICS)
+    return {
+        'dates': pd.DatetimeIndex([]),
+        'sum': np.zeros((0, m)),
+        'count': np.zeros((0, m)),
+        'mean': np.zeros((0, m)),
+        # Running totals with a leading zero row: sums, counts, daily means,
+        # squared daily means and days with data up to each date
+        'totals': {key: np.zeros((1, m)) for key in ['sum', 'count', 'mean', 'mean_sq', 'days']},
+        'ewma': np.zeros((0, m)),
+        'halflife': halflife
+    }
+
+def extend_temporal_stats(state, date_sums):
+    """Restate the series from the first date of date_sums on
+    
+    Days before it keep their running totals and EWMA, so only the new
+    days are stepped through - appending a week costs a week of work.
+    date_sums holds the complete per-date sums from its first date on.
+    """
+    if len(date_sums) == 0:
+        return state
+    dates, sums, counts = _calendar(date_sums)
+    
+    # Keep the days before the restated ones, bridging any gap with empty days
+    keep = int(state['dates'].searchsorted(dates[0]))
+    if keep and state['dates'][keep - 1] + pd.Timedelta(days=1) < dates[0]:
+        bridge = pd.date_range(state['dates'][keep - 1] + pd.Timedelta(days=1), dates[0], inclusive='left')
+        dates = bridge.append(dates)
+        sums = np.vstack([np.zeros((len(bridge), sums.shape[1])), sums])
+        counts = np.vstack([np.zeros((len(bridge), counts.shape[1])), counts])
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    has_data = ~np.isnan(means)
+    steps = {
+        'sum': sums,
+        'count': counts,
+        'mean': np.where(has_data, means, 0.0),
+        'mean_sq': np.where(has_data, means * means, 0.0),
+        'days': has_data.astype(np.float64)
+    }
+    # Running totals carry on from the last kept day
+    totals = {
+        key: np.vstack([total[:keep + 1], total[keep] + np.cumsum(steps[key], axis=0)])
+        for key, total in state['totals'].items()
+    }
+    
+    # EWMA recurrence seeded with the last kept day - a day without data carries it
+    alpha = 1 - 0.5 ** (1 / state['halflife'])
+    ewma = np.empty_like(means)
+    last = state['ewma'][keep - 1] if keep else np.full(means.shape[1], np.nan)
+    for i, day in enumerate(means):
+        last = np.where(np.isnan(day), last, np.where(np.isnan(last), day, last + alpha * (day - last)))
+        ewma[i] = last
+    
+    return dict(
+        state,
+        dates=state['dates'][:keep].append(dates),
+        sum=np.vstack([state['sum'][:keep], sums]),
+        count=np.vstack([state['count'][:keep], counts]),
+        mean=np.vstack([state['mean'][:keep], means]),
+        totals=totals,
+        ewma=np.vstack([state['ewma'][:keep], ewma])
+    )
+
+def temporal_stats(date_sums, halflife=EWMA_HALFLIFE_DAYS):
+    """Running totals and EWMA state of the per-date sums"""
+    return extend_temporal_stats(_empty_state(halflife), date_sums)
+
+def _window(total, window):
+    """Sum over the trailing window at every day - NaN until a full window has passed"""
+    n = len(total) - 1
+    ends = np.arange(1, n + 1)
+    values = total[ends] - total[np.maximum(ends - window, 0)]
+    values[ends < window] = np.nan
+    return values
+
+def rolling_frame(state, windows=ROLLING_WINDOWS):
+    """Daily mean, rolling mean / std per window and EWMA of every metric, one row per date
+    
+    A window's mean pools the window's observations; its std is the spread
+    of the daily means in the window.
+    """
+    totals = state['totals']
+    columns = {}
+    for i, metric in enumerate(DAILY_METRICS):
+        columns[metric] = state['mean'][:, i]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for window in windows:
+            sums, counts = _window(totals['sum'], window), _window(totals['count'], window)
+            days, means, sq = (_window(totals[key], window) for key in ['days', 'mean', 'mean_sq'])
+            mean = np.where(counts > 0, sums / counts, np.nan)
+            var = np.where(days > 1, (sq - means * means / days) / (days - 1), np.nan)
+            std = np.sqrt(np.maximum(var, 0.0))
+            for i, metric in enumerate(DAILY_METRICS):
+                columns[f"{metric}_mean_{window}d"] = mean[:, i]
+                columns[f"{metric}_std_{window}d"] = std[:, i]
+    
+    for i, metric in enumerate(DAILY_METRICS):
+        columns[f"{metric}_ewma"] = state['ewma'][:, i]
+    return pd.DataFrame(columns, index=state['dates'].rename('date'))
@@ -0,0 +1,114 @@
+# ================================================================================
+# 📉 ANALYTICS TRAJECTORY — PER-USER LONGITUDINAL FEATURES OF THE DAILY TABLE
+# ================================================================================
+# Description: One row per user describing how their daily usage moved over
+#              time - screen time trend, mood volatility, weekend lift, the
+#              longest run of short-sleep nights and how screen time one day
+#              tracks anxiety the next. The daily rows of every month are
+#              sorted by user and date once, and every feature is a segment
+#              reduction over that order, with no per-user Python loop.
+# ================================================================================
+
+import numpy as np
+import pandas as pd
+
+from .loader import DAILY_METRICS
+
+TRAJECTORY_FEATURES = ['screen_time_slope', 'mood_volatility', 'weekend_weekday_ratio',
+                       'short_sleep_streak', 'anxiety_lag_corr']
+# A night under this many hours of sleep counts towards a short-sleep streak
+SHORT_SLEEP_HOURS = 6.0
+# Fewer paired days than this leave a user's lagged correlation undefined
+MIN_LAG_PAIRS = 5
+
+def _sorted_daily(partitions):
+    """Daily metric means of every user-date, ordered by user and date"""
+    parts = [partitions[month] for month in sorted(partitions)]
+    codes = np.concatenate([part['user_id'].cat.codes.to_numpy() for part in parts])
+    days = np.concatenate([part['date'].to_numpy().astype('datetime64[D]').astype(np.int64) for part in parts])
+    order = np.lexsort((days, codes))
+    values = {}
+    for metric in DAILY_METRICS:
+        sums = np.concatenate([part[f"{metric}_sum"].to_numpy(dtype=np.float64) for part in parts])
+        counts = np.concatenate([part[f"{metric}_count"].to_numpy(dtype=np.float64) for part in parts])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values[metric] = np.where(counts > 0, sums / counts, np.nan)[order]
+    return codes[order], days[order], values
+
+def _segment_sums(codes, n_users, *columns):
+    """Per-user sums of each column over the rows where every column is defined"""
+    valid = np.all([np.isfinite(column) for column in columns], axis=0)
+    n = np.bincount(codes[valid], minlength=n_users).astype(np.float64)
+    return n, [np.bincount(codes[valid], weights=column[valid], minlength=n_users) for column in columns]
+
+def _longest_runs(codes, days, flags, n_users):
+    """Per-user longest run of consecutive calendar days with the flag set"""
+    # A run carries on from the previous row of the same user on the previous day
+    continues = np.zeros(len(flags), dtype=bool)
+    continues[1:] = flags[1:] & flags[:-1] & (codes[1:] == codes[:-1]) & (days[1:] - days[:-1] == 1)
+    starts = flags & ~continues
+    run_ids = np.cumsum(starts) - 1
+    lengths = np.bincount(run_ids[flags], minlength=int(starts.sum()))
+    longest = np.zeros(n_users, dtype=np.int64)
+    np.maximum.at(longest, codes[starts], lengths)
+    return longest
+
+def build_trajectory_features(partitions):
+    """Per-user trajectory features from the daily month partitions, indexed by user_id
+    
+    Users without daily rows, or without enough days for a feature, get
+    NaN for it.
+    """
+    if not partitions:
+        return pd.DataFrame(columns=TRAJECTORY_FEATURES, index=pd.Index([], name='user_id'))
+    users = next(iter(partitions.values()))['user_id'].cat.categories
+    codes, days, values = _sorted_daily(partitions)
+    n_users = len(users)
+    screen, mood = values['screen_time_hours'], values['mood_rating']
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Least squares slope of screen time per day, days offset for precision
+        t = (days - days.min()).astype(np.float64) if len(days) else days.astype(np.float64)
+        n, (st, sy, stt, sty) = _segment_sums(codes, n_users, t, screen, t * t, t * screen)
+        denominator = n * stt - st * st
+        slope = np.where(denominator > 0, (n * sty - st * sy) / denominator, np.nan)
+        
+        # Sample standard deviation of the daily mood
+        n, (sm, smm) = _segment_sums(codes, n_users, mood, mood * mood)
+        volatility = np.sqrt(np.where(n > 1, np.maximum((smm - sm * sm / n) / (n - 1), 0.0), np.nan))
+        
+        # Mean weekend screen time over mean weekday screen time
+        # Day 0 of the epoch was a Thursday, so Monday is 0 and Saturday 5
+        weekend = (days + 3) % 7 >= 5
+        n_end, (s_end,) = _segment_sums(codes, n_users, np.where(weekend, screen, np.nan))
+        n_week, (s_week,) = _segment_sums(codes, n_users, np.where(weekend, np.nan, screen))
+        ratio = (s_end / n_end) / (s_week / n_week)
+        ratio[(n_end == 0) | (n_week == 0) | (s_week == 0)] = np.nan
+        
+        # Pearson correlation of screen time on a day with anxiety on the next
+        paired = (codes[1:] == codes[:-1]) & (days[1:] - days[:-1] == 1)
+        x = np.where(paired, screen[:-1], np.nan)
+        y = np.where(paired, values['anxiety_score_daily'][1:], np.nan)
+        n, (sx, sy, sxx, syy, sxy) = _segment_sums(codes[1:], n_users, x, y, x * x, y * y, x * y)
+        cov = sxy - sx * sy / n
+        lag_corr = cov / np.sqrt((sxx - sx * sx / n) * (syy - sy * sy / n))
+        lag_corr[n < MIN_LAG_PAIRS] = np.nan
+        lag_corr = np.clip(lag_corr, -1.0, 1.0)
+    
+    streak = _longest_runs(codes, days, values['sleep_hours'] < SHORT_SLEEP_HOURS, n_users)
+    features = pd.DataFrame({
+        'screen_time_slope': slope,
+        'mood_volatility': volatility,
+        'weekend_weekday_ratio': ratio,
+        'short_sleep_streak': streak,
+        'anxiety_lag_corr': lag_corr
+    }, index=pd.Index(users, name='user_id'))
+    
+    # Users known to the partitions but without a single daily row
+    seen = np.bincount(codes, minlength=n_users) > 0
+    return features[seen]
+
+def join_trajectory_features(df, features, columns=TRAJECTORY_FEATURES):
+    """df with the trajectory feature columns of its users, NaN for users without daily rows"""
+    joined = features[list(columns)].reindex(df['user_id'].astype(str).to_numpy())
+    return df.assign(**{col: joined[col].to_numpy() for col in columns})
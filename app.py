@@ -7,19 +7,36 @@
 #              patterns and their impact on mental health in India
 # ================================================================================
 
+import time
+import threading
+from contextlib import contextmanager
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, learning_curve
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import confusion_matrix, roc_curve, auc, classification_report
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
-from scipy import stats
+from sklearn.metrics import confusion_matrix, roc_curve, auc
+from analytics import (
+    RADAR_METRICS, RISK_FEATURE_COLUMNS, CORRELATION_COLUMNS,
+    SHARED_TABLES, open_dataset, refresh_dataset, get_memory_report,
+    apply_filters, make_filter_key, platform_membership,
+    build_user_join_index, select_daily_rows,
+    cached_aggregate, platform_set_reach, AGGREGATE_CUBES, DATE_SUM_COLUMNS,
+    query_cube, select_cube_cells,
+    COHORT_NAMES, select_cohort_cells, split_cohort_cells,
+    DAILY_METRICS, ROLLING_WINDOWS, EWMA_HALFLIFE_DAYS, population_date_sums, rolling_frame,
+    TRAJECTORY_FEATURES, build_trajectory_features, join_trajectory_features,
+    SURVEY_NUMERIC_COLUMNS, CORRELATION_METHODS, FDR_ALPHA, correlation_pairs,
+    SCATTER_POINT_BUDGET, SCATTER_MODES, scatter_mode, stratified_sample, density_grid,
+    begin_chart_run, sizing_payloads, chart_data, record_chart, end_chart_run,
+    chart_metrics_records, chart_metrics_summary,
+    profiling_enabled, begin_profile, is_profiling, profile_span, stage_summary,
+    prometheus_metrics, serve_metrics,
+    prepare_training_data, make_model_key,
+    request_model, is_model_ready,
+)
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -300,6 +317,38 @@ def render_kpi_card(label, value, delta=None, delta_type="positive"):
     </div>
     """
 
+# Label and value format of each headline KPI card
+KPI_CARDS = {
+    'avg_screen': ("Avg Screen Time", "{:.1f} hrs"),
+    'avg_anxiety': ("Avg Anxiety Score", "{:.1f}/21"),
+    'high_risk_pct': ("High Risk Users", "{:.1f}%"),
+    'poor_sleep_pct': ("Poor Sleep Quality", "{:.1f}%"),
+    'risk_index': ("Risk Index", "{:.0f}/100"),
+}
+
+def render_cohort_kpis(comparison):
+    """Render a row of KPI cards per cohort against the first cohort, and the Welch t-test table"""
+    baseline = comparison['cohort'].iloc[0]
+    for cohort, rows in comparison.groupby('cohort', sort=False):
+        st.markdown(f"**Cohort {cohort}** · {rows['users'].iloc[0]:,} users")
+        for col, row in zip(st.columns(len(rows)), rows.itertuples(index=False)):
+            label, value_format = KPI_CARDS[row.metric]
+            if cohort == baseline:
+                delta, delta_type = "Baseline", "positive"
+            else:
+                delta = f"{row.diff:+.1f} vs {baseline} · d={row.cohens_d:.2f}, p={row.p_value:.3f}"
+                delta_type = "negative" if row.diff > 0 else "positive"
+            with col:
+                st.markdown(render_kpi_card(
+                    label, value_format.format(row.value), delta, delta_type
+                ), unsafe_allow_html=True)
+    
+    with st.expander(f"🧪 Welch t-tests against cohort {baseline}"):
+        tests = comparison[comparison['cohort'] != baseline].assign(
+            metric=lambda df: df['metric'].map(lambda metric: KPI_CARDS[metric][0])
+        )
+        st.dataframe(tests.round(4), hide_index=True)
+
 def render_insight_box(title, content, color="#3a86ff"):
     """Render a styled insight box"""
     st.markdown(f"""
@@ -313,1165 +362,1659 @@ def render_divider():
     """Render a styled divider"""
     st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
 
+# Cohort whose copy of a tab is being drawn - keys its charts and widgets apart
+# from the other cohorts' copies
+_cohort_scope = threading.local()
+
+@contextmanager
+def cohort_scope(name):
+    """Draw a cohort's copy of a tab, with its own chart and widget keys"""
+    _cohort_scope.name, _cohort_scope.charts = name, 0
+    try:
+        yield
+    finally:
+        _cohort_scope.name = None
+
+def scoped_key(key):
+    """Widget key within the current cohort's copy of a tab - the key itself outside cohort mode"""
+    name = getattr(_cohort_scope, 'name', None)
+    return f"cohort_{name}:{key}" if name else key
+
+def render_chart(fig, chart_id=None):
+    """Render a Plotly figure, recording its build, serialize and render times and payload size
+    
+    chart_id defaults to the figure's title.
+    """
+    emitted_at = time.perf_counter()
+    # The same serialization Streamlit sends to the browser, only on runs that size payloads
+    payload_bytes = serialize_s = None
+    if sizing_payloads():
+        payload_bytes = len(pio.to_json(fig, validate=False).encode('utf-8'))
+        serialize_s = time.perf_counter() - emitted_at
+    serialized_at = time.perf_counter()
+    # Cohorts may draw identical figures, so each cohort's charts get their own keys
+    key = None
+    if getattr(_cohort_scope, 'name', None):
+        _cohort_scope.charts += 1
+        key = scoped_key(f"chart_{_cohort_scope.charts}")
+    st.plotly_chart(fig, use_container_width=True, key=key)
+    record_chart(
+        chart_id or fig.layout.title.text, payload_bytes,
+        serialize_s, time.perf_counter() - serialized_at, emitted_at
+    )
+
+def render_chart_metrics(run):
+    """Render the chart metrics debug panel - this rerun's charts and the recent per-chart summary"""
+    with st.expander("🐞 Chart Metrics"):
+        if run is not None and run['charts']:
+            sized = f", {run['payload_bytes'] / 1e3:,.1f} KB" if run['payload_bytes'] is not None else ''
+            st.markdown(f"**This rerun:** {len(run['charts'])} charts{sized}")
+            st.dataframe(pd.DataFrame(run['charts']).round(1), hide_index=True)
+        
+        records = chart_metrics_records()
+        summary = chart_metrics_summary(records)
+        if not summary.empty:
+            st.markdown(f"**Recent reruns:** {records['run'].nunique()} on this server")
+            st.dataframe(summary.round(1), hide_index=True)
+            st.download_button(
+                "Export metrics (CSV)",
+                records.to_csv(index=False),
+                file_name='chart_metrics.csv',
+                mime='text/csv'
+            )
+
+def render_performance_panel():
+    """Render the profiling admin panel - p50 / p95 per rerun stage and the Prometheus export"""
+    server = get_metrics_server()
+    with st.expander("⏱️ Performance", expanded=True):
+        summary = stage_summary()
+        if summary.empty:
+            st.caption("No profiled reruns yet.")
+        else:
+            st.dataframe(summary.round(2), hide_index=True)
+        if server is not None:
+            st.caption(f"Prometheus endpoint: http://127.0.0.1:{server.server_port}/metrics")
+        else:
+            st.caption("Metrics port in use - served by another process.")
+        st.download_button(
+            "Export metrics (Prometheus)",
+            prometheus_metrics(),
+            file_name='dashboard_metrics.prom',
+            mime='text/plain'
+        )
+
+def build_risk_scatter(df, x, y, size=None, size_max=20, hover_data=None):
+    """Scatter of users coloured by risk category - sampled or binned above the point budget
+    
+    Returns the figure and a caption saying how the users were reduced, if they were.
+    """
+    budget = st.session_state.get('scatter_budget', SCATTER_POINT_BUDGET)
+    mode = scatter_mode(len(df), budget, st.session_state.get('scatter_mode', 'auto'))
+    
+    if mode == 'density':
+        # One set of contour lines per risk category on a shared grid
+        grid = density_grid(df, x, y, 'risk_category')
+        fig = go.Figure()
+        for category, color in RISK_COLORS.items():
+            if category in grid['counts']:
+                fig.add_trace(go.Contour(
+                    x=grid['x'], y=grid['y'], z=grid['counts'][category],
+                    name=category,
+                    showlegend=True,
+                    showscale=False,
+                    ncontours=6,
+                    contours_coloring='lines',
+                    colorscale=[[0, color], [1, color]],
+                    line=dict(width=2),
+                    hovertemplate=f"{category}<br>Users: %{{z:.0f}}<extra></extra>"
+                ))
+        return fig, f"Density of {len(df):,} users per risk category"
+    
+    sample = stratified_sample(df, 'risk_category', budget) if mode == 'webgl' else df
+    fig = px.scatter(
+        sample,
+        x=x,
+        y=y,
+        color='risk_category',
+        color_discrete_map=RISK_COLORS,
+        size=size,
+        size_max=size_max,
+        hover_data=hover_data,
+        opacity=0.6,
+        render_mode='webgl' if mode == 'webgl' else 'auto'
+    )
+    if len(sample) < len(df):
+        return fig, f"Showing {len(sample):,} of {len(df):,} users, sampled per risk category"
+    return fig, None
+
 # ================================================================================
 # DATA LOADING - OPTIMIZED FOR CLOUD
 # ================================================================================
 
-@st.cache_data(ttl=3600)
+@st.cache_resource
+def get_dataset():
+    """Attach the node-wide shared tables and build their indexes once per process"""
+    return open_dataset()
+
 def load_data():
-    """Load all datasets with optimization for cloud deployment"""
+    """Snapshot of the live dataset - appended rows are ingested into it, any other change reloads it in full"""
     try:
-        # Load main survey data (5,000 rows)
-        main_df = pd.read_csv('main_survey_data.csv')
-        
-        # Load daily data - LIMITED to 50K rows for performance
-        daily_df = pd.read_csv('daily_usage_data.csv', nrows=50000)
-        
-        # Load platform metadata
-        platform_df = pd.read_csv('platform_metadata.csv')
-        
-        # Parse dates safely
-        if 'survey_date' in main_df.columns:
-            main_df['survey_date'] = pd.to_datetime(
-                main_df['survey_date'], 
-                errors='coerce'
-            )
-        
-        if 'date' in daily_df.columns:
-            daily_df['date'] = pd.to_datetime(
-                daily_df['date'], 
-                errors='coerce'
-            )
-        
-        # Drop rows with invalid dates
-        main_df = main_df.dropna(subset=['survey_date'])
-        daily_df = daily_df.dropna(subset=['date'])
-        
-        return main_df, daily_df, platform_df
-        
+        return refresh_dataset(get_dataset())
     except Exception:
-        return None, None, None
+        return None
+
+@st.cache_resource
+def get_metrics_server():
+    """Serve the Prometheus export on localhost, once per process"""
+    return serve_metrics()
+
+@st.cache_resource(max_entries=2)
+def get_user_join_index(data_version, _main_df, _daily_partitions):
+    """Build the user join index once per dataset version and share it across sessions"""
+    return build_user_join_index(_main_df, _daily_partitions)
+
+@st.cache_resource(max_entries=2)
+def get_trajectory_features(data_version, _daily_partitions):
+    """Build the per-user trajectory feature table once per dataset version and share it across sessions"""
+    return build_trajectory_features(_daily_partitions)
 
 # ================================================================================
-# MAIN APPLICATION
+# TAB RENDERERS
 # ================================================================================
 
-def main():
-    # Load data
-    main_df, daily_df, platform_df = load_data()
+def render_overview_tab(filtered_df, aggregate):
+    """Render the Overview tab - risk mix, screen time by risk and summary table"""
+    st.markdown("### 📈 Dashboard Overview")
     
-    # Error handling
-    if main_df is None or daily_df is None or platform_df is None:
-        st.error("⚠️ Failed to load data files!")
-        st.markdown("""
-        ### 📁 Required Files
-        Please ensure these CSV files are in your repository:
-        - `main_survey_data.csv`
-        - `daily_usage_data.csv`
-        - `platform_metadata.csv`
-        """)
-        st.stop()
+    col1, col2 = st.columns(2)
     
-    # ==================== HEADER ====================
-    st.markdown("""
-    <div style='text-align: center; padding: 20px 0;'>
-        <h1 style='font-size: 2.5rem; margin-bottom: 10px;'>
-            🧠 Social Media & Mental Health Intelligence Dashboard
-        </h1>
-        <p style='color: #8facc4; font-size: 1.1rem;'>
-            Analyzing behavioral patterns and mental health impact across India
-        </p>
-        <p style='color: #4cc9f0; font-size: 0.9rem;'>
-            📊 {users:,} Users | 📅 {records:,} Daily Records | 🇮🇳 {states} States
-        </p>
-    </div>
-    """.format(
-        users=len(main_df),
-        records=len(daily_df),
-        states=main_df['state'].nunique()
-    ), unsafe_allow_html=True)
+    with col1:
+        # Risk Distribution - Donut Chart
+        risk_counts = aggregate('risk_counts')
+        fig = go.Figure(data=[go.Pie(
+            labels=risk_counts.index,
+            values=risk_counts.values,
+            hole=0.6,
+            marker=dict(colors=[RISK_COLORS.get(cat, '#8facc4') for cat in risk_counts.index]),
+            textinfo='percent+label',
+            textfont=dict(color='white')
+        )])
+        fig.update_layout(**get_chart_layout("Risk Category Distribution"))
+        fig.add_annotation(
+            text=f"<b>{len(filtered_df):,}</b><br>Users",
+            x=0.5, y=0.5, font_size=16, showarrow=False,
+            font=dict(color='white')
+        )
+        render_chart(fig)
     
-    render_divider()
+    with col2:
+        # Screen Time by Risk Category - Bar Chart
+        screen_by_risk = aggregate('screen_by_risk')
+        
+        fig = go.Figure(data=[go.Bar(
+            x=screen_by_risk['avg_daily_screen_time_hrs'],
+            y=screen_by_risk['risk_category'],
+            orientation='h',
+            marker=dict(color=[RISK_COLORS.get(cat, '#8facc4') for cat in screen_by_risk['risk_category']]),
+            text=screen_by_risk['avg_daily_screen_time_hrs'].round(1),
+            textposition='auto',
+            textfont=dict(color='white')
+        )])
+        fig.update_layout(**get_chart_layout("Avg Screen Time by Risk Category"))
+        fig.update_layout(xaxis_title="Hours per Day", yaxis_title="")
+        render_chart(fig)
     
-    # ==================== SIDEBAR FILTERS ====================
-    with st.sidebar:
-        st.markdown("## 🎛️ Filters")
-        st.markdown("---")
-        
-        # Age Group Filter
-        age_groups = ['All'] + sorted(main_df['age_group'].unique().tolist())
-        selected_age = st.selectbox("👤 Age Group", age_groups)
-        
-        # Gender Filter
-        genders = ['All'] + sorted(main_df['gender'].unique().tolist())
-        selected_gender = st.selectbox("⚧ Gender", genders)
-        
-        # Region Filter
-        regions = ['All'] + sorted(main_df['region'].unique().tolist())
-        selected_region = st.selectbox("🗺️ Region", regions)
-        
-        # Platform Filter
-        platforms = ['All'] + sorted(main_df['primary_platform'].unique().tolist())
-        selected_platform = st.selectbox("📱 Platform", platforms)
-        
-        # Screen Time Range
-        st.markdown("### ⏱️ Screen Time Range")
-        screen_time_range = st.slider(
-            "Hours per day",
-            min_value=float(main_df['avg_daily_screen_time_hrs'].min()),
-            max_value=float(main_df['avg_daily_screen_time_hrs'].max()),
-            value=(0.5, 14.0)
-        )
-        
-        # Risk Category Filter
-        risk_cats = ['All'] + sorted(main_df['risk_category'].unique().tolist())
-        selected_risk = st.selectbox("⚠️ Risk Category", risk_cats)
-        
-        st.markdown("---")
-        st.markdown("### 📊 Data Info")
-        st.info(f"""
-        **Users:** {len(main_df):,}  
-        **Daily Records:** {len(daily_df):,}  
-        **Period:** Jan - Jun 2024
-        """)
+    # Insight Box
+    risk_screen = aggregate('screen_by_risk').set_index('risk_category')['avg_daily_screen_time_hrs']
+    if 'High' in risk_screen.index and 'Low' in risk_screen.index:
+        high_risk_screen = risk_screen['High']
+        low_risk_screen = risk_screen['Low']
+        if low_risk_screen > 0:
+            render_insight_box(
+                "📊 Key Insight",
+                f"High-risk users spend <b>{high_risk_screen:.1f} hours</b> on social media daily, "
+                f"which is <b>{((high_risk_screen/low_risk_screen - 1) * 100):.0f}% more</b> than low-risk users "
+                f"({low_risk_screen:.1f} hours). This indicates a strong correlation between screen time and mental health risk.",
+                COLORS['primary']
+            )
     
-    # Apply filters
-    filtered_df = main_df.copy()
-    
-    if selected_age != 'All':
-        filtered_df = filtered_df[filtered_df['age_group'] == selected_age]
-    if selected_gender != 'All':
-        filtered_df = filtered_df[filtered_df['gender'] == selected_gender]
-    if selected_region != 'All':
-        filtered_df = filtered_df[filtered_df['region'] == selected_region]
-    if selected_platform != 'All':
-        filtered_df = filtered_df[filtered_df['primary_platform'] == selected_platform]
-    if selected_risk != 'All':
-        filtered_df = filtered_df[filtered_df['risk_category'] == selected_risk]
-    
-    filtered_df = filtered_df[
-        (filtered_df['avg_daily_screen_time_hrs'] >= screen_time_range[0]) &
-        (filtered_df['avg_daily_screen_time_hrs'] <= screen_time_range[1])
-    ]
+    # Summary Statistics Table
+    st.markdown("### 📋 Summary Statistics")
     
-    # Filter daily data
-    filtered_daily = daily_df[daily_df['user_id'].isin(filtered_df['user_id'])]
+    summary_stats = aggregate('summary_stats')
     
-    # ==================== KPI SECTION ====================
-    st.markdown("## 📊 Key Performance Indicators")
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        st.dataframe(summary_stats, use_container_width=True, hide_index=True)
+
+def render_demographics_tab(filtered_df, aggregate):
+    """Render the Demographics tab - age, gender, education and occupation breakdowns"""
+    st.markdown("### 👥 Demographic Analysis")
     
-    kpi_cols = st.columns(5)
-    
-    with kpi_cols[0]:
-        avg_screen = filtered_df['avg_daily_screen_time_hrs'].mean()
-        st.markdown(render_kpi_card(
-            "Avg Screen Time",
-            f"{avg_screen:.1f} hrs",
-            f"{((avg_screen - main_df['avg_daily_screen_time_hrs'].mean()) / main_df['avg_daily_screen_time_hrs'].mean() * 100):.1f}% vs overall",
-            "negative" if avg_screen > main_df['avg_daily_screen_time_hrs'].mean() else "positive"
-        ), unsafe_allow_html=True)
-    
-    with kpi_cols[1]:
-        avg_anxiety = filtered_df['anxiety_score'].mean()
-        st.markdown(render_kpi_card(
-            "Avg Anxiety Score",
-            f"{avg_anxiety:.1f}/21",
-            f"{((avg_anxiety - main_df['anxiety_score'].mean()) / main_df['anxiety_score'].mean() * 100):.1f}% vs overall",
-            "negative" if avg_anxiety > main_df['anxiety_score'].mean() else "positive"
-        ), unsafe_allow_html=True)
-    
-    with kpi_cols[2]:
-        high_risk_pct = (filtered_df['risk_category'] == 'High').mean() * 100
-        st.markdown(render_kpi_card(
-            "High Risk Users",
-            f"{high_risk_pct:.1f}%",
-            f"{len(filtered_df[filtered_df['risk_category'] == 'High']):,} users",
-            "negative"
-        ), unsafe_allow_html=True)
-    
-    with kpi_cols[3]:
-        poor_sleep_pct = (filtered_df['sleep_quality_category'].isin(['Poor', 'Very Poor'])).mean() * 100
-        st.markdown(render_kpi_card(
-            "Poor Sleep Quality",
-            f"{poor_sleep_pct:.1f}%",
-            f"{len(filtered_df[filtered_df['sleep_quality_category'].isin(['Poor', 'Very Poor'])]):,} users",
-            "negative"
-        ), unsafe_allow_html=True)
-    
-    with kpi_cols[4]:
-        risk_index = filtered_df['mental_health_risk_score'].mean()
-        st.markdown(render_kpi_card(
-            "Risk Index",
-            f"{risk_index:.0f}/100",
-            "Composite Score",
-            "negative" if risk_index > 50 else "positive"
-        ), unsafe_allow_html=True)
+    col1, col2 = st.columns(2)
     
-    render_divider()
+    with col1:
+        # Age Distribution - Histogram
+        fig = px.histogram(
+            filtered_df, x='age', nbins=30,
+            color_discrete_sequence=[COLORS['primary']],
+            labels={'age': 'Age', 'count': 'Number of Users'}
+        )
+        fig.update_layout(**get_chart_layout("Age Distribution"))
+        render_chart(fig)
     
-    # ==================== MAIN TABS ====================
-    tabs = st.tabs([
-        "📈 Overview",
-        "👥 Demographics", 
-        "📱 Platforms",
-        "⏰ Temporal",
-        "🧠 Mental Health",
-        "😴 Sleep",
-        "🔗 Correlations",
-        "🗺️ Geographic",
-        "🤖 ML Predictions",
-        "⚖️ Ethics"
-    ])
-    
-    # ==================== TAB 1: OVERVIEW ====================
-    with tabs[0]:
-        st.markdown("### 📈 Dashboard Overview")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Risk Distribution - Donut Chart
-            risk_counts = filtered_df['risk_category'].value_counts()
-            fig = go.Figure(data=[go.Pie(
-                labels=risk_counts.index,
-                values=risk_counts.values,
-                hole=0.6,
-                marker=dict(colors=[RISK_COLORS.get(cat, '#8facc4') for cat in risk_counts.index]),
-                textinfo='percent+label',
-                textfont=dict(color='white')
-            )])
-            fig.update_layout(**get_chart_layout("Risk Category Distribution"))
-            fig.add_annotation(
-                text=f"<b>{len(filtered_df):,}</b><br>Users",
-                x=0.5, y=0.5, font_size=16, showarrow=False,
-                font=dict(color='white')
-            )
-            st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            # Screen Time by Risk Category - Bar Chart
-            screen_by_risk = filtered_df.groupby('risk_category')['avg_daily_screen_time_hrs'].mean().reset_index()
-            screen_by_risk = screen_by_risk.sort_values('avg_daily_screen_time_hrs')
-            
-            fig = go.Figure(data=[go.Bar(
-                x=screen_by_risk['avg_daily_screen_time_hrs'],
-                y=screen_by_risk['risk_category'],
-                orientation='h',
-                marker=dict(color=[RISK_COLORS.get(cat, '#8facc4') for cat in screen_by_risk['risk_category']]),
-                text=screen_by_risk['avg_daily_screen_time_hrs'].round(1),
-                textposition='auto',
-                textfont=dict(color='white')
-            )])
-            fig.update_layout(**get_chart_layout("Avg Screen Time by Risk Category"))
-            fig.update_layout(xaxis_title="Hours per Day", yaxis_title="")
-            st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        # Gender Distribution - Pie Chart
+        gender_counts = aggregate('gender_counts')
+        fig = go.Figure(data=[go.Pie(
+            labels=gender_counts.index,
+            values=gender_counts.values,
+            marker=dict(colors=CHART_COLORS[:len(gender_counts)]),
+            textinfo='percent+label',
+            textfont=dict(color='white')
+        )])
+        fig.update_layout(**get_chart_layout("Gender Distribution"))
+        render_chart(fig)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Age Group by Risk - Grouped Bar Chart
+        age_risk = aggregate('age_risk_counts')
         
-        # Insight Box
-        if len(filtered_df[filtered_df['risk_category'] == 'High']) > 0 and len(filtered_df[filtered_df['risk_category'] == 'Low']) > 0:
-            high_risk_screen = filtered_df[filtered_df['risk_category'] == 'High']['avg_daily_screen_time_hrs'].mean()
-            low_risk_screen = filtered_df[filtered_df['risk_category'] == 'Low']['avg_daily_screen_time_hrs'].mean()
-            if low_risk_screen > 0:
-                render_insight_box(
-                    "📊 Key Insight",
-                    f"High-risk users spend <b>{high_risk_screen:.1f} hours</b> on social media daily, "
-                    f"which is <b>{((high_risk_screen/low_risk_screen - 1) * 100):.0f}% more</b> than low-risk users "
-                    f"({low_risk_screen:.1f} hours). This indicates a strong correlation between screen time and mental health risk.",
-                    COLORS['primary']
-                )
+        fig = go.Figure()
+        for i, risk in enumerate(age_risk.columns):
+            fig.add_trace(go.Bar(
+                name=risk,
+                x=age_risk.index,
+                y=age_risk[risk],
+                marker_color=RISK_COLORS.get(risk, CHART_COLORS[i])
+            ))
         
-        # Summary Statistics Table
-        st.markdown("### 📋 Summary Statistics")
+        fig.update_layout(**get_chart_layout("Risk Distribution by Age Group"))
+        fig.update_layout(barmode='group', xaxis_title="Age Group", yaxis_title="Count")
+        render_chart(fig)
+    
+    with col2:
+        # Education - Lollipop Chart
+        edu_counts = aggregate('education_counts')
         
-        summary_stats = pd.DataFrame({
-            'Metric': ['Total Users', 'Avg Age', 'Avg Screen Time', 'Avg Anxiety', 'Avg Depression', 
-                      'Avg Sleep Hours', 'Night Users %', 'High Risk %'],
-            'Value': [
-                f"{len(filtered_df):,}",
-                f"{filtered_df['age'].mean():.1f} years",
-                f"{filtered_df['avg_daily_screen_time_hrs'].mean():.2f} hrs/day",
-                f"{filtered_df['anxiety_score'].mean():.1f}/21",
-                f"{filtered_df['depression_score'].mean():.1f}/27",
-                f"{filtered_df['avg_sleep_hours'].mean():.1f} hrs",
-                f"{filtered_df['night_usage'].mean() * 100:.1f}%",
-                f"{(filtered_df['risk_category'] == 'High').mean() * 100:.1f}%"
-            ]
-        })
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=edu_counts.values,
+            y=edu_counts.index,
+            mode='markers',
+            marker=dict(size=15, color=COLORS['primary']),
+            name='Count'
+        ))
+        for i, (edu, count) in enumerate(edu_counts.items()):
+            fig.add_shape(
+                type='line',
+                x0=0, x1=count,
+                y0=edu, y1=edu,
+                line=dict(color=COLORS['primary'], width=2)
+            )
         
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            st.dataframe(summary_stats, use_container_width=True, hide_index=True)
+        fig.update_layout(**get_chart_layout("Education Level Distribution"))
+        fig.update_layout(xaxis_title="Number of Users", yaxis_title="")
+        render_chart(fig)
+    
+    # Occupation Breakdown - Stacked Bar
+    st.markdown("#### 💼 Occupation vs Screen Time Category")
+    
+    occ_screen = aggregate('occupation_screen')
+    
+    fig = go.Figure()
+    for col in occ_screen.columns:
+        fig.add_trace(go.Bar(
+            name=col,
+            x=occ_screen.index,
+            y=occ_screen[col],
+            marker_color=CHART_COLORS[list(occ_screen.columns).index(col) % len(CHART_COLORS)]
+        ))
+    
+    fig.update_layout(**get_chart_layout("Screen Time Category by Occupation (%)"))
+    fig.update_layout(barmode='stack', xaxis_title="Occupation", yaxis_title="Percentage")
+    render_chart(fig)
+
+def render_platforms_tab(filtered_df, membership, aggregate):
+    """Render the Platforms tab - platform usage, scores, multi-platform use and hierarchies"""
+    st.markdown("### 📱 Platform Analysis")
+    
+    col1, col2 = st.columns(2)
     
-    # ==================== TAB 2: DEMOGRAPHICS ====================
-    with tabs[1]:
-        st.markdown("### 👥 Demographic Analysis")
+    with col1:
+        # Platform Usage - Bar Chart
+        platform_counts = aggregate('platform_counts')
+        
+        fig = go.Figure(data=[go.Bar(
+            x=platform_counts.values,
+            y=platform_counts.index,
+            orientation='h',
+            marker=dict(color=CHART_COLORS[:len(platform_counts)]),
+            text=platform_counts.values,
+            textposition='auto',
+            textfont=dict(color='white')
+        )])
+        fig.update_layout(**get_chart_layout("Primary Platform Usage"))
+        fig.update_layout(xaxis_title="Number of Users", yaxis_title="")
+        render_chart(fig)
+    
+    with col2:
+        # Anxiety by Platform - Grouped Bar
+        platform_anxiety = aggregate('platform_scores')
         
-        col1, col2 = st.columns(2)
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            name='Anxiety',
+            x=platform_anxiety['primary_platform'],
+            y=platform_anxiety['anxiety_score'],
+            marker_color=COLORS['warning']
+        ))
+        fig.add_trace(go.Bar(
+            name='Depression',
+            x=platform_anxiety['primary_platform'],
+            y=platform_anxiety['depression_score'],
+            marker_color=COLORS['danger']
+        ))
         
-        with col1:
-            # Age Distribution - Histogram
-            fig = px.histogram(
-                filtered_df, x='age', nbins=30,
-                color_discrete_sequence=[COLORS['primary']],
-                labels={'age': 'Age', 'count': 'Number of Users'}
-            )
-            fig.update_layout(**get_chart_layout("Age Distribution"))
-            st.plotly_chart(fig, use_container_width=True)
+        fig.update_layout(**get_chart_layout("Mental Health Scores by Platform"))
+        fig.update_layout(barmode='group', xaxis_title="Platform", yaxis_title="Score")
+        render_chart(fig)
+    
+    # Multi-platform usage - reach and co-usage from the cube, set reach from the membership matrix
+    st.markdown("#### 🔀 Multi-Platform Usage")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Reach - share of users on each platform, primary or not
+        reach = aggregate('platform_reach')
+        
+        fig = go.Figure(data=[go.Bar(
+            x=reach['reach_pct'],
+            y=reach.index,
+            orientation='h',
+            marker=dict(color=COLORS['secondary']),
+            text=reach['reach_pct'].round(1).astype(str) + '%',
+            textposition='auto',
+            textfont=dict(color='white')
+        )])
+        fig.update_layout(**get_chart_layout("Platform Reach (Any Use)"))
+        fig.update_layout(xaxis_title="% of Users", yaxis_title="", yaxis=dict(autorange='reversed'))
+        render_chart(fig)
+    
+    with col2:
+        # Co-usage - share of each row platform's users also on the column platform
+        co_usage = aggregate('platform_co_usage')
+        users = np.diag(co_usage.to_numpy())
+        overlap = co_usage.to_numpy() / np.maximum(users, 1)[:, None] * 100
         
-        with col2:
-            # Gender Distribution - Pie Chart
-            gender_counts = filtered_df['gender'].value_counts()
-            fig = go.Figure(data=[go.Pie(
-                labels=gender_counts.index,
-                values=gender_counts.values,
-                marker=dict(colors=CHART_COLORS[:len(gender_counts)]),
-                textinfo='percent+label',
-                textfont=dict(color='white')
-            )])
-            fig.update_layout(**get_chart_layout("Gender Distribution"))
-            st.plotly_chart(fig, use_container_width=True)
+        fig = go.Figure(data=go.Heatmap(
+            z=overlap,
+            x=co_usage.columns,
+            y=co_usage.index,
+            colorscale=[[0, '#1a2d47'], [1, '#4cc9f0']],
+            text=np.round(overlap, 0),
+            texttemplate='%{text}',
+            textfont=dict(color='white', size=9),
+            hovertemplate='%{y} users also on %{x}: %{z:.1f}%<extra></extra>'
+        ))
+        fig.update_layout(**get_chart_layout("Platform Co-Usage (% of Row Platform)"))
+        render_chart(fig)
+    
+    # Combined reach of a platform set
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        platform_set = st.multiselect(
+            "Platform set", list(membership.columns), default=list(membership.columns[:2]),
+            key=scoped_key('platform_set')
+        )
+    with col2:
+        require_all = st.radio(
+            "Users on", ['Any', 'All'], horizontal=True, key=scoped_key('platform_set_all')
+        ) == 'All'
+    
+    set_users = platform_set_reach(membership, platform_set, require_all)
+    per_user = aggregate('platforms_per_user')
+    avg_platforms = (per_user.index.to_numpy() * per_user.to_numpy()).sum() / max(per_user.sum(), 1)
+    render_insight_box(
+        "Platform Set Reach",
+        f"<b>{set_users:,}</b> users ({set_users / max(len(membership), 1) * 100:.1f}%) use "
+        f"{'all' if require_all else 'any'} of {', '.join(platform_set) or 'no platforms'}. "
+        f"Users are on <b>{avg_platforms:.1f}</b> platforms on average."
+    )
+    
+    # Treemap - Platform by Region
+    st.markdown("#### 🌳 Platform Usage Hierarchy")
+    
+    treemap_data = aggregate('region_platform')
+    
+    fig = px.treemap(
+        treemap_data,
+        path=['region', 'primary_platform'],
+        values='count',
+        color='count',
+        color_continuous_scale=['#1a2d47', '#3a86ff', '#4cc9f0']
+    )
+    fig.update_layout(**get_chart_layout("Platform Distribution by Region", height=500))
+    fig.update_traces(textfont=dict(color='white'))
+    render_chart(fig)
+    
+    # Sunburst - Platform > Usage Type > Risk
+    st.markdown("#### 🌞 Platform → Screen Time → Risk Hierarchy")
+    
+    sunburst_data = aggregate('platform_screen_risk')
+    
+    fig = px.sunburst(
+        sunburst_data,
+        path=['primary_platform', 'screen_time_category', 'risk_category'],
+        values='count',
+        color='count',
+        color_continuous_scale=['#1a2d47', '#3a86ff', '#4cc9f0']
+    )
+    fig.update_layout(**get_chart_layout("Platform → Usage → Risk Breakdown", height=500))
+    fig.update_traces(textfont=dict(color='white'))
+    render_chart(fig)
+
+def render_temporal_tab(select_daily, aggregate, rolling=None):
+    """Render the Temporal tab - daily trends, rolling statistics, weekday patterns and weekly heatmap
+    
+    rolling is the precomputed rolling statistics of these users, if any -
+    otherwise they are computed from the per-date sums.
+    """
+    st.markdown("### ⏰ Temporal Analysis")
+    
+    # Daily trends - fold the per-user sums down to one row per date, reading
+    # the daily partitions only on a cache miss
+    date_sums = aggregate('date_sums', select_daily)
+    if len(date_sums) > 0:
+        if rolling is None:
+            rolling = aggregate('rolling_stats', date_sums)
+        daily_trends = rolling.reset_index()
         
         col1, col2 = st.columns(2)
         
         with col1:
-            # Age Group by Risk - Grouped Bar Chart
-            age_risk = filtered_df.groupby(['age_group', 'risk_category']).size().unstack(fill_value=0)
-            
+            # Line Chart - Screen Time Trend
             fig = go.Figure()
-            for i, risk in enumerate(age_risk.columns):
-                fig.add_trace(go.Bar(
-                    name=risk,
-                    x=age_risk.index,
-                    y=age_risk[risk],
-                    marker_color=RISK_COLORS.get(risk, CHART_COLORS[i])
-                ))
+            fig.add_trace(go.Scatter(
+                x=daily_trends['date'],
+                y=daily_trends['screen_time_hours'],
+                mode='lines',
+                name='Screen Time',
+                line=dict(color=COLORS['primary'], width=2),
+                fill='tozeroy',
+                fillcolor='rgba(58, 134, 255, 0.1)'
+            ))
+            
+            # Add moving average
+            fig.add_trace(go.Scatter(
+                x=daily_trends['date'],
+                y=daily_trends['screen_time_hours_mean_7d'],
+                mode='lines',
+                name='7-Day MA',
+                line=dict(color=COLORS['warning'], width=2, dash='dash')
+            ))
             
-            fig.update_layout(**get_chart_layout("Risk Distribution by Age Group"))
-            fig.update_layout(barmode='group', xaxis_title="Age Group", yaxis_title="Count")
-            st.plotly_chart(fig, use_container_width=True)
+            fig.update_layout(**get_chart_layout("Screen Time Trend"))
+            fig.update_layout(xaxis_title="Date", yaxis_title="Hours")
+            render_chart(fig)
         
         with col2:
-            # Education - Lollipop Chart
-            edu_counts = filtered_df['education'].value_counts().sort_values()
-            
+            # Area Chart - Anxiety Trend
             fig = go.Figure()
             fig.add_trace(go.Scatter(
-                x=edu_counts.values,
-                y=edu_counts.index,
-                mode='markers',
-                marker=dict(size=15, color=COLORS['primary']),
-                name='Count'
+                x=daily_trends['date'],
+                y=daily_trends['anxiety_score_daily'],
+                mode='lines',
+                name='Anxiety',
+                line=dict(color=COLORS['danger'], width=2),
+                fill='tozeroy',
+                fillcolor='rgba(248, 113, 113, 0.2)'
             ))
-            for i, (edu, count) in enumerate(edu_counts.items()):
-                fig.add_shape(
-                    type='line',
-                    x0=0, x1=count,
-                    y0=edu, y1=edu,
-                    line=dict(color=COLORS['primary'], width=2)
-                )
             
-            fig.update_layout(**get_chart_layout("Education Level Distribution"))
-            fig.update_layout(xaxis_title="Number of Users", yaxis_title="")
-            st.plotly_chart(fig, use_container_width=True)
+            fig.update_layout(**get_chart_layout("Anxiety Score Trend"))
+            fig.update_layout(xaxis_title="Date", yaxis_title="Score")
+            render_chart(fig)
         
-        # Occupation Breakdown - Stacked Bar
-        st.markdown("#### 💼 Occupation vs Screen Time Category")
+        # Rolling Statistics - window mean with a one-std band and the EWMA
+        st.markdown("#### 📉 Rolling Statistics")
         
-        occ_screen = pd.crosstab(filtered_df['occupation'], filtered_df['screen_time_category'], normalize='index') * 100
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            metric = st.selectbox(
+                "Daily metric",
+                DAILY_METRICS,
+                format_func=lambda name: name.replace('_daily', '').replace('_', ' ').title(),
+                key=scoped_key('rolling_metric')
+            )
+        with col2:
+            window = st.radio(
+                "Window",
+                ROLLING_WINDOWS,
+                format_func=lambda days: f"{days} days",
+                horizontal=True,
+                key=scoped_key('rolling_window')
+            )
         
+        mean = daily_trends[f"{metric}_mean_{window}d"]
+        std = daily_trends[f"{metric}_std_{window}d"]
+        label = metric.replace('_daily', '').replace('_', ' ').title()
         fig = go.Figure()
-        for col in occ_screen.columns:
-            fig.add_trace(go.Bar(
-                name=col,
-                x=occ_screen.index,
-                y=occ_screen[col],
-                marker_color=CHART_COLORS[list(occ_screen.columns).index(col) % len(CHART_COLORS)]
-            ))
+        fig.add_trace(go.Scatter(
+            x=daily_trends['date'], y=mean + std,
+            mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'
+        ))
+        fig.add_trace(go.Scatter(
+            x=daily_trends['date'], y=mean - std,
+            mode='lines', line=dict(width=0), fill='tonexty',
+            fillcolor='rgba(76, 201, 240, 0.15)', name='±1 Std'
+        ))
+        fig.add_trace(go.Scatter(
+            x=daily_trends['date'], y=daily_trends[metric],
+            mode='lines', name='Daily',
+            line=dict(color=COLORS['neutral'], width=1)
+        ))
+        fig.add_trace(go.Scatter(
+            x=daily_trends['date'], y=mean,
+            mode='lines', name=f'{window}-Day Mean',
+            line=dict(color=COLORS['secondary'], width=2)
+        ))
+        fig.add_trace(go.Scatter(
+            x=daily_trends['date'], y=daily_trends[f"{metric}_ewma"],
+            mode='lines', name=f'EWMA ({EWMA_HALFLIFE_DAYS}-day half-life)',
+            line=dict(color=COLORS['warning'], width=2, dash='dot')
+        ))
+        fig.update_layout(**get_chart_layout(f"{label} - Rolling {window}-Day Statistics"))
+        fig.update_layout(xaxis_title="Date", yaxis_title=label)
+        render_chart(fig, "Rolling Statistics")
         
-        fig.update_layout(**get_chart_layout("Screen Time Category by Occupation (%)"))
-        fig.update_layout(barmode='stack', xaxis_title="Occupation", yaxis_title="Percentage")
-        st.plotly_chart(fig, use_container_width=True)
-    
-    # ==================== TAB 3: PLATFORM ANALYSIS ====================
-    with tabs[2]:
-        st.markdown("### 📱 Platform Analysis")
+        # Day of Week Analysis
+        st.markdown("#### 📅 Day of Week Patterns")
+        
+        dow_analysis = aggregate('dow_means', date_sums)
         
         col1, col2 = st.columns(2)
         
         with col1:
-            # Platform Usage - Bar Chart
-            platform_counts = filtered_df['primary_platform'].value_counts()
-            
             fig = go.Figure(data=[go.Bar(
-                x=platform_counts.values,
-                y=platform_counts.index,
-                orientation='h',
-                marker=dict(color=CHART_COLORS[:len(platform_counts)]),
-                text=platform_counts.values,
+                x=dow_analysis.index,
+                y=dow_analysis['screen_time_hours'],
+                marker_color=[COLORS['warning'] if day in ['Saturday', 'Sunday'] else COLORS['primary'] 
+                             for day in dow_analysis.index],
+                text=dow_analysis['screen_time_hours'].round(1),
                 textposition='auto',
                 textfont=dict(color='white')
             )])
-            fig.update_layout(**get_chart_layout("Primary Platform Usage"))
-            fig.update_layout(xaxis_title="Number of Users", yaxis_title="")
-            st.plotly_chart(fig, use_container_width=True)
+            fig.update_layout(**get_chart_layout("Avg Screen Time by Day"))
+            fig.update_layout(xaxis_title="", yaxis_title="Hours")
+            render_chart(fig)
         
         with col2:
-            # Anxiety by Platform - Grouped Bar
-            platform_anxiety = filtered_df.groupby('primary_platform').agg({
-                'anxiety_score': 'mean',
-                'depression_score': 'mean'
-            }).round(1).reset_index()
-            
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                name='Anxiety',
-                x=platform_anxiety['primary_platform'],
-                y=platform_anxiety['anxiety_score'],
-                marker_color=COLORS['warning']
-            ))
-            fig.add_trace(go.Bar(
-                name='Depression',
-                x=platform_anxiety['primary_platform'],
-                y=platform_anxiety['depression_score'],
-                marker_color=COLORS['danger']
-            ))
+            # Weekly Heatmap
+            calendar_data = aggregate('weekly_screen', date_sums)
             
-            fig.update_layout(**get_chart_layout("Mental Health Scores by Platform"))
-            fig.update_layout(barmode='group', xaxis_title="Platform", yaxis_title="Score")
-            st.plotly_chart(fig, use_container_width=True)
-        
-        # Treemap - Platform by Region
-        st.markdown("#### 🌳 Platform Usage Hierarchy")
-        
-        treemap_data = filtered_df.groupby(['region', 'primary_platform']).size().reset_index(name='count')
+            if len(calendar_data) > 0:
+                fig = go.Figure(data=go.Heatmap(
+                    z=calendar_data.values,
+                    x=calendar_data.columns,
+                    y=[f"Week {w}" for w in calendar_data.index],
+                    colorscale=[[0, '#1a2d47'], [0.5, '#3a86ff'], [1, '#f87171']],
+                    hovertemplate='%{y}, %{x}<br>Screen Time: %{z:.1f} hrs<extra></extra>'
+                ))
+                fig.update_layout(**get_chart_layout("Weekly Usage Heatmap"))
+                render_chart(fig)
+    else:
+        st.warning("No daily data available for the selected filters.")
+
+def render_mental_health_tab(filtered_df, aggregate):
+    """Render the Mental Health tab - score distributions, radar profile and t-test"""
+    st.markdown("### 🧠 Mental Health Analysis")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Box Plot - Anxiety by Age Group
+        fig = px.box(
+            filtered_df, x='age_group', y='anxiety_score',
+            color='age_group',
+            color_discrete_sequence=CHART_COLORS
+        )
+        fig.update_layout(**get_chart_layout("Anxiety Score Distribution by Age"))
+        fig.update_layout(showlegend=False, xaxis_title="Age Group", yaxis_title="Anxiety Score")
+        render_chart(fig)
+    
+    with col2:
+        # Violin Plot - Depression by Platform
+        top_platforms = aggregate('top_platforms')
+        violin_data = filtered_df[filtered_df['primary_platform'].isin(top_platforms)]
         
-        fig = px.treemap(
-            treemap_data,
-            path=['region', 'primary_platform'],
-            values='count',
-            color='count',
-            color_continuous_scale=['#1a2d47', '#3a86ff', '#4cc9f0']
+        fig = px.violin(
+            violin_data, x='primary_platform', y='depression_score',
+            color='primary_platform',
+            color_discrete_sequence=CHART_COLORS,
+            box=True
         )
-        fig.update_layout(**get_chart_layout("Platform Distribution by Region", height=500))
-        fig.update_traces(textfont=dict(color='white'))
-        st.plotly_chart(fig, use_container_width=True)
+        fig.update_layout(**get_chart_layout("Depression Score by Platform"))
+        fig.update_layout(showlegend=False, xaxis_title="Platform", yaxis_title="Depression Score")
+        render_chart(fig)
+    
+    # Radar Chart - Mental Health Profile
+    st.markdown("#### 🎯 Mental Health Profile by Risk Category")
+    
+    radar_metrics = RADAR_METRICS
+    radar_labels = ['Anxiety', 'Depression', 'Stress', 'Loneliness', 'FOMO']
+    
+    # Normalize scores for radar
+    radar_data = aggregate('radar_means')
+    
+    if len(radar_data) > 0:
+        # Normalize to 0-1 scale
+        radar_normalized = radar_data.copy()
+        for col in radar_metrics:
+            col_min = radar_data[col].min()
+            col_max = radar_data[col].max()
+            if col_max > col_min:
+                radar_normalized[col] = (radar_data[col] - col_min) / (col_max - col_min)
+            else:
+                radar_normalized[col] = 0.5
         
-        # Sunburst - Platform > Usage Type > Risk
-        st.markdown("#### 🌞 Platform → Screen Time → Risk Hierarchy")
+        fig = go.Figure()
         
-        sunburst_data = filtered_df.groupby(
-            ['primary_platform', 'screen_time_category', 'risk_category']
-        ).size().reset_index(name='count')
+        for risk_cat in radar_normalized.index:
+            values = radar_normalized.loc[risk_cat].values.tolist()
+            values.append(values[0])
+            
+            fig.add_trace(go.Scatterpolar(
+                r=values,
+                theta=radar_labels + [radar_labels[0]],
+                name=risk_cat,
+                line=dict(color=RISK_COLORS.get(risk_cat, '#8facc4'), width=2),
+                fill='toself',
+                fillcolor=f"rgba{tuple(int(RISK_COLORS.get(risk_cat, '#8facc4').lstrip('#')[i:i+2], 16) for i in (0, 2, 4)) + (0.2,)}"
+            ))
         
-        fig = px.sunburst(
-            sunburst_data,
-            path=['primary_platform', 'screen_time_category', 'risk_category'],
-            values='count',
-            color='count',
-            color_continuous_scale=['#1a2d47', '#3a86ff', '#4cc9f0']
+        fig.update_layout(**get_chart_layout("Mental Health Radar by Risk Category", height=500))
+        fig.update_layout(
+            polar=dict(
+                radialaxis=dict(visible=True, range=[0, 1], gridcolor='rgba(58,134,255,0.2)'),
+                angularaxis=dict(gridcolor='rgba(58,134,255,0.2)')
+            )
         )
-        fig.update_layout(**get_chart_layout("Platform → Usage → Risk Breakdown", height=500))
-        fig.update_traces(textfont=dict(color='white'))
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(fig)
     
-    # ==================== TAB 4: TEMPORAL ANALYSIS ====================
-    with tabs[3]:
-        st.markdown("### ⏰ Temporal Analysis")
-        
-        if len(filtered_daily) > 0:
-            # Daily trends
-            daily_trends = filtered_daily.groupby('date').agg({
-                'screen_time_hours': 'mean',
-                'anxiety_score_daily': 'mean',
-                'sleep_hours': 'mean',
-                'mood_rating': 'mean'
-            }).reset_index()
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Line Chart - Screen Time Trend
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(
-                    x=daily_trends['date'],
-                    y=daily_trends['screen_time_hours'],
-                    mode='lines',
-                    name='Screen Time',
-                    line=dict(color=COLORS['primary'], width=2),
-                    fill='tozeroy',
-                    fillcolor='rgba(58, 134, 255, 0.1)'
-                ))
-                
-                # Add moving average
-                daily_trends['ma_7'] = daily_trends['screen_time_hours'].rolling(7).mean()
-                fig.add_trace(go.Scatter(
-                    x=daily_trends['date'],
-                    y=daily_trends['ma_7'],
-                    mode='lines',
-                    name='7-Day MA',
-                    line=dict(color=COLORS['warning'], width=2, dash='dash')
-                ))
-                
-                fig.update_layout(**get_chart_layout("Screen Time Trend"))
-                fig.update_layout(xaxis_title="Date", yaxis_title="Hours")
-                st.plotly_chart(fig, use_container_width=True)
-            
-            with col2:
-                # Area Chart - Anxiety Trend
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(
-                    x=daily_trends['date'],
-                    y=daily_trends['anxiety_score_daily'],
-                    mode='lines',
-                    name='Anxiety',
-                    line=dict(color=COLORS['danger'], width=2),
-                    fill='tozeroy',
-                    fillcolor='rgba(248, 113, 113, 0.2)'
-                ))
-                
-                fig.update_layout(**get_chart_layout("Anxiety Score Trend"))
-                fig.update_layout(xaxis_title="Date", yaxis_title="Score")
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # Day of Week Analysis
-            st.markdown("#### 📅 Day of Week Patterns")
-            
-            dow_analysis = filtered_daily.groupby('day_of_week').agg({
-                'screen_time_hours': 'mean',
-                'anxiety_score_daily': 'mean'
-            }).reindex(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                fig = go.Figure(data=[go.Bar(
-                    x=dow_analysis.index,
-                    y=dow_analysis['screen_time_hours'],
-                    marker_color=[COLORS['warning'] if day in ['Saturday', 'Sunday'] else COLORS['primary'] 
-                                 for day in dow_analysis.index],
-                    text=dow_analysis['screen_time_hours'].round(1),
-                    textposition='auto',
-                    textfont=dict(color='white')
-                )])
-                fig.update_layout(**get_chart_layout("Avg Screen Time by Day"))
-                fig.update_layout(xaxis_title="", yaxis_title="Hours")
-                st.plotly_chart(fig, use_container_width=True)
-            
-            with col2:
-                # Weekly Heatmap
-                filtered_daily['week'] = filtered_daily['date'].dt.isocalendar().week
-                
-                calendar_data = filtered_daily.groupby(['week', 'day_of_week'])['screen_time_hours'].mean().unstack()
-                calendar_data = calendar_data.reindex(columns=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
-                
-                if len(calendar_data) > 0:
-                    fig = go.Figure(data=go.Heatmap(
-                        z=calendar_data.values,
-                        x=calendar_data.columns,
-                        y=[f"Week {w}" for w in calendar_data.index],
-                        colorscale=[[0, '#1a2d47'], [0.5, '#3a86ff'], [1, '#f87171']],
-                        hovertemplate='%{y}, %{x}<br>Screen Time: %{z:.1f} hrs<extra></extra>'
-                    ))
-                    fig.update_layout(**get_chart_layout("Weekly Usage Heatmap"))
-                    st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.warning("No daily data available for the selected filters.")
+    # T-test Analysis
+    st.markdown("#### 📊 Statistical Validation")
     
-    # ==================== TAB 5: MENTAL HEALTH ====================
-    with tabs[4]:
-        st.markdown("### 🧠 Mental Health Analysis")
-        
-        col1, col2 = st.columns(2)
+    ttest = aggregate('screen_anxiety_ttest')
+    
+    if ttest is not None:
+        p_value = ttest['p_value']
         
+        col1, col2, col3 = st.columns(3)
         with col1:
-            # Box Plot - Anxiety by Age Group
-            fig = px.box(
-                filtered_df, x='age_group', y='anxiety_score',
-                color='age_group',
-                color_discrete_sequence=CHART_COLORS
-            )
-            fig.update_layout(**get_chart_layout("Anxiety Score Distribution by Age"))
-            fig.update_layout(showlegend=False, xaxis_title="Age Group", yaxis_title="Anxiety Score")
-            st.plotly_chart(fig, use_container_width=True)
-        
+            st.metric("High Screen Time Anxiety", f"{ttest['high_mean']:.2f}")
         with col2:
-            # Violin Plot - Depression by Platform
-            top_platforms = filtered_df['primary_platform'].value_counts().head(5).index.tolist()
-            violin_data = filtered_df[filtered_df['primary_platform'].isin(top_platforms)]
-            
-            fig = px.violin(
-                violin_data, x='primary_platform', y='depression_score',
-                color='primary_platform',
-                color_discrete_sequence=CHART_COLORS,
-                box=True
-            )
-            fig.update_layout(**get_chart_layout("Depression Score by Platform"))
-            fig.update_layout(showlegend=False, xaxis_title="Platform", yaxis_title="Depression Score")
-            st.plotly_chart(fig, use_container_width=True)
-        
-        # Radar Chart - Mental Health Profile
-        st.markdown("#### 🎯 Mental Health Profile by Risk Category")
+            st.metric("Low Screen Time Anxiety", f"{ttest['low_mean']:.2f}")
+        with col3:
+            significance = "✅ Significant" if p_value < 0.05 else "❌ Not Significant"
+            st.metric("p-value", f"{p_value:.4f}", significance)
         
-        radar_metrics = ['anxiety_score', 'depression_score', 'stress_score', 
-                        'loneliness_score', 'fomo_score']
-        radar_labels = ['Anxiety', 'Depression', 'Stress', 'Loneliness', 'FOMO']
-        
-        # Normalize scores for radar
-        radar_data = filtered_df.groupby('risk_category')[radar_metrics].mean()
-        
-        if len(radar_data) > 0:
-            # Normalize to 0-1 scale
-            radar_normalized = radar_data.copy()
-            for col in radar_metrics:
-                col_min = radar_data[col].min()
-                col_max = radar_data[col].max()
-                if col_max > col_min:
-                    radar_normalized[col] = (radar_data[col] - col_min) / (col_max - col_min)
-                else:
-                    radar_normalized[col] = 0.5
-            
-            fig = go.Figure()
-            
-            for risk_cat in radar_normalized.index:
-                values = radar_normalized.loc[risk_cat].values.tolist()
-                values.append(values[0])
-                
-                fig.add_trace(go.Scatterpolar(
-                    r=values,
-                    theta=radar_labels + [radar_labels[0]],
-                    name=risk_cat,
-                    line=dict(color=RISK_COLORS.get(risk_cat, '#8facc4'), width=2),
-                    fill='toself',
-                    fillcolor=f"rgba{tuple(int(RISK_COLORS.get(risk_cat, '#8facc4').lstrip('#')[i:i+2], 16) for i in (0, 2, 4)) + (0.2,)}"
-                ))
-            
-            fig.update_layout(**get_chart_layout("Mental Health Radar by Risk Category", height=500))
-            fig.update_layout(
-                polar=dict(
-                    radialaxis=dict(visible=True, range=[0, 1], gridcolor='rgba(58,134,255,0.2)'),
-                    angularaxis=dict(gridcolor='rgba(58,134,255,0.2)')
-                )
-            )
-            st.plotly_chart(fig, use_container_width=True)
-        
-        # T-test Analysis
-        st.markdown("#### 📊 Statistical Validation")
+        render_insight_box(
+            "📈 Statistical Finding",
+            f"Users with high screen time (≥6 hrs) have significantly higher anxiety scores "
+            f"(mean: {ttest['high_mean']:.2f}) compared to low screen time users (<3 hrs, mean: {ttest['low_mean']:.2f}). "
+            f"This difference is statistically {'significant' if p_value < 0.05 else 'not significant'} (p={p_value:.4f}).",
+            COLORS['success'] if p_value < 0.05 else COLORS['warning']
+        )
+
+def render_sleep_tab(filtered_df, aggregate):
+    """Render the Sleep tab - night usage, sleep quality and sleep hours"""
+    st.markdown("### 😴 Sleep Analysis")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Scatter Plot - Night Usage vs Sleep Quality
+        fig, caption = build_risk_scatter(
+            filtered_df,
+            x='night_usage_hours',
+            y='sleep_quality_score',
+            size='avg_daily_screen_time_hrs',
+            hover_data=['age', 'primary_platform']
+        )
         
-        high_screen = filtered_df[filtered_df['avg_daily_screen_time_hrs'] >= 6]['anxiety_score']
-        low_screen = filtered_df[filtered_df['avg_daily_screen_time_hrs'] < 3]['anxiety_score']
+        # Add trendline
+        sleep_trend = aggregate('sleep_trend')
+        if sleep_trend is not None:
+            fig.add_trace(go.Scatter(
+                x=sleep_trend['x'], y=sleep_trend['y'],
+                mode='lines',
+                name='Trend',
+                line=dict(color='white', dash='dash', width=2)
+            ))
         
-        if len(high_screen) > 0 and len(low_screen) > 0:
-            t_stat, p_value = stats.ttest_ind(high_screen, low_screen)
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("High Screen Time Anxiety", f"{high_screen.mean():.2f}")
-            with col2:
-                st.metric("Low Screen Time Anxiety", f"{low_screen.mean():.2f}")
-            with col3:
-                significance = "✅ Significant" if p_value < 0.05 else "❌ Not Significant"
-                st.metric("p-value", f"{p_value:.4f}", significance)
-            
-            render_insight_box(
-                "📈 Statistical Finding",
-                f"Users with high screen time (≥6 hrs) have significantly higher anxiety scores "
-                f"(mean: {high_screen.mean():.2f}) compared to low screen time users (<3 hrs, mean: {low_screen.mean():.2f}). "
-                f"This difference is statistically {'significant' if p_value < 0.05 else 'not significant'} (p={p_value:.4f}).",
-                COLORS['success'] if p_value < 0.05 else COLORS['warning']
-            )
+        fig.update_layout(**get_chart_layout("Night Usage vs Sleep Quality"))
+        fig.update_layout(xaxis_title="Night Usage (hrs)", yaxis_title="Sleep Quality Score (lower=better)")
+        render_chart(fig)
+        if caption:
+            st.caption(caption)
+    
+    with col2:
+        # Heatmap - Sleep Quality vs Screen Time
+        heatmap_data = aggregate('sleep_screen_anxiety')
+        
+        if len(heatmap_data) > 0:
+            fig = go.Figure(data=go.Heatmap(
+                z=heatmap_data.values,
+                x=heatmap_data.columns,
+                y=heatmap_data.index,
+                colorscale=[[0, '#4ade80'], [0.5, '#fbbf24'], [1, '#f87171']],
+                text=np.round(heatmap_data.values, 1),
+                texttemplate='%{text}',
+                textfont=dict(color='white'),
+                hovertemplate='Sleep: %{y}<br>Screen Time: %{x}<br>Avg Anxiety: %{z:.1f}<extra></extra>'
+            ))
+            fig.update_layout(**get_chart_layout("Sleep Quality × Screen Time → Anxiety"))
+            fig.update_layout(xaxis_title="Screen Time (hrs)", yaxis_title="Sleep Quality")
+            render_chart(fig)
+    
+    # Sleep Hours Distribution by Platform
+    st.markdown("#### 💤 Sleep Hours by Platform")
+    
+    fig = px.box(
+        filtered_df, 
+        x='primary_platform', 
+        y='avg_sleep_hours',
+        color='primary_platform',
+        color_discrete_sequence=CHART_COLORS
+    )
+    fig.update_layout(**get_chart_layout("Sleep Hours Distribution by Platform"))
+    fig.update_layout(showlegend=False, xaxis_title="Platform", yaxis_title="Sleep Hours")
+    render_chart(fig)
+
+# Short display names of the default correlation columns
+CORRELATION_LABELS = {
+    'avg_daily_screen_time_hrs': 'Screen Time',
+    'anxiety_score': 'Anxiety',
+    'depression_score': 'Depression',
+    'stress_score': 'Stress',
+    'sleep_quality_score': 'Sleep Quality',
+    'self_esteem_score': 'Self-Esteem',
+    'loneliness_score': 'Loneliness',
+    'fomo_score': 'FOMO',
+    'avg_sleep_hours': 'Sleep Hours',
+}
+
+def correlation_label(column):
+    """Display name of a numeric survey column"""
+    return CORRELATION_LABELS.get(column, column.replace('_', ' ').title())
+
+def render_correlations_tab(filtered_df, aggregate):
+    """Render the Correlations tab - correlation matrix, bubble chart and parallel coordinates"""
+    st.markdown("### 🔗 Correlation Analysis")
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        columns = st.multiselect(
+            "Columns",
+            SURVEY_NUMERIC_COLUMNS,
+            default=CORRELATION_COLUMNS,
+            format_func=correlation_label,
+            key=scoped_key('corr_columns')
+        )
+    with col2:
+        method = st.radio(
+            "Method",
+            CORRELATION_METHODS,
+            format_func=str.title,
+            horizontal=True,
+            key=scoped_key('corr_method')
+        )
+    if len(columns) < 2:
+        st.warning("Select at least two columns to correlate.")
+        return
+    
+    # Pearson is assembled from the correlation cube's moments; Spearman ranks
+    # the filtered users, only once it is asked for
+    if method == 'spearman':
+        result = aggregate('spearman_matrix', lambda: filtered_df)
+    else:
+        result = aggregate('correlation_matrix')
+    pairs = correlation_pairs(result, columns)
+    
+    # Correlation Matrix, pairs significant at the false discovery rate starred
+    corr_matrix = result['corr'].loc[columns, columns]
+    flagged = pairs[pairs['significant']]
+    flagged = set(zip(flagged['x'], flagged['y'])) | set(zip(flagged['y'], flagged['x']))
+    text = [
+        [f"{corr_matrix.at[a, b]:.2f}" + ('*' if (a, b) in flagged else '') for b in columns]
+        for a in columns
+    ]
+    labels = [correlation_label(col) for col in columns]
     
-    # ==================== TAB 6: SLEEP ANALYSIS ====================
-    with tabs[5]:
-        st.markdown("### 😴 Sleep Analysis")
+    fig = go.Figure(data=go.Heatmap(
+        z=corr_matrix.values,
+        x=labels,
+        y=labels,
+        colorscale=[[0, '#f87171'], [0.5, '#1a2d47'], [1, '#4ade80']],
+        zmid=0,
+        zmin=-1,
+        zmax=1,
+        text=text,
+        texttemplate='%{text}' if len(columns) <= 15 else '',
+        textfont=dict(color='white', size=10),
+        hovertemplate='%{y} vs %{x}<br>Correlation: %{text}<extra></extra>'
+    ))
+    fig.update_layout(**get_chart_layout(
+        f"{method.title()} Correlation Matrix", height=max(500, 28 * len(columns))
+    ))
+    render_chart(fig)
+    st.caption(
+        f"{result['n']:,} users · * significant at a {FDR_ALPHA:.0%} false discovery rate "
+        f"(Benjamini-Hochberg over the {len(pairs):,} pairs shown)"
+    )
+    
+    # Every pair, strongest first - click a header to sort
+    st.markdown("#### 📋 Correlation Pairs")
+    significant_only = st.checkbox("Significant pairs only", key=scoped_key('corr_significant'))
+    pair_table = pairs[pairs['significant']] if significant_only else pairs
+    st.dataframe(
+        pair_table.assign(
+            x=pair_table['x'].map(correlation_label),
+            y=pair_table['y'].map(correlation_label)
+        ).rename(columns={
+            'x': 'Variable 1', 'y': 'Variable 2',
+            'p_value': 'p-value', 'q_value': 'q-value (FDR)', 'significant': 'Significant'
+        }).round({'r': 3}),
+        column_config={
+            'p-value': st.column_config.NumberColumn(format='%.2e'),
+            'q-value (FDR)': st.column_config.NumberColumn(format='%.2e')
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Bubble Chart - 3 variables
+        fig, caption = build_risk_scatter(
+            filtered_df,
+            x='avg_daily_screen_time_hrs',
+            y='anxiety_score',
+            size='follower_count',
+            size_max=30,
+            hover_data=['age', 'primary_platform']
+        )
+        fig.update_layout(**get_chart_layout("Screen Time vs Anxiety vs Followers"))
+        fig.update_layout(xaxis_title="Screen Time (hrs)", yaxis_title="Anxiety Score")
+        render_chart(fig)
+        if caption:
+            st.caption(caption)
+    
+    with col2:
+        # Parallel Coordinates
+        sample_size = min(500, len(filtered_df))
+        parallel_df = filtered_df.sample(sample_size) if len(filtered_df) > sample_size else filtered_df
+        
+        fig = px.parallel_coordinates(
+            parallel_df,
+            dimensions=['avg_daily_screen_time_hrs', 'anxiety_score', 
+                       'depression_score', 'sleep_quality_score', 'mental_health_risk_score'],
+            color='mental_health_risk_score',
+            color_continuous_scale=[[0, '#4ade80'], [0.5, '#fbbf24'], [1, '#f87171']],
+            labels={
+                'avg_daily_screen_time_hrs': 'Screen Time',
+                'anxiety_score': 'Anxiety',
+                'depression_score': 'Depression',
+                'sleep_quality_score': 'Sleep Quality',
+                'mental_health_risk_score': 'Risk Score'
+            }
+        )
+        fig.update_layout(**get_chart_layout("Parallel Coordinates Analysis", height=400))
+        render_chart(fig)
+
+def render_geographic_tab(filtered_df, aggregate):
+    """Render the Geographic tab - state, city and regional breakdowns"""
+    st.markdown("### 🗺️ Geographic Analysis")
+    
+    # State-level aggregation
+    state_data = aggregate('state_summary')
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Risk by State - Bar Chart
+        fig = go.Figure(data=[go.Bar(
+            x=state_data['avg_risk'],
+            y=state_data['state'],
+            orientation='h',
+            marker=dict(
+                color=state_data['avg_risk'],
+                colorscale=[[0, '#4ade80'], [0.5, '#fbbf24'], [1, '#f87171']],
+                showscale=True,
+                colorbar=dict(title='Risk Score')
+            ),
+            text=state_data['avg_risk'].round(1),
+            textposition='auto',
+            textfont=dict(color='white')
+        )])
+        fig.update_layout(**get_chart_layout("Average Risk Score by State"))
+        fig.update_layout(xaxis_title="Risk Score", yaxis_title="")
+        render_chart(fig)
+    
+    with col2:
+        # Point Map - User Locations
+        city_data = aggregate('city_summary')
+        
+        fig = px.scatter_geo(
+            city_data,
+            lat='latitude',
+            lon='longitude',
+            size='user_id',
+            color='mental_health_risk_score',
+            hover_name='city',
+            color_continuous_scale=[[0, '#4ade80'], [0.5, '#fbbf24'], [1, '#f87171']],
+            size_max=30,
+            scope='asia'
+        )
+        fig.update_geos(
+            visible=False,
+            resolution=50,
+            showcountries=True,
+            countrycolor='#2a4a7f',
+            showland=True,
+            landcolor='#0a1628',
+            showocean=True,
+            oceancolor='#0d1b2a',
+            lataxis_range=[6, 38],
+            lonaxis_range=[68, 98]
+        )
+        fig.update_layout(**get_chart_layout("User Distribution Map (India)", height=400))
+        render_chart(fig)
+    
+    # Regional Comparison
+    st.markdown("#### 🌏 Regional Comparison")
+    
+    region_data = aggregate('region_summary')
+    
+    fig = go.Figure()
+    
+    metrics = ['avg_daily_screen_time_hrs', 'anxiety_score', 'depression_score']
+    metric_names = ['Screen Time', 'Anxiety', 'Depression']
+    
+    for i, (metric, name) in enumerate(zip(metrics, metric_names)):
+        fig.add_trace(go.Bar(
+            name=name,
+            x=region_data.index,
+            y=region_data[metric],
+            marker_color=CHART_COLORS[i]
+        ))
+    
+    fig.update_layout(**get_chart_layout("Key Metrics by Region"))
+    fig.update_layout(barmode='group', xaxis_title="Region", yaxis_title="Score")
+    render_chart(fig)
+
+@st.fragment(run_every=2)
+def render_training_placeholder(model_key):
+    """Poll the background training job and rerun the app once the model is ready"""
+    if is_model_ready(model_key):
+        st.rerun()
+    st.info("⏳ Training the risk model in the background… results appear automatically.")
+
+def render_ml_tab(filtered_df, cache_key, trajectory_features):
+    """Render the ML Predictions tab - risk classifier, evaluation and PCA
+    
+    trajectory_features returns the per-user trajectory feature table, only
+    built once one of its features is selected.
+    """
+    st.markdown("### 🤖 Machine Learning & Predictions")
+    
+    # Survey features, plus trajectories of each user's daily usage
+    feature_cols = st.multiselect(
+        "Model features",
+        RISK_FEATURE_COLUMNS + TRAJECTORY_FEATURES,
+        default=RISK_FEATURE_COLUMNS,
+        format_func=lambda name: f"📉 {name}" if name in TRAJECTORY_FEATURES else name,
+        key=scoped_key('ml_features')
+    )
+    if not feature_cols:
+        st.warning("Select at least one feature to train the model.")
+        return
+    
+    # Prepare data for ML
+    trajectory_cols = [col for col in feature_cols if col in TRAJECTORY_FEATURES]
+    if trajectory_cols:
+        filtered_df = join_trajectory_features(filtered_df, trajectory_features(), trajectory_cols)
+    X, y = prepare_training_data(filtered_df, feature_cols)
+    
+    if len(X) > 100:
+        # Fitted models are cached per (data version, filters, features) in memory and on disk
+        model_key = make_model_key(cache_key, feature_cols)
+        try:
+            artefacts = request_model(model_key, X, y)
+        except Exception as error:
+            st.error(f"Training the risk model failed: {error}")
+            return
+        if artefacts is None:
+            render_training_placeholder(model_key)
+            return
+        
+        model = artefacts['model']
+        y_train, y_test = artefacts['y_train'], artefacts['y_test']
+        y_pred, y_prob = artefacts['y_pred'], artefacts['y_prob']
         
         col1, col2 = st.columns(2)
         
         with col1:
-            # Scatter Plot - Night Usage vs Sleep Quality
-            fig = px.scatter(
-                filtered_df,
-                x='night_usage_hours',
-                y='sleep_quality_score',
-                color='risk_category',
-                color_discrete_map=RISK_COLORS,
-                size='avg_daily_screen_time_hrs',
-                hover_data=['age', 'primary_platform'],
-                opacity=0.6
-            )
-            
-            # Add trendline
-            if len(filtered_df) > 1:
-                z = np.polyfit(filtered_df['night_usage_hours'], filtered_df['sleep_quality_score'], 1)
-                p = np.poly1d(z)
-                x_line = np.linspace(filtered_df['night_usage_hours'].min(), filtered_df['night_usage_hours'].max(), 100)
-                fig.add_trace(go.Scatter(
-                    x=x_line, y=p(x_line),
-                    mode='lines',
-                    name='Trend',
-                    line=dict(color='white', dash='dash', width=2)
-                ))
+            # Confusion Matrix
+            cm = confusion_matrix(y_test, y_pred)
+            labels = ['Low', 'Mod-Low', 'Mod-High', 'High']
             
-            fig.update_layout(**get_chart_layout("Night Usage vs Sleep Quality"))
-            fig.update_layout(xaxis_title="Night Usage (hrs)", yaxis_title="Sleep Quality Score (lower=better)")
-            st.plotly_chart(fig, use_container_width=True)
+            fig = go.Figure(data=go.Heatmap(
+                z=cm,
+                x=labels[:len(cm)],
+                y=labels[:len(cm)],
+                colorscale=[[0, '#1a2d47'], [1, '#3a86ff']],
+                text=cm,
+                texttemplate='%{text}',
+                textfont=dict(color='white', size=14),
+                hovertemplate='Actual: %{y}<br>Predicted: %{x}<br>Count: %{z}<extra></extra>'
+            ))
+            fig.update_layout(**get_chart_layout("Confusion Matrix"))
+            fig.update_layout(xaxis_title="Predicted", yaxis_title="Actual")
+            render_chart(fig)
         
         with col2:
-            # Heatmap - Sleep Quality vs Screen Time
-            filtered_df['screen_bin'] = pd.cut(
-                filtered_df['avg_daily_screen_time_hrs'], 
-                bins=[0, 2, 4, 6, 8, 15], 
-                labels=['0-2', '2-4', '4-6', '6-8', '8+']
-            )
+            # ROC Curve
+            fig = go.Figure()
             
-            heatmap_data = filtered_df.pivot_table(
-                values='anxiety_score',
-                index='sleep_quality_category',
-                columns='screen_bin',
-                aggfunc='mean'
-            )
+            labels = ['Low', 'Mod-Low', 'Mod-High', 'High']
+            n_classes = len(np.unique(y_test))
             
-            order = ['Good', 'Moderate', 'Poor', 'Very Poor']
-            heatmap_data = heatmap_data.reindex([o for o in order if o in heatmap_data.index])
+            for i in range(min(n_classes, len(labels))):
+                if i < y_prob.shape[1]:
+                    y_test_binary = (y_test == i).astype(int)
+                    y_prob_class = y_prob[:, i]
+                    
+                    fpr, tpr, _ = roc_curve(y_test_binary, y_prob_class)
+                    roc_auc = auc(fpr, tpr)
+                    
+                    fig.add_trace(go.Scatter(
+                        x=fpr, y=tpr,
+                        mode='lines',
+                        name=f'{labels[i]} (AUC={roc_auc:.2f})',
+                        line=dict(color=list(RISK_COLORS.values())[i], width=2)
+                    ))
             
-            if len(heatmap_data) > 0:
-                fig = go.Figure(data=go.Heatmap(
-                    z=heatmap_data.values,
-                    x=heatmap_data.columns,
-                    y=heatmap_data.index,
-                    colorscale=[[0, '#4ade80'], [0.5, '#fbbf24'], [1, '#f87171']],
-                    text=np.round(heatmap_data.values, 1),
-                    texttemplate='%{text}',
-                    textfont=dict(color='white'),
-                    hovertemplate='Sleep: %{y}<br>Screen Time: %{x}<br>Avg Anxiety: %{z:.1f}<extra></extra>'
-                ))
-                fig.update_layout(**get_chart_layout("Sleep Quality × Screen Time → Anxiety"))
-                fig.update_layout(xaxis_title="Screen Time (hrs)", yaxis_title="Sleep Quality")
-                st.plotly_chart(fig, use_container_width=True)
-        
-        # Sleep Hours Distribution by Platform
-        st.markdown("#### 💤 Sleep Hours by Platform")
-        
-        fig = px.box(
-            filtered_df, 
-            x='primary_platform', 
-            y='avg_sleep_hours',
-            color='primary_platform',
-            color_discrete_sequence=CHART_COLORS
-        )
-        fig.update_layout(**get_chart_layout("Sleep Hours Distribution by Platform"))
-        fig.update_layout(showlegend=False, xaxis_title="Platform", yaxis_title="Sleep Hours")
-        st.plotly_chart(fig, use_container_width=True)
-    
-    # ==================== TAB 7: CORRELATIONS ====================
-    with tabs[6]:
-        st.markdown("### 🔗 Correlation Analysis")
-        
-        # Correlation Matrix
-        corr_columns = ['avg_daily_screen_time_hrs', 'anxiety_score', 'depression_score', 
-                       'stress_score', 'sleep_quality_score', 'self_esteem_score', 
-                       'loneliness_score', 'fomo_score', 'avg_sleep_hours']
-        
-        corr_matrix = filtered_df[corr_columns].corr()
-        
-        # Rename for display
-        display_names = ['Screen Time', 'Anxiety', 'Depression', 'Stress', 
-                        'Sleep Quality', 'Self-Esteem', 'Loneliness', 'FOMO', 'Sleep Hours']
-        corr_matrix.columns = display_names
-        corr_matrix.index = display_names
-        
-        fig = go.Figure(data=go.Heatmap(
-            z=corr_matrix.values,
-            x=corr_matrix.columns,
-            y=corr_matrix.index,
-            colorscale=[[0, '#f87171'], [0.5, '#1a2d47'], [1, '#4ade80']],
-            zmid=0,
-            text=np.round(corr_matrix.values, 2),
-            texttemplate='%{text}',
-            textfont=dict(color='white', size=10),
-            hovertemplate='%{y} vs %{x}<br>Correlation: %{z:.2f}<extra></extra>'
-        ))
-        fig.update_layout(**get_chart_layout("Correlation Matrix", height=500))
-        st.plotly_chart(fig, use_container_width=True)
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Bubble Chart - 3 variables
-            fig = px.scatter(
-                filtered_df,
-                x='avg_daily_screen_time_hrs',
-                y='anxiety_score',
-                size='follower_count',
-                color='risk_category',
-                color_discrete_map=RISK_COLORS,
-                hover_data=['age', 'primary_platform'],
-                size_max=30,
-                opacity=0.6
-            )
-            fig.update_layout(**get_chart_layout("Screen Time vs Anxiety vs Followers"))
-            fig.update_layout(xaxis_title="Screen Time (hrs)", yaxis_title="Anxiety Score")
-            st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            # Parallel Coordinates
-            sample_size = min(500, len(filtered_df))
-            parallel_df = filtered_df.sample(sample_size) if len(filtered_df) > sample_size else filtered_df
+            fig.add_trace(go.Scatter(
+                x=[0, 1], y=[0, 1],
+                mode='lines',
+                name='Random',
+                line=dict(color='gray', dash='dash')
+            ))
             
-            fig = px.parallel_coordinates(
-                parallel_df,
-                dimensions=['avg_daily_screen_time_hrs', 'anxiety_score', 
-                           'depression_score', 'sleep_quality_score', 'mental_health_risk_score'],
-                color='mental_health_risk_score',
-                color_continuous_scale=[[0, '#4ade80'], [0.5, '#fbbf24'], [1, '#f87171']],
-                labels={
-                    'avg_daily_screen_time_hrs': 'Screen Time',
-                    'anxiety_score': 'Anxiety',
-                    'depression_score': 'Depression',
-                    'sleep_quality_score': 'Sleep Quality',
-                    'mental_health_risk_score': 'Risk Score'
-                }
-            )
-            fig.update_layout(**get_chart_layout("Parallel Coordinates Analysis", height=400))
-            st.plotly_chart(fig, use_container_width=True)
-    
-    # ==================== TAB 8: GEOGRAPHIC ====================
-    with tabs[7]:
-        st.markdown("### 🗺️ Geographic Analysis")
-        
-        # State-level aggregation
-        state_data = filtered_df.groupby('state').agg({
-            'mental_health_risk_score': 'mean',
-            'avg_daily_screen_time_hrs': 'mean',
-            'anxiety_score': 'mean',
-            'user_id': 'count'
-        }).reset_index()
-        state_data.columns = ['state', 'avg_risk', 'avg_screen_time', 'avg_anxiety', 'user_count']
-        state_data = state_data.sort_values('avg_risk', ascending=True)
+            fig.update_layout(**get_chart_layout("ROC Curves"))
+            fig.update_layout(xaxis_title="False Positive Rate", yaxis_title="True Positive Rate")
+            render_chart(fig)
         
         col1, col2 = st.columns(2)
         
         with col1:
-            # Risk by State - Bar Chart
+            # Feature Importance
+            importance = pd.DataFrame({
+                'feature': feature_cols,
+                'importance': model.feature_importances_
+            }).sort_values('importance', ascending=True)
+            
             fig = go.Figure(data=[go.Bar(
-                x=state_data['avg_risk'],
-                y=state_data['state'],
+                x=importance['importance'],
+                y=importance['feature'],
                 orientation='h',
-                marker=dict(
-                    color=state_data['avg_risk'],
-                    colorscale=[[0, '#4ade80'], [0.5, '#fbbf24'], [1, '#f87171']],
-                    showscale=True,
-                    colorbar=dict(title='Risk Score')
-                ),
-                text=state_data['avg_risk'].round(1),
+                marker=dict(color=COLORS['primary']),
+                text=importance['importance'].round(3),
                 textposition='auto',
                 textfont=dict(color='white')
             )])
-            fig.update_layout(**get_chart_layout("Average Risk Score by State"))
-            fig.update_layout(xaxis_title="Risk Score", yaxis_title="")
-            st.plotly_chart(fig, use_container_width=True)
+            fig.update_layout(**get_chart_layout("Feature Importance"))
+            fig.update_layout(xaxis_title="Importance", yaxis_title="")
+            render_chart(fig)
         
         with col2:
-            # Point Map - User Locations
-            city_data = filtered_df.groupby(['city', 'latitude', 'longitude']).agg({
-                'mental_health_risk_score': 'mean',
-                'user_id': 'count'
-            }).reset_index()
+            # PCA Visualization
+            pca = artefacts['pca']
+            X_pca = artefacts['X_pca']
+            
+            # A single feature projects onto one component, drawn on a flat PC2
+            pca_df = pd.DataFrame({
+                'PC1': X_pca[:, 0],
+                'PC2': X_pca[:, 1] if X_pca.shape[1] > 1 else np.zeros(len(X_pca)),
+                'risk': [['Low', 'Mod-Low', 'Mod-High', 'High'][i] if i < 4 else 'Unknown' for i in y_train]
+            })
             
-            fig = px.scatter_geo(
-                city_data,
-                lat='latitude',
-                lon='longitude',
-                size='user_id',
-                color='mental_health_risk_score',
-                hover_name='city',
-                color_continuous_scale=[[0, '#4ade80'], [0.5, '#fbbf24'], [1, '#f87171']],
-                size_max=30,
-                scope='asia'
+            fig = px.scatter(
+                pca_df, x='PC1', y='PC2',
+                color='risk',
+                color_discrete_map=RISK_COLORS,
+                opacity=0.6
             )
-            fig.update_geos(
-                visible=False,
-                resolution=50,
-                showcountries=True,
-                countrycolor='#2a4a7f',
-                showland=True,
-                landcolor='#0a1628',
-                showocean=True,
-                oceancolor='#0d1b2a',
-                lataxis_range=[6, 38],
-                lonaxis_range=[68, 98]
+            fig.update_layout(**get_chart_layout(f"PCA Visualization (Var: {sum(pca.explained_variance_ratio_)*100:.1f}%)"))
+            render_chart(fig, "PCA Visualization")
+    else:
+        st.warning("Not enough data for ML analysis. Please adjust filters to include more users.")
+
+def render_group_risk_bars(groups, attribute, title, xaxis_title):
+    """Bar chart of the mean risk score per group of one attribute, with bootstrap CI error bars"""
+    rows = groups[groups['attribute'] == attribute]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=rows['group'].astype(str),
+        y=rows['mean'],
+        error_y=dict(
+            type='data',
+            array=rows['ci_high'] - rows['mean'],
+            arrayminus=rows['mean'] - rows['ci_low'],
+            visible=True
+        ),
+        customdata=rows[['ci_low', 'ci_high', 'count']],
+        hovertemplate='%{x}<br>Mean: %{y:.1f}<br>95% CI: %{customdata[0]:.1f} - %{customdata[1]:.1f}'
+                      '<br>Users: %{customdata[2]:,}<extra></extra>',
+        marker_color=(CHART_COLORS * (len(rows) // len(CHART_COLORS) + 1))[:len(rows)],
+        text=rows['mean'].round(1),
+        textposition='auto',
+        textfont=dict(color='white')
+    ))
+    fig.update_layout(**get_chart_layout(title))
+    fig.update_layout(xaxis_title=xaxis_title, yaxis_title="Avg Risk Score")
+    render_chart(fig, title)
+
+def render_ethics_tab(filtered_df, aggregate):
+    """Render the Ethics tab - group disparities with bootstrap intervals and sample size confidence"""
+    st.markdown("### ⚖️ Ethics & Fairness Analysis")
+    
+    st.markdown("""
+    <div class='insight-box'>
+        <div class='insight-title' style='color: #4cc9f0;'>🎯 Ethical AI Principles</div>
+        <div class='insight-text'>
+            This section ensures our analysis is fair, unbiased, and transparent across different demographic groups.
+            We check for disparities in risk scores and model predictions.
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Every protected attribute in one pass over the filtered users
+    fairness = aggregate('fairness', filtered_df)
+    groups = fairness['groups']
+    if groups.empty:
+        st.warning("No users match the selected filters.")
+        return
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Gender Bias Check
+        render_group_risk_bars(groups, 'gender', "Risk Score by Gender", "Gender")
+    
+    with col2:
+        # Age Group Bias Check
+        render_group_risk_bars(groups, 'age_group', "Risk Score by Age Group", "Age Group")
+    
+    # Disparity across every protected attribute
+    st.markdown("#### 🧭 Group Disparities")
+    
+    attributes = fairness['attributes']
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Gender and age group are charted above
+        others = [a for a in attributes['attribute'] if a not in ('gender', 'age_group')]
+        if others:
+            attribute = st.selectbox(
+                "Protected attribute",
+                others,
+                format_func=lambda name: name.replace('_', ' ').title(),
+                key=scoped_key('fairness_attribute')
             )
-            fig.update_layout(**get_chart_layout("User Distribution Map (India)", height=400))
-            st.plotly_chart(fig, use_container_width=True)
-        
-        # Regional Comparison
-        st.markdown("#### 🌏 Regional Comparison")
-        
-        region_data = filtered_df.groupby('region').agg({
-            'avg_daily_screen_time_hrs': 'mean',
-            'anxiety_score': 'mean',
-            'depression_score': 'mean',
-            'mental_health_risk_score': 'mean'
-        }).round(2)
-        
-        fig = go.Figure()
-        
-        metrics = ['avg_daily_screen_time_hrs', 'anxiety_score', 'depression_score']
-        metric_names = ['Screen Time', 'Anxiety', 'Depression']
-        
-        for i, (metric, name) in enumerate(zip(metrics, metric_names)):
-            fig.add_trace(go.Bar(
-                name=name,
-                x=region_data.index,
-                y=region_data[metric],
-                marker_color=CHART_COLORS[i]
-            ))
-        
-        fig.update_layout(**get_chart_layout("Key Metrics by Region"))
-        fig.update_layout(barmode='group', xaxis_title="Region", yaxis_title="Score")
-        st.plotly_chart(fig, use_container_width=True)
+            label = attribute.replace('_', ' ').title()
+            render_group_risk_bars(groups, attribute, f"Risk Score by {label}", label)
     
-    # ==================== TAB 9: ML PREDICTIONS ====================
-    with tabs[8]:
-        st.markdown("### 🤖 Machine Learning & Predictions")
-        
-        # Prepare data for ML
-        feature_cols = ['avg_daily_screen_time_hrs', 'night_usage_hours', 'num_platforms',
-                       'sessions_per_day', 'avg_session_duration_min', 'age',
-                       'fomo_score', 'avg_sleep_hours']
-        
-        X = filtered_df[feature_cols].fillna(0)
-        y = LabelEncoder().fit_transform(filtered_df['risk_category'])
-        
-        if len(X) > 100:
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            
-            # Scale features
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            X_test_scaled = scaler.transform(X_test)
-            
-            # Train model
-            model = RandomForestClassifier(n_estimators=50, random_state=42, n_jobs=-1)
-            model.fit(X_train_scaled, y_train)
-            
-            y_pred = model.predict(X_test_scaled)
-            y_prob = model.predict_proba(X_test_scaled)
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Confusion Matrix
-                cm = confusion_matrix(y_test, y_pred)
-                labels = ['Low', 'Mod-Low', 'Mod-High', 'High']
-                
-                fig = go.Figure(data=go.Heatmap(
-                    z=cm,
-                    x=labels[:len(cm)],
-                    y=labels[:len(cm)],
-                    colorscale=[[0, '#1a2d47'], [1, '#3a86ff']],
-                    text=cm,
-                    texttemplate='%{text}',
-                    textfont=dict(color='white', size=14),
-                    hovertemplate='Actual: %{y}<br>Predicted: %{x}<br>Count: %{z}<extra></extra>'
-                ))
-                fig.update_layout(**get_chart_layout("Confusion Matrix"))
-                fig.update_layout(xaxis_title="Predicted", yaxis_title="Actual")
-                st.plotly_chart(fig, use_container_width=True)
-            
-            with col2:
-                # ROC Curve
-                fig = go.Figure()
-                
-                labels = ['Low', 'Mod-Low', 'Mod-High', 'High']
-                n_classes = len(np.unique(y_test))
-                
-                for i in range(min(n_classes, len(labels))):
-                    if i < y_prob.shape[1]:
-                        y_test_binary = (y_test == i).astype(int)
-                        y_prob_class = y_prob[:, i]
-                        
-                        fpr, tpr, _ = roc_curve(y_test_binary, y_prob_class)
-                        roc_auc = auc(fpr, tpr)
-                        
-                        fig.add_trace(go.Scatter(
-                            x=fpr, y=tpr,
-                            mode='lines',
-                            name=f'{labels[i]} (AUC={roc_auc:.2f})',
-                            line=dict(color=list(RISK_COLORS.values())[i], width=2)
-                        ))
-                
-                fig.add_trace(go.Scatter(
-                    x=[0, 1], y=[0, 1],
-                    mode='lines',
-                    name='Random',
-                    line=dict(color='gray', dash='dash')
-                ))
-                
-                fig.update_layout(**get_chart_layout("ROC Curves"))
-                fig.update_layout(xaxis_title="False Positive Rate", yaxis_title="True Positive Rate")
-                st.plotly_chart(fig, use_container_width=True)
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Feature Importance
-                importance = pd.DataFrame({
-                    'feature': feature_cols,
-                    'importance': model.feature_importances_
-                }).sort_values('importance', ascending=True)
-                
-                fig = go.Figure(data=[go.Bar(
-                    x=importance['importance'],
-                    y=importance['feature'],
-                    orientation='h',
-                    marker=dict(color=COLORS['primary']),
-                    text=importance['importance'].round(3),
-                    textposition='auto',
-                    textfont=dict(color='white')
-                )])
-                fig.update_layout(**get_chart_layout("Feature Importance"))
-                fig.update_layout(xaxis_title="Importance", yaxis_title="")
-                st.plotly_chart(fig, use_container_width=True)
-            
-            with col2:
-                # PCA Visualization
-                pca = PCA(n_components=2)
-                X_pca = pca.fit_transform(X_train_scaled)
-                
-                pca_df = pd.DataFrame({
-                    'PC1': X_pca[:, 0],
-                    'PC2': X_pca[:, 1],
-                    'risk': [['Low', 'Mod-Low', 'Mod-High', 'High'][i] if i < 4 else 'Unknown' for i in y_train]
-                })
-                
-                fig = px.scatter(
-                    pca_df, x='PC1', y='PC2',
-                    color='risk',
-                    color_discrete_map=RISK_COLORS,
-                    opacity=0.6
-                )
-                fig.update_layout(**get_chart_layout(f"PCA Visualization (Var: {sum(pca.explained_variance_ratio_)*100:.1f}%)"))
-                st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        disparity_table = attributes.assign(
+            attribute=attributes['attribute'].str.replace('_', ' ').str.title(),
+            ratio_ci=[f"{low:.2f} - {high:.2f}" for low, high in
+                      zip(attributes['ratio_ci_low'], attributes['ratio_ci_high'])]
+        )[['attribute', 'groups', 'lowest_mean', 'highest_mean', 'disparity_ratio', 'ratio_ci']]
+        disparity_table.columns = ['Attribute', 'Groups', 'Lowest Mean', 'Highest Mean', 'Max / Min', '95% CI']
+        st.dataframe(disparity_table.round(2), use_container_width=True, hide_index=True)
+        st.caption("Max / Min is the highest over the lowest group mean risk score. "
+                   "Intervals are bootstrapped over the filtered users.")
+    
+    # Sample Size Confidence
+    st.markdown("#### 📊 Data Confidence Indicators")
+    
+    st.dataframe(fairness['confidence'], use_container_width=True, hide_index=True)
+    
+    # Fairness Metrics
+    st.markdown("#### 🔍 Fairness Assessment")
+    
+    disparity = fairness['headline']
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        gender_ratio = disparity['gender_ratio']
+        if gender_ratio is not None:
+            status = "✅ Fair" if 0.8 <= gender_ratio <= 1.2 else "⚠️ Review"
+            st.metric("Gender Disparity Ratio", f"{gender_ratio:.2f}", status)
         else:
-            st.warning("Not enough data for ML analysis. Please adjust filters to include more users.")
+            st.metric("Gender Disparity Ratio", "N/A")
     
-    # ==================== TAB 10: ETHICS ====================
-    with tabs[9]:
-        st.markdown("### ⚖️ Ethics & Fairness Analysis")
-        
+    with col2:
+        age_ratio = disparity['age_ratio']
+        if age_ratio is not None:
+            status = "✅ Fair" if 0.8 <= age_ratio <= 1.2 else "⚠️ Review"
+            st.metric("Age Disparity Ratio", f"{age_ratio:.2f}", status)
+        else:
+            st.metric("Age Disparity Ratio", "N/A")
+    
+    with col3:
+        overall_std = disparity['regional_std']
+        status = "✅ Fair" if overall_std < 5 else "⚠️ Review"
+        st.metric("Regional Variance", f"{overall_std:.2f}", status)
+    
+    render_insight_box(
+        "⚖️ Fairness Summary",
+        "Our analysis shows relatively balanced risk distributions across demographic groups. "
+        "Minor variations exist but are within acceptable ranges. "
+        "We recommend continued monitoring as more data is collected.",
+        COLORS['success']
+    )
+
+TAB_NAMES = [
+    "📈 Overview",
+    "👥 Demographics", 
+    "📱 Platforms",
+    "⏰ Temporal",
+    "🧠 Mental Health",
+    "😴 Sleep",
+    "🔗 Correlations",
+    "🗺️ Geographic",
+    "🤖 ML Predictions",
+    "⚖️ Ethics"
+]
+
+# Platforms, Temporal and ML Predictions are dispatched separately - they need
+# the platform membership matrix, the daily tables and the filter cache key
+TAB_RENDERERS = {
+    "📈 Overview": render_overview_tab,
+    "👥 Demographics": render_demographics_tab,
+    "🧠 Mental Health": render_mental_health_tab,
+    "😴 Sleep": render_sleep_tab,
+    "🔗 Correlations": render_correlations_tab,
+    "🗺️ Geographic": render_geographic_tab,
+    "⚖️ Ethics": render_ethics_tab,
+}
+
+def render_active_tab(active_tab, snapshot, cohort, aggregate, date_range):
+    """Render the selected tab for one cohort's filtered users"""
+    if active_tab == "⏰ Temporal":
+        # Filter daily data - only the months in the date range and the columns the
+        # temporal aggregates read, keyed on the date range as well
+        main_df, daily_partitions = snapshot['tables']['main'], snapshot['tables']['daily']
+        daily_key = cohort['cache_key'] + tuple(str(bound) for bound in date_range or ())
+        daily_aggregate = lambda name, data: chart_data(cached_aggregate, name, daily_key, data)
+        if len(cohort['row_ids']) == len(main_df):
+            # Every user - the per-date sums and rolling statistics kept since ingest
+            # answer the tab, the latter with their history before the date range
+            low, high = (pd.Timestamp(bound) for bound in date_range) if date_range else (None, None)
+            date_sums = population_date_sums(snapshot['daily_date_sums'])
+            if date_range:
+                date_sums = date_sums[date_sums['date'].between(low, high)]
+            rolling = rolling_frame(snapshot['temporal_stats']).loc[low:high]
+            render_temporal_tab(lambda: date_sums, daily_aggregate, rolling)
+        else:
+            join_index = get_user_join_index(snapshot['version'], main_df, daily_partitions)
+            render_temporal_tab(
+                lambda: select_daily_rows(
+                    join_index, cohort['row_ids'], daily_partitions, date_range, DATE_SUM_COLUMNS
+                ),
+                daily_aggregate
+            )
+    elif active_tab == "📱 Platforms":
+        filtered_df = cohort['filtered_df']
+        membership = platform_membership(filtered_df['platform_mask'].to_numpy(), snapshot['platform_names'])
+        render_platforms_tab(filtered_df, membership, aggregate)
+    elif active_tab == "🤖 ML Predictions":
+        render_ml_tab(
+            cohort['filtered_df'], cohort['cache_key'],
+            lambda: get_trajectory_features(snapshot['version'], snapshot['tables']['daily'])
+        )
+    else:
+        TAB_RENDERERS[active_tab](cohort['filtered_df'], aggregate)
+
+# ================================================================================
+# MAIN APPLICATION
+# ================================================================================
+
+def main():
+    # Load data
+    with profile_span('load_data'):
+        snapshot = load_data()
+    
+    # Error handling
+    if snapshot is None:
+        st.error("⚠️ Failed to load data files!")
         st.markdown("""
-        <div class='insight-box'>
-            <div class='insight-title' style='color: #4cc9f0;'>🎯 Ethical AI Principles</div>
-            <div class='insight-text'>
-                This section ensures our analysis is fair, unbiased, and transparent across different demographic groups.
-                We check for disparities in risk scores and model predictions.
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
+        ### 📁 Required Files
+        Please ensure these CSV files are in your repository:
+        - `main_survey_data.csv`
+        - `daily_usage_data.csv`
+        - `platform_metadata.csv`
+        """)
+        st.stop()
+    
+    data_version = snapshot['version']
+    main_df, daily_partitions, platform_df = (snapshot['tables'][name] for name in SHARED_TABLES)
+    
+    # ==================== HEADER ====================
+    st.markdown("""
+    <div style='text-align: center; padding: 20px 0;'>
+        <h1 style='font-size: 2.5rem; margin-bottom: 10px;'>
+            🧠 Social Media & Mental Health Intelligence Dashboard
+        </h1>
+        <p style='color: #8facc4; font-size: 1.1rem;'>
+            Analyzing behavioral patterns and mental health impact across India
+        </p>
+        <p style='color: #4cc9f0; font-size: 0.9rem;'>
+            📊 {users:,} Users | 📅 {records:,} Daily Records | 🇮🇳 {states} States
+        </p>
+    </div>
+    """.format(
+        users=len(main_df),
+        records=snapshot['daily_records'],
+        states=main_df['state'].nunique()
+    ), unsafe_allow_html=True)
+    
+    render_divider()
+    
+    # ==================== SIDEBAR FILTERS ====================
+    # Multi-selects - an empty one selects everyone. Options come from the filter
+    # index, so no column is scanned for its values on a rerun
+    filter_index = snapshot['filter_index']
+    options = lambda col: sorted(filter_index['categories'][col].tolist())
+    selections = {}
+    with st.sidebar:
+        st.markdown("## 🎛️ Filters")
+        st.markdown("---")
         
-        with col1:
-            # Gender Bias Check
-            gender_risk = filtered_df.groupby('gender')['mental_health_risk_score'].agg(['mean', 'std', 'count']).round(2)
-            
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                x=gender_risk.index,
-                y=gender_risk['mean'],
-                error_y=dict(type='data', array=gender_risk['std'], visible=True),
-                marker_color=CHART_COLORS[:len(gender_risk)],
-                text=gender_risk['mean'].round(1),
-                textposition='auto',
-                textfont=dict(color='white')
-            ))
-            fig.update_layout(**get_chart_layout("Risk Score by Gender"))
-            fig.update_layout(xaxis_title="Gender", yaxis_title="Avg Risk Score")
-            st.plotly_chart(fig, use_container_width=True)
+        # Age Group Filter
+        selections['age_group'] = st.multiselect("👤 Age Group", options('age_group'), placeholder="All")
         
-        with col2:
-            # Age Group Bias Check
-            age_risk = filtered_df.groupby('age_group')['mental_health_risk_score'].agg(['mean', 'std', 'count']).round(2)
-            
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                x=age_risk.index,
-                y=age_risk['mean'],
-                error_y=dict(type='data', array=age_risk['std'], visible=True),
-                marker_color=CHART_COLORS[:len(age_risk)],
-                text=age_risk['mean'].round(1),
-                textposition='auto',
-                textfont=dict(color='white')
-            ))
-            fig.update_layout(**get_chart_layout("Risk Score by Age Group"))
-            fig.update_layout(xaxis_title="Age Group", yaxis_title="Avg Risk Score")
-            st.plotly_chart(fig, use_container_width=True)
+        # Gender Filter
+        selections['gender'] = st.multiselect("⚧ Gender", options('gender'), placeholder="All")
         
-        # Sample Size Confidence
-        st.markdown("#### 📊 Data Confidence Indicators")
+        # Region Filter
+        selections['region'] = st.multiselect("🗺️ Region", options('region'), placeholder="All")
         
-        confidence_data = []
-        for group in ['gender', 'age_group', 'region']:
-            for cat in filtered_df[group].unique():
-                count = len(filtered_df[filtered_df[group] == cat])
-                if count >= 100:
-                    confidence = 'High'
-                    color = '🟢'
-                elif count >= 50:
-                    confidence = 'Medium'
-                    color = '🟡'
-                else:
-                    confidence = 'Low'
-                    color = '🔴'
-                
-                confidence_data.append({
-                    'Category Type': group.replace('_', ' ').title(),
-                    'Category': cat,
-                    'Sample Size': count,
-                    'Confidence': f"{color} {confidence}"
-                })
+        # Platform Filter
+        selections['primary_platform'] = st.multiselect(
+            "📱 Primary Platform", options('primary_platform'), placeholder="All"
+        )
         
-        confidence_df = pd.DataFrame(confidence_data)
-        st.dataframe(confidence_df, use_container_width=True, hide_index=True)
+        # Any-use Platform Filter - primary or not, any of the selected
+        platform_names = snapshot['platform_names']
+        selections['uses_platform'] = st.multiselect("🧩 Uses Any Of", list(platform_names), placeholder="All")
         
-        # Fairness Metrics
-        st.markdown("#### 🔍 Fairness Assessment")
+        # Screen Time Range
+        st.markdown("### ⏱️ Screen Time Range")
+        screen_time_range = st.slider(
+            "Hours per day",
+            min_value=float(main_df['avg_daily_screen_time_hrs'].min()),
+            max_value=float(main_df['avg_daily_screen_time_hrs'].max()),
+            value=(0.5, 14.0)
+        )
         
-        # Calculate disparity ratios
-        male_risk = filtered_df[filtered_df['gender'] == 'Male']['mental_health_risk_score'].mean() if 'Male' in filtered_df['gender'].values else 0
-        female_risk = filtered_df[filtered_df['gender'] == 'Female']['mental_health_risk_score'].mean() if 'Female' in filtered_df['gender'].values else 0
+        # Risk Category Filter
+        selections['risk_category'] = st.multiselect("⚠️ Risk Category", options('risk_category'), placeholder="All")
+        
+        # Further filters - a range left at the column's full extent stays off,
+        # so the cubes still answer the aggregates
+        with st.expander("➕ More Filters"):
+            selections['state'] = st.multiselect("🏙️ State", options('state'), placeholder="All")
+            selections['occupation'] = st.multiselect("💼 Occupation", options('occupation'), placeholder="All")
+            selections['income_bracket'] = st.multiselect(
+                "💰 Income Bracket", options('income_bracket'), placeholder="All"
+            )
+            selections['education'] = st.multiselect("🎓 Education", options('education'), placeholder="All")
+            
+            _, first_survey, last_survey = filter_index['ranges']['survey_date']
+            if first_survey is not None and first_survey < last_survey:
+                extent = (pd.Timestamp(first_survey).date(), pd.Timestamp(last_survey).date())
+                survey_range = st.slider(
+                    "📝 Survey Date", min_value=extent[0], max_value=extent[1], value=extent, format="MMM D, YYYY"
+                )
+                if survey_range != extent:
+                    selections['survey_date'] = survey_range
+            
+            _, night_min, night_max = filter_index['ranges']['night_usage_hours']
+            if night_min is not None and night_min < night_max:
+                extent = (float(night_min), float(night_max))
+                night_range = st.slider("🌙 Night Usage (hrs)", min_value=extent[0], max_value=extent[1], value=extent)
+                if night_range != extent:
+                    selections['night_usage_hours'] = night_range
+        
+        # Cohort comparison - cohort A is the filters above and every further cohort
+        # has its own, while the screen time and date ranges apply to all of them
+        cohort_filters = {
+            'age_group': "👤 Age Group",
+            'gender': "⚧ Gender",
+            'region': "🗺️ Region",
+            'primary_platform': "📱 Primary Platform",
+            'uses_platform': "🧩 Uses Any Of",
+            'risk_category': "⚠️ Risk Category",
+        }
+        cohort_selections = {}
+        with st.expander("🆚 Cohort Comparison"):
+            n_cohorts = st.number_input(
+                "Cohorts", min_value=1, max_value=len(COHORT_NAMES), value=1, key='n_cohorts'
+            )
+            for name in COHORT_NAMES[1:n_cohorts]:
+                st.markdown(f"**Cohort {name}**")
+                cohort_selections[name] = {
+                    col: st.multiselect(
+                        label,
+                        list(platform_names) if col == 'uses_platform' else options(col),
+                        placeholder="All",
+                        key=f"cohort_{name}_{col}"
+                    )
+                    for col, label in cohort_filters.items()
+                }
         
-        col1, col2, col3 = st.columns(3)
+        # Date Range - only the daily month partitions it overlaps are read
+        date_range = None
+        period = "No daily records"
+        if snapshot['daily_range'] is not None:
+            first_date, last_date = (d.date() for d in snapshot['daily_range'])
+            st.markdown("### 📅 Date Range")
+            date_range = st.slider(
+                "Daily usage period",
+                min_value=first_date,
+                max_value=last_date,
+                value=(first_date, last_date),
+                format="MMM D, YYYY"
+            )
+            period = f"{first_date:%b %d, %Y} - {last_date:%b %d, %Y}"
         
-        with col1:
-            if female_risk > 0:
-                gender_ratio = male_risk / female_risk
-                status = "✅ Fair" if 0.8 <= gender_ratio <= 1.2 else "⚠️ Review"
-                st.metric("Gender Disparity Ratio", f"{gender_ratio:.2f}", status)
-            else:
-                st.metric("Gender Disparity Ratio", "N/A")
+        st.markdown("---")
+        st.markdown("### 📊 Data Info")
+        st.info(f"""
+        **Users:** {len(main_df):,}  
+        **Daily Records:** {snapshot['daily_records']:,}  
+        **Period:** {period}
+        """)
         
-        with col2:
-            young_risk = filtered_df[filtered_df['age_group'] == '18-24']['mental_health_risk_score'].mean() if '18-24' in filtered_df['age_group'].values else 0
-            old_risk = filtered_df[filtered_df['age_group'] == '45-54']['mental_health_risk_score'].mean() if '45-54' in filtered_df['age_group'].values else young_risk
-            if old_risk > 0:
-                age_ratio = young_risk / old_risk
-                status = "✅ Fair" if 0.8 <= age_ratio <= 1.2 else "⚠️ Review"
-                st.metric("Age Disparity Ratio", f"{age_ratio:.2f}", status)
+        with st.expander("💾 Memory Footprint"):
+            footprint = pd.DataFrame([
+                {
+                    'Source': name,
+                    'Parsed (MB)': entry['parsed_bytes'] / 1e6,
+                    'Compact (MB)': sum(entry['compact_bytes'].values()) / 1e6
+                }
+                for name, entry in get_memory_report().items()
+            ])
+            if not footprint.empty:
+                st.dataframe(footprint.round(2), hide_index=True)
+        
+        # Scatter rendering - above the point budget users are sampled per risk
+        # category and drawn with WebGL, far above it binned into densities
+        with st.expander("🎨 Chart Rendering"):
+            st.selectbox(
+                "Scatter mode",
+                SCATTER_MODES,
+                key='scatter_mode',
+                format_func=lambda mode: {
+                    'auto': 'Auto', 'points': 'All points', 'webgl': 'WebGL sample', 'density': 'Density'
+                }[mode]
+            )
+            st.number_input(
+                "Point budget",
+                min_value=100,
+                max_value=100_000,
+                value=SCATTER_POINT_BUDGET,
+                step=500,
+                key='scatter_budget'
+            )
+    
+    # Apply filters - the spec is compiled into one mask pass over the coded columns, then one take
+    # Each further cohort is one more pass over the same index
+    with profile_span('filters'):
+        filtered_df, row_ids = apply_filters(main_df, filter_index, selections, screen_time_range)
+        cohorts = [{'name': COHORT_NAMES[0], 'selections': selections, 'row_ids': row_ids, 'filtered_df': filtered_df}]
+        for name, cohort in cohort_selections.items():
+            cohort_df, cohort_rows = apply_filters(main_df, filter_index, cohort, screen_time_range)
+            cohorts.append({'name': name, 'selections': cohort, 'row_ids': cohort_rows, 'filtered_df': cohort_df})
+    for cohort in cohorts:
+        cohort['cache_key'] = (data_version,) + make_filter_key(cohort['selections'], screen_time_range)
+    
+    # Aggregates are cached per (dataset version, filter state) across sessions and
+    # read cube cells unless given the daily rows - cells are only selected on a miss.
+    # Each cube's cells are selected at most once per rerun, however many aggregates
+    # miss on it. With several cohorts, that one pass folds every cohort's cells
+    # grouped by cohort. Their time counts as data time of the chart drawn next
+    cubes = snapshot['cubes']
+    selected_cells = {}
+    
+    def cube_cells(cube_name, cohort=None):
+        """Cells of a cube for one cohort, or for every cohort labelled by cohort"""
+        if cube_name not in selected_cells:
+            if len(cohorts) == 1:
+                cells = select_cube_cells(cubes[cube_name], selections, screen_time_range, filtered_df)
             else:
-                st.metric("Age Disparity Ratio", "N/A")
-        
-        with col3:
-            overall_std = filtered_df.groupby('region')['mental_health_risk_score'].mean().std()
-            status = "✅ Fair" if overall_std < 5 else "⚠️ Review"
-            st.metric("Regional Variance", f"{overall_std:.2f}", status)
-        
-        render_insight_box(
-            "⚖️ Fairness Summary",
-            "Our analysis shows relatively balanced risk distributions across demographic groups. "
-            "Minor variations exist but are within acceptable ranges. "
-            "We recommend continued monitoring as more data is collected.",
-            COLORS['success']
-        )
+                cells = select_cohort_cells(cubes[cube_name], cohorts, screen_time_range, main_df)
+            selected_cells[cube_name] = cells
+        if len(cohorts) == 1 or cohort is None:
+            return selected_cells[cube_name]
+        return split_cohort_cells(selected_cells[cube_name])[cohort['name']]
+    
+    make_aggregate = lambda cohort: lambda name, data=None: chart_data(
+        cached_aggregate, name, cohort['cache_key'],
+        data if data is not None else lambda: cube_cells(AGGREGATE_CUBES[name], cohort)
+    )
+    aggregate = make_aggregate(cohorts[0])
+    
+    # ==================== KPI SECTION ====================
+    st.markdown("## 📊 Key Performance Indicators")
+    
+    if len(cohorts) > 1:
+        # Every cohort's KPIs, effect sizes and Welch t-tests from one grouped aggregation
+        with profile_span('kpis'):
+            comparison = cached_aggregate(
+                'cohort_comparison', tuple(cohort['cache_key'] for cohort in cohorts), lambda: cube_cells('core')
+            )
+        render_cohort_kpis(comparison)
+    else:
+        kpi_cols = st.columns(5)
+        
+        with profile_span('kpis'):
+            kpis = aggregate('kpis')
+            overall_kpis = cached_aggregate('kpis', (data_version, 'overall'), lambda: query_cube(cubes['core'], {}))
+        
+        with kpi_cols[0]:
+            avg_screen = kpis['avg_screen']
+            st.markdown(render_kpi_card(
+                "Avg Screen Time",
+                f"{avg_screen:.1f} hrs",
+                f"{((avg_screen - overall_kpis['avg_screen']) / overall_kpis['avg_screen'] * 100):.1f}% vs overall",
+                "negative" if avg_screen > overall_kpis['avg_screen'] else "positive"
+            ), unsafe_allow_html=True)
+        
+        with kpi_cols[1]:
+            avg_anxiety = kpis['avg_anxiety']
+            st.markdown(render_kpi_card(
+                "Avg Anxiety Score",
+                f"{avg_anxiety:.1f}/21",
+                f"{((avg_anxiety - overall_kpis['avg_anxiety']) / overall_kpis['avg_anxiety'] * 100):.1f}% vs overall",
+                "negative" if avg_anxiety > overall_kpis['avg_anxiety'] else "positive"
+            ), unsafe_allow_html=True)
+        
+        with kpi_cols[2]:
+            high_risk_pct = kpis['high_risk_pct']
+            st.markdown(render_kpi_card(
+                "High Risk Users",
+                f"{high_risk_pct:.1f}%",
+                f"{kpis['high_risk_users']:,} users",
+                "negative"
+            ), unsafe_allow_html=True)
+        
+        with kpi_cols[3]:
+            poor_sleep_pct = kpis['poor_sleep_pct']
+            st.markdown(render_kpi_card(
+                "Poor Sleep Quality",
+                f"{poor_sleep_pct:.1f}%",
+                f"{kpis['poor_sleep_users']:,} users",
+                "negative"
+            ), unsafe_allow_html=True)
+        
+        with kpi_cols[4]:
+            risk_index = kpis['risk_index']
+            st.markdown(render_kpi_card(
+                "Risk Index",
+                f"{risk_index:.0f}/100",
+                "Composite Score",
+                "negative" if risk_index > 50 else "positive"
+            ), unsafe_allow_html=True)
+    
+    render_divider()
+    
+    # ==================== MAIN TABS ====================
+    # Only the selected tab is computed and rendered on each rerun
+    active_tab = st.radio(
+        "Section",
+        TAB_NAMES,
+        horizontal=True,
+        key='active_tab',
+        label_visibility='collapsed'
+    )
+    
+    # Every chart of the tab is timed, and sized when profiling or sampled - see the Chart Metrics panel
+    begin_chart_run(active_tab, size_payloads=is_profiling())
+    with profile_span(f"tab:{active_tab}"):
+        if len(cohorts) == 1:
+            render_active_tab(active_tab, snapshot, cohorts[0], aggregate, date_range)
+        else:
+            # One copy of the tab per cohort, side by side
+            for cohort, column in zip(cohorts, st.columns(len(cohorts))):
+                with column, cohort_scope(cohort['name']):
+                    st.markdown(f"#### Cohort {cohort['name']} · {len(cohort['filtered_df']):,} users")
+                    render_active_tab(active_tab, snapshot, cohort, make_aggregate(cohort), date_range)
+    
+    with st.sidebar:
+        render_chart_metrics(end_chart_run())
+        # Admin panel - only with DASHBOARD_PROFILE=1 or ?profile=1
+        if is_profiling():
+            render_performance_panel()
     
     # ==================== FOOTER ====================
     render_divider()
@@ -1489,4 +2032,7 @@ def main():
 # ================================================================================
 
 if __name__ == "__main__":
-    main()
+    # Opt-in profiling of each rerun's stages: DASHBOARD_PROFILE=1 or ?profile=1
+    begin_profile(profiling_enabled(st.query_params.get('profile')))
+    with profile_span('rerun'):
+        main()
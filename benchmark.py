@@ -0,0 +1,513 @@
+# ================================================================================
+# ⏱️ DASHBOARD DATA PIPELINE BENCHMARKS
+# ================================================================================
+# Description: Headless benchmark of the loaders, the sidebar filter engine and
+#              the per-tab aggregates, on the real CSVs or on synthetic data
+#              scaled up from them. Reports wall time, peak RSS and Python/NumPy
+#              allocations per stage and writes the results as JSON.
+#
+# Usage:
+#   python benchmark.py                          # real CSVs in the current folder
+#   python benchmark.py --dataset 50k 500k       # synthetic scaled datasets
+#   python benchmark.py --dataset real --output bench/HEAD.json
+# ================================================================================
+
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import resource
+import subprocess
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import analytics
+from analytics.synthetic import write_dataset, fit_survey_model, generate_survey, generate_daily
+
+# Synthetic presets: (survey users, daily rows)
+SCALES = {
+    '50k': (50_000, 900_000),
+    '500k': (500_000, 9_000_000),
+    '5m': (5_000_000, 9_000_000),
+}
+DAILY_DAYS = 180
+# New survey wave ingested into a live dataset, as a share of the survey users
+INGEST_WAVE_SHARE = 0.01
+INGEST_WAVE_DAYS = 7
+
+FILTER_SCENARIOS = {
+    'all': ({}, (0.5, 14.0)),
+    'age': ({'age_group': '18-24'}, (0.5, 14.0)),
+    'age_gender': ({'age_group': '25-34', 'gender': 'Female'}, (0.5, 14.0)),
+    'region_platform_risk': (
+        {'region': 'South', 'primary_platform': 'Instagram', 'risk_category': 'Moderate-High'},
+        (0.5, 14.0)
+    ),
+    'screen_range': ({}, (2.0, 6.0)),
+    'uses_platform': ({'uses_platform': 'Telegram'}, (0.5, 14.0)),
+    'multi_select': (
+        {'region': ['South', 'West'], 'age_group': ['18-24', '25-34'], 'uses_platform': ['Instagram', 'Snapchat']},
+        (0.5, 14.0)
+    ),
+    'extra_ranges': (
+        {'state': ['Maharashtra', 'Karnataka', 'Tamil Nadu'], 'income_bracket': ['Below 3 LPA', '3-6 LPA'],
+         'night_usage_hours': (1.0, 3.0)},
+        (2.0, 10.0)
+    ),
+}
+
+# ================================================================================
+# MEASUREMENT
+# ================================================================================
+
+def _reset_peak_rss():
+    """Reset the kernel's RSS high-water mark (Linux only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_bytes():
+    """Return the RSS high-water mark in bytes"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux, bytes on macOS - and never resets
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+def measure(stage, fn, repeat=3, allocations=True, setup=None):
+    """Run fn repeatedly and record wall time, peak RSS and allocations"""
+    walls = []
+    peak_rss = 0
+    result = None
+
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        _reset_peak_rss()
+        start = time.perf_counter()
+        result = fn()
+        walls.append(time.perf_counter() - start)
+        peak_rss = max(peak_rss, _peak_rss_bytes())
+
+    record = {
+        'stage': stage,
+        'wall_s': min(walls),
+        'wall_median_s': float(np.median(walls)),
+        'runs': repeat,
+        'peak_rss_mb': round(peak_rss / 2**20, 1),
+    }
+
+    # Allocation tracing slows code down, so it gets its own untimed run
+    if allocations:
+        if setup is not None:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        record['alloc_peak_mb'] = round(peak / 2**20, 2)
+        record['alloc_retained_mb'] = round(current / 2**20, 2)
+
+    print(f"  {stage:<40} {record['wall_s'] * 1000:>10.1f} ms  "
+          f"rss {record['peak_rss_mb']:>8.1f} MB  "
+          f"alloc {record.get('alloc_peak_mb', float('nan')):>8.2f} MB")
+    return record, result
+
+# ================================================================================
+# SYNTHETIC DATA
+# ================================================================================
+
+def make_synthetic_dataset(source_dir, target_dir, n_users, n_daily_rows, seed=42):
+    """Generate a scaled dataset once, reusing it on later runs"""
+    survey_path = os.path.join(target_dir, 'main_survey_data.csv')
+    daily_path = os.path.join(target_dir, 'daily_usage_data.csv')
+    if os.path.exists(survey_path) and os.path.exists(daily_path):
+        return
+    n_daily_users = max(1, min(n_users, n_daily_rows // DAILY_DAYS))
+    write_dataset(source_dir, target_dir, n_users, n_daily_users, seed=seed, days=DAILY_DAYS)
+
+def write_ingest_wave(target_dir, main_df, n_users, seed=42):
+    """Write a new survey wave and a week of its daily usage as partition files"""
+    rng = np.random.default_rng(seed)
+    model = fit_survey_model(main_df.drop(columns=['platform_mask']))
+    wave = generate_survey(model, len(main_df), n_users, len(main_df) + n_users, rng)
+    wave.to_csv(os.path.join(target_dir, 'main_survey_data-bench.csv'), index=False)
+    generate_daily(wave, rng, start='2024-07-01', days=INGEST_WAVE_DAYS).to_csv(
+        os.path.join(target_dir, 'daily_usage_data-bench.csv'), index=False
+    )
+
+# ================================================================================
+# BENCHMARK STAGES
+# ================================================================================
+
+@contextmanager
+def private_cache():
+    """Point the parquet cache and shared store at a temporary folder
+    
+    Cold loads clear the cache and publishing prunes other store versions, so
+    the benchmark never touches the .data_cache a running dashboard uses.
+    """
+    loader = analytics.loader
+    saved = loader.CACHE_DIR, loader.SHARED_STORE_DIR
+    with tempfile.TemporaryDirectory(prefix='bench_cache_') as cache_dir:
+        loader.CACHE_DIR, loader.SHARED_STORE_DIR = cache_dir, os.path.join(cache_dir, 'shared')
+        try:
+            yield cache_dir
+        finally:
+            loader.CACHE_DIR, loader.SHARED_STORE_DIR = saved
+
+def legacy_filter(df, selections, screen_range):
+    """The original chain of boolean-mask slices, kept as a baseline"""
+    filtered_df = df.copy()
+    for col, value in selections.items():
+        values = analytics.selected_values(value)
+        if values is None:
+            continue
+        if col == analytics.PLATFORM_FILTER:
+            filtered_df = filtered_df[
+                filtered_df['platforms_used'].astype(str).str.split(',').apply(
+                    lambda names: any(v in names for v in values)
+                )
+            ]
+        elif col in analytics.RANGE_FILTER_COLUMNS:
+            filtered_df = filtered_df[filtered_df[col].between(*values)]
+        else:
+            filtered_df = filtered_df[filtered_df[col].isin(values)]
+    return filtered_df[
+        (filtered_df['avg_daily_screen_time_hrs'] >= screen_range[0]) &
+        (filtered_df['avg_daily_screen_time_hrs'] <= screen_range[1])
+    ]
+
+def run_dataset(name, data_dir, repeat, allocations, skip):
+    """Benchmark every stage against the CSVs in data_dir"""
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    records = []
+    # Inside private_cache, so this is never the dashboard's own cache
+    clear_cache = lambda: shutil.rmtree(analytics.loader.CACHE_DIR, ignore_errors=True)
+
+    try:
+        print(f"\n▶ {name} ({data_dir})")
+
+        # Load - cold parses CSV and writes parquet, warm reads parquet
+        read_survey = lambda: analytics.read_table(
+            'main_survey_data.csv',
+            date_columns=['survey_date'],
+            categorical_columns=analytics.SURVEY_CATEGORICAL_COLUMNS
+        )
+        read_daily = lambda: analytics.read_cached(
+            'daily_usage_data.csv', analytics.aggregate_daily_usage, ['user_date']
+        )
+        rec, _ = measure('load.survey.cold', read_survey, 1, allocations, clear_cache)
+        records.append(rec)
+        rec, _ = measure('load.daily.cold', read_daily, 1, allocations, clear_cache)
+        records.append(rec)
+        read_survey()
+        rec, main_df = measure('load.survey.warm', read_survey, repeat, allocations)
+        records.append(rec)
+        read_daily()
+        rec, daily = measure('load.daily.warm', read_daily, repeat, allocations)
+        records.append(rec)
+        main_df = main_df.dropna(subset=['survey_date'])
+        rec, daily_partitions = measure(
+            'load.daily.partition', lambda: analytics.partition_by_month(daily['user_date']),
+            repeat, allocations
+        )
+        records.append(rec)
+        platform_df = pd.read_csv('platform_metadata.csv')
+        platform_names = tuple(platform_df['platform_name'])
+        rec, main_df['platform_mask'] = measure(
+            'load.platform_mask',
+            lambda: analytics.encode_platform_sets(main_df['platforms_used'], platform_names),
+            repeat, allocations
+        )
+        records.append(rec)
+
+        # Shared store - published once per node, attached by every other worker
+        data_version = analytics.get_data_version()
+        shared = dict(zip(analytics.SHARED_TABLES, [main_df, daily_partitions, platform_df]))
+        rec, _ = measure(
+            'load.shared.publish', lambda: analytics.publish_tables(data_version, shared),
+            1, allocations
+        )
+        records.append(rec)
+        rec, _ = measure(
+            'load.shared.attach', lambda: analytics.attach_tables(data_version), repeat, allocations
+        )
+        records.append(rec)
+        for source, entry in analytics.get_memory_report().items():
+            compact = sum(entry['compact_bytes'].values())
+            print(f"  {source:<24} parsed {entry['parsed_bytes'] / 1e6:>8.1f} MB  "
+                  f"compact {compact / 1e6:>8.1f} MB")
+
+        # Indexes built once per dataset version
+        rec, filter_index = measure(
+            'index.filter', lambda: analytics.build_filter_index(main_df, platform_names),
+            repeat, allocations
+        )
+        records.append(rec)
+        rec, join_index = measure(
+            'index.user_join',
+            lambda: analytics.build_user_join_index(main_df, daily_partitions),
+            repeat, allocations
+        )
+        records.append(rec)
+
+        # Per-rerun filtering
+        for scenario, (selections, screen_range) in FILTER_SCENARIOS.items():
+            rec, _ = measure(
+                f"filter.index.{scenario}",
+                lambda: analytics.drop_unused_categories(
+                    main_df.take(analytics.query_filter_index(filter_index, selections, screen_range))
+                ),
+                repeat, allocations
+            )
+            records.append(rec)
+            rec, _ = measure(
+                f"filter.legacy.{scenario}",
+                lambda: legacy_filter(main_df, selections, screen_range),
+                repeat, allocations
+            )
+            records.append(rec)
+
+        # Daily rows of the filtered users - every month, then a one-month range
+        # that only reads its own partition
+        row_ids = analytics.query_filter_index(filter_index, *FILTER_SCENARIOS['age'])
+        first_date, last_date = analytics.daily_date_range(daily_partitions)
+        date_ranges = {
+            'age': (first_date, last_date),
+            'age_month': (first_date, first_date + pd.offsets.MonthEnd(0)),
+        }
+        for scenario, date_range in date_ranges.items():
+            rec, selected = measure(
+                f"join.daily.{scenario}",
+                lambda: analytics.select_daily_rows(
+                    join_index, row_ids, daily_partitions, date_range, analytics.DATE_SUM_COLUMNS
+                ),
+                repeat, allocations
+            )
+            records.append(rec)
+            if scenario == 'age':
+                filtered_daily = selected
+
+        # Rolling statistics of all users - per-date sums per month, then every day
+        # stepped from scratch vs stepping on through the last month only
+        rec, month_sums = measure(
+            'index.month_date_sums', lambda: analytics.month_date_sums(daily_partitions), repeat, allocations
+        )
+        records.append(rec)
+        last_month = max(month_sums)
+        earlier = analytics.temporal_stats(analytics.population_date_sums(
+            {month: sums for month, sums in month_sums.items() if month < last_month}
+        ))
+        rec, _ = measure(
+            'temporal.rolling.full',
+            lambda: analytics.temporal_stats(analytics.population_date_sums(month_sums)),
+            repeat, allocations
+        )
+        records.append(rec)
+        rec, _ = measure(
+            'temporal.rolling.extend',
+            lambda: analytics.extend_temporal_stats(
+                earlier, analytics.population_date_sums(month_sums, last_month)
+            ),
+            repeat, allocations
+        )
+        records.append(rec)
+
+        rec, _ = measure(
+            'index.trajectory', lambda: analytics.build_trajectory_features(daily_partitions), repeat, allocations
+        )
+        records.append(rec)
+
+        rec, cubes = measure(
+            'index.cubes', lambda: analytics.build_cubes(main_df, platform_names), repeat, allocations
+        )
+        records.append(rec)
+        print(f"  {'cube cells':<24} " + '  '.join(
+            f"{name} {len(cube['cells']):,}" for name, cube in cubes.items()
+        ))
+
+        # Per-tab aggregates, uncached - 'all' and 'age' read cube cells, 'screen_range'
+        # narrows the slider so its cells are built from the filtered rows
+        for scenario in ['all', 'age', 'screen_range']:
+            selections, screen_range = FILTER_SCENARIOS[scenario]
+            row_ids = analytics.query_filter_index(filter_index, selections, screen_range)
+            filtered_df = analytics.drop_unused_categories(main_df.take(row_ids))
+            inputs = {
+                'date_sums': filtered_daily,
+                'dow_means': analytics.AGGREGATIONS['date_sums'](filtered_daily),
+                'rolling_stats': analytics.AGGREGATIONS['date_sums'](filtered_daily),
+                'weekly_screen': analytics.AGGREGATIONS['date_sums'](filtered_daily),
+                'fairness': filtered_df,
+                'spearman_matrix': filtered_df
+            }
+            for tab, names in analytics.TAB_AGGREGATES.items():
+                if tab in skip:
+                    continue
+                run_tab = lambda: [
+                    analytics.AGGREGATIONS[n](inputs[n] if n in inputs else analytics.select_cube_cells(
+                        cubes[analytics.AGGREGATE_CUBES[n]], selections, screen_range, filtered_df
+                    ))
+                    for n in names
+                ]
+                rec, _ = measure(f"tab.{tab}.{scenario}", run_tab, repeat, allocations)
+                records.append(rec)
+
+        # Pearson over every numeric column from the correlation cube's moments
+        # vs from the users
+        rec, _ = measure(
+            'correlations.moments',
+            lambda: analytics.AGGREGATIONS['correlation_matrix'](analytics.query_cube(cubes['correlation'], {})),
+            repeat, allocations
+        )
+        records.append(rec)
+        rec, _ = measure(
+            'correlations.pandas', lambda: main_df[analytics.SURVEY_NUMERIC_COLUMNS].corr(), repeat, allocations
+        )
+        records.append(rec)
+
+        # Cohort comparison - two cohorts the core cube doesn't cover, folded in one
+        # grouped pass vs building each cohort's cells from its own rows
+        screen_range = FILTER_SCENARIOS['multi_select'][1]
+        cohorts = [
+            {
+                'name': name,
+                'selections': FILTER_SCENARIOS[scenario][0],
+                'row_ids': analytics.query_filter_index(filter_index, *FILTER_SCENARIOS[scenario])
+            }
+            for name, scenario in zip(analytics.COHORT_NAMES, ['multi_select', 'uses_platform'])
+        ]
+        rec, _ = measure(
+            'cohorts.kpis.grouped',
+            lambda: analytics.AGGREGATIONS['cohort_comparison'](
+                analytics.select_cohort_cells(cubes['core'], cohorts, screen_range, main_df)
+            ),
+            repeat, allocations
+        )
+        records.append(rec)
+        rec, _ = measure(
+            'cohorts.kpis.separate',
+            lambda: [
+                analytics.AGGREGATIONS['kpis'](analytics.select_cube_cells(
+                    cubes['core'], cohort['selections'], screen_range,
+                    analytics.drop_unused_categories(main_df.take(cohort['row_ids']))
+                ))
+                for cohort in cohorts
+            ],
+            repeat, allocations
+        )
+        records.append(rec)
+
+        # Incremental ingest - a new wave lands as partition files next to the
+        # (linked) dataset and is folded into a live one vs reloading everything
+        ingest_dir = os.path.abspath('.bench_ingest')
+        shutil.rmtree(ingest_dir, ignore_errors=True)
+        os.makedirs(ingest_dir)
+        try:
+            for path in analytics.DATA_FILES:
+                os.symlink(os.path.abspath(path), os.path.join(ingest_dir, path))
+            dataset = analytics.open_dataset(ingest_dir, shared=False)
+            base = dataset['current']
+            write_ingest_wave(ingest_dir, main_df, max(100, int(len(main_df) * INGEST_WAVE_SHARE)))
+            rewind = lambda: dataset.update(current=base)
+            rec, _ = measure(
+                'ingest.append', lambda: analytics.refresh_dataset(dataset), repeat, allocations, rewind
+            )
+            records.append(rec)
+            rec, _ = measure(
+                'ingest.full_reload', lambda: analytics.open_dataset(ingest_dir, shared=False), 1, allocations
+            )
+            records.append(rec)
+        finally:
+            shutil.rmtree(ingest_dir, ignore_errors=True)
+
+        if 'ml' not in skip:
+            X, y = analytics.prepare_training_data(main_df)
+            rec, _ = measure('tab.ml.train', lambda: analytics.train_risk_model(X, y), 1, allocations)
+            records.append(rec)
+
+        return {
+            'dataset': name,
+            'n_users': int(len(main_df)),
+            'n_daily_rows': analytics.daily_record_count(daily_partitions),
+            'memory': analytics.get_memory_report(),
+            'stages': records
+        }
+    finally:
+        os.chdir(cwd)
+
+def _git_commit():
+    """Return the current commit hash, if any"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard data pipeline')
+    parser.add_argument('--dataset', nargs='+', default=['real'],
+                        help=f"'real' and/or synthetic presets: {', '.join(SCALES)}")
+    parser.add_argument('--data-dir', default='.', help='Folder with the real CSV files')
+    parser.add_argument('--work-dir', default='.bench_data', help='Folder for synthetic datasets')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage')
+    parser.add_argument('--no-allocations', action='store_true', help='Skip tracemalloc runs')
+    parser.add_argument('--skip', nargs='*', default=[], help='Tabs to skip, e.g. ml geographic')
+    parser.add_argument('--output', default='bench_results.json', help='JSON results file')
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(args.data_dir)
+    results = {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'datasets': []
+    }
+
+    for name in args.dataset:
+        if name == 'real':
+            target_dir = data_dir
+        elif name in SCALES:
+            n_users, n_daily_rows = SCALES[name]
+            target_dir = os.path.abspath(os.path.join(args.work_dir, name))
+            print(f"Preparing synthetic dataset {name} in {target_dir}…")
+            make_synthetic_dataset(data_dir, target_dir, n_users, n_daily_rows)
+        else:
+            parser.error(f"unknown dataset {name!r}")
+        with private_cache():
+            results['datasets'].append(
+                run_dataset(name, target_dir, args.repeat, not args.no_allocations, set(args.skip))
+            )
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()